@@ -3,13 +3,11 @@ from __future__ import annotations
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from backend.app.db import get_db
-from backend.app.llm.report import generate_quarter_comparison_report
-from backend.app.llm.validate import evaluate_report
-from backend.app.models import Report
+from backend.app.db import get_async_db
+from backend.app.llm.report_store import aget_or_create_report, normalize_report_key
+from backend.app.llm.validate import evaluate_reports
 from backend.app.schemas import ReportRequest
 
 
@@ -17,34 +15,16 @@ router = APIRouter(prefix="/evaluation", tags=["evaluation"])
 
 
 @router.post("/report", status_code=status.HTTP_200_OK)
-def evaluate_report_endpoint(payload: ReportRequest, db: Session = Depends(get_db)) -> dict[str, Any]:
+async def evaluate_report_endpoint(payload: ReportRequest, db: AsyncSession = Depends(get_async_db)) -> dict[str, Any]:
     """
-    Generate a report and return it with evaluation metrics.
+    Generate (or load the cached) report and return it with evaluation metrics.
     """
     try:
-        ticker = payload.ticker.upper().strip()
-        quarter = payload.quarter.upper().strip()
-        prev_quarter = payload.prev_quarter.upper().strip() if payload.prev_quarter else None
+        key = normalize_report_key(payload.ticker, payload.quarter, payload.prev_quarter)
+        report_data = (await aget_or_create_report(db, key)).report_data
 
-        stmt = (
-            select(Report)
-            .where(Report.ticker == ticker)
-            .where(Report.quarter == quarter)
-            .where(Report.prev_quarter == prev_quarter)
-        )
-        cached = db.scalars(stmt).first()
-        
-        if cached:
-            report_data = cached.report_data
-        else:
-            report_data = generate_quarter_comparison_report(
-                db=db,
-                ticker=ticker,
-                quarter=quarter,
-                prev_quarter=prev_quarter,
-            )
-
-        evaluation = evaluate_report(report_data)
+        # Cited chunks are checked against the database.
+        evaluation = (await db.run_sync(evaluate_reports, [report_data]))[0]
 
         return {
             "evaluation": evaluation,
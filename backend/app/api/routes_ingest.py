@@ -5,12 +5,15 @@ import uuid
 from datetime import date
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from backend.app.config import get_settings
 from backend.app.db import get_db
-from backend.app.ingestion.ingest import create_chunks_for_document
+from backend.app.ingestion.ingest import create_document_with_chunks, ingest_transcript_stream
+from backend.app.ingestion.stream import TranscriptTooLargeError
 from backend.app.models import Document
 from backend.app.schemas import ChunkOut, DocumentCreate, DocumentDetail, DocumentOut
 
@@ -20,27 +23,20 @@ router = APIRouter(prefix="", tags=["ingest"])
 
 @router.post("/ingest", response_model=DocumentOut, status_code=status.HTTP_201_CREATED)
 def ingest_document(payload: DocumentCreate, db: Session = Depends(get_db)) -> DocumentOut:
-    doc = Document(
-        ticker=payload.ticker.strip().upper(),
-        quarter=payload.quarter.strip().upper(),
-        call_date=payload.call_date,
-        raw_text=payload.raw_text,
-    )
-
-    db.add(doc)
     try:
-        db.commit()
+        doc = create_document_with_chunks(
+            db,
+            ticker=payload.ticker,
+            quarter=payload.quarter,
+            call_date=payload.call_date,
+            raw_text=payload.raw_text,
+        )
     except IntegrityError:
-        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Document already exists for (ticker, quarter).",
         )
 
-    db.refresh(doc)
-
-    create_chunks_for_document(db, doc)
-
     return DocumentOut.model_validate(doc)
 
 
@@ -66,36 +62,38 @@ async def ingest_document_file(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
 ) -> DocumentOut:
-    content_bytes = await file.read()
+    settings = get_settings()
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Transcript file exceeds the {settings.max_upload_bytes} byte limit.",
+    )
+    if file.size is not None and file.size > settings.max_upload_bytes:
+        raise too_large
+
     try:
-        raw_text = content_bytes.decode("utf-8")
+        doc = await run_in_threadpool(
+            ingest_transcript_stream,
+            db,
+            ticker=ticker,
+            quarter=quarter,
+            call_date=call_date,
+            fileobj=file.file,
+            max_bytes=settings.max_upload_bytes,
+            block_size=settings.upload_block_size,
+        )
+    except TranscriptTooLargeError:
+        raise too_large
     except UnicodeDecodeError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Transcript file must be UTF-8 encoded text.",
         )
-
-    doc = Document(
-        ticker=ticker.strip().upper(),
-        quarter=quarter.strip().upper(),
-        call_date=call_date,
-        raw_text=raw_text,
-    )
-
-    db.add(doc)
-    try:
-        db.commit()
     except IntegrityError:
-        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Document already exists for (ticker, quarter).",
         )
 
-    db.refresh(doc)
-
-    create_chunks_for_document(db, doc)
-
     return DocumentOut.model_validate(doc)
 
 
@@ -2,12 +2,14 @@ from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from backend.app.db import get_db
+from backend.app.db import get_async_db, get_db
 from backend.app.ingestion.ingest import create_chunks_for_document
 from backend.app.models import Chunk, Document
-from backend.app.rag.retriever import retrieve_top_k
+from backend.app.rag.embeddings import get_query_cache
+from backend.app.rag.retriever import aretrieve_top_k
 from backend.app.rag.vector_store import embed_chunks_for_document
 from backend.app.schemas import RagSearchRequest, RagSearchResponse, RagSearchChunk
 from sqlalchemy import func
@@ -29,25 +31,32 @@ def embed_document_chunks(document_id: str, db: Session = Depends(get_db)) -> di
     if not existing_chunks:
         create_chunks_for_document(db, doc)
 
-    chunks_embedded = embed_chunks_for_document(db, document_id)
+    stats = embed_chunks_for_document(db, document_id)
     total_chunks = db.scalar(
         select(func.count()).select_from(Chunk).where(Chunk.document_id == document_id)
     )
 
     return {
         "document_id": str(document_id),
-        "chunks_embedded": chunks_embedded,
+        "chunks_embedded": stats.chunks_embedded,
+        "embeddings_reused": stats.reused,
+        "embedding_api_calls": stats.api_calls,
         "total_chunks": int(total_chunks or 0),
     }
 
 
 @router.post("/search", response_model=RagSearchResponse)
-def rag_search(payload: RagSearchRequest, db: Session = Depends(get_db)) -> RagSearchResponse:
-    chunks = retrieve_top_k(
+async def rag_search(payload: RagSearchRequest, db: AsyncSession = Depends(get_async_db)) -> RagSearchResponse:
+    chunks = await aretrieve_top_k(
         db=db,
         query=payload.query,
         k=payload.k,
         document_id=str(payload.document_id) if payload.document_id is not None else None,
+        ef_search=payload.ef_search,
+        probes=payload.probes,
+        section=payload.section,
+        speaker=payload.speaker,
+        mode=payload.mode,
     )
 
     results: list[RagSearchChunk] = []
@@ -59,9 +68,15 @@ def rag_search(payload: RagSearchRequest, db: Session = Depends(get_db)) -> RagS
                 chunk_index=c.chunk_index,
                 section=c.section,
                 speaker=c.speaker,
+                speaker_title=c.speaker_title,
                 text=c.text,
             )
         )
 
     return RagSearchResponse(query=payload.query, k=payload.k, results=results)
 
+
+
+@router.get("/query-cache")
+def query_cache_stats() -> dict[str, int | float]:
+    return get_query_cache().stats()
@@ -1,14 +1,29 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+import uuid
+from collections.abc import AsyncIterator
+from typing import Any
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
 import logging
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from backend.app.db import get_db
-from backend.app.llm.report import generate_quarter_comparison_report
-from backend.app.models import Report
-from backend.app.schemas import ReportRequest, ReportResponse
+from backend.app.config import get_settings
+from backend.app.db import get_async_db, get_async_sessionmaker, get_db
+from backend.app.jobs.report_jobs import enqueue_refresh_job, enqueue_report_job, report_job_out
+from backend.app.llm.report_store import (
+    aget_or_create_report,
+    astream_report,
+    get_report_etag,
+    normalize_report_key,
+    report_json,
+)
+from backend.app.models import Report, ReportJob
+from backend.app.schemas import ReportJobOut, ReportRequest, ReportResponse
 
 
 router = APIRouter(prefix="", tags=["report"])
@@ -21,37 +36,10 @@ def report_health() -> dict[str, str]:
 
 
 @router.post("/report", response_model=ReportResponse, status_code=status.HTTP_200_OK)
-def create_report(payload: ReportRequest, db: Session = Depends(get_db)) -> ReportResponse:
+async def create_report(payload: ReportRequest, db: AsyncSession = Depends(get_async_db)) -> ReportResponse:
     try:
-        ticker = payload.ticker.upper().strip()
-        quarter = payload.quarter.upper().strip()
-        prev_quarter = payload.prev_quarter.upper().strip() if payload.prev_quarter else None
-
-        stmt = (
-            select(Report)
-            .where(Report.ticker == ticker)
-            .where(Report.quarter == quarter)
-            .where(Report.prev_quarter == prev_quarter)
-        )
-        cached = db.scalars(stmt).first()
-        if cached:
-            return ReportResponse(data=cached.report_data)
-
-        data = generate_quarter_comparison_report(
-            db=db,
-            ticker=ticker,
-            quarter=quarter,
-            prev_quarter=prev_quarter,
-        )
-
-        report = Report(
-            ticker=ticker,
-            quarter=quarter,
-            prev_quarter=prev_quarter,
-            report_data=data,
-        )
-        db.add(report)
-        db.commit()
+        key = normalize_report_key(payload.ticker, payload.quarter, payload.prev_quarter)
+        report = await aget_or_create_report(db, key)
 
     except ValueError as exc:
         msg = str(exc)
@@ -69,5 +57,118 @@ def create_report(payload: ReportRequest, db: Session = Depends(get_db)) -> Repo
             detail=f"Report generation failed: {type(exc).__name__}: {exc}",
         ) from exc
 
-    return ReportResponse(data=data)
+    return ReportResponse(data=report.report_data)
+
+
+def _sse(event: str, data: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/report/stream")
+async def stream_report(payload: ReportRequest) -> StreamingResponse:
+    """
+    POST /report as server-sent events: stage events, the model's tokens,
+    then a "report" event with the stored report (or an "error" event).
+    """
+    key = normalize_report_key(payload.ticker, payload.quarter, payload.prev_quarter)
+
+    # The session has to outlive this handler (dependencies are torn down
+    # before a streaming body is sent), so the stream owns it.
+    db = get_async_sessionmaker()()
+    events = astream_report(db, key)
+    try:
+        # Run up to the first event here so a missing document is still a 404.
+        first = await anext(events)
+    except ValueError as exc:
+        await db.close()
+        msg = str(exc)
+        if "Current quarter document not found" in msg:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=msg)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Report generation failed: {msg}")
+    except BaseException:
+        await db.close()
+        raise
+
+    async def body() -> AsyncIterator[str]:
+        try:
+            yield _sse(*first)
+            async for event, data in events:
+                yield _sse(event, data)
+        except Exception as exc:
+            logger.exception("Report streaming failed")
+            yield _sse("error", {"detail": f"Report generation failed: {type(exc).__name__}: {exc}"})
+        finally:
+            await events.aclose()
+            await db.close()
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison: W/"x" matches "x".
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+@router.get(
+    "/reports/{ticker}/{quarter}",
+    response_model=ReportResponse,
+    responses={304: {"description": "Not modified"}, 404: {"description": "No stored report"}},
+)
+async def get_report(
+    ticker: str,
+    quarter: str,
+    prev: str | None = None,
+    if_none_match: str | None = Header(default=None),
+    db: AsyncSession = Depends(get_async_db),
+) -> Response:
+    """
+    A stored report, cacheable by browsers and CDNs. Never generates one;
+    use POST /report for that. A stale report is still returned, but without
+    an ETag, never as 304, and with a regeneration job queued (at most one
+    per cooldown). Queueing that job is the only write of this endpoint.
+    """
+    key = normalize_report_key(ticker, quarter, prev)
+    found = await db.run_sync(get_report_etag, key)
+    if found is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report not found.")
+
+    report_id, content_hash, current = found
+    if current:
+        headers = {
+            "ETag": f'"{content_hash}"',
+            "Cache-Control": f"public, max-age={get_settings().report_cache_max_age}",
+        }
+        if if_none_match is not None and _etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    else:
+        job = await db.run_sync(enqueue_refresh_job, key)
+        logger.info("Serving stale report %s for %s; regeneration job %s", report_id, key, job.id if job else None)
+        headers = {"Cache-Control": "no-cache"}
+
+    data = await db.scalar(select(Report.report_data).where(Report.id == report_id))
+    # Serialized directly: same shape as ReportResponse without re-validating it.
+    body = '{"data":' + report_json(data) + "}"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.post("/report/jobs", response_model=ReportJobOut, status_code=status.HTTP_202_ACCEPTED)
+def create_report_job(payload: ReportRequest, db: Session = Depends(get_db)) -> ReportJobOut:
+    key = normalize_report_key(payload.ticker, payload.quarter, payload.prev_quarter)
+    job = enqueue_report_job(db, key)
+    return report_job_out(db, job)
+
 
+@router.get("/report/jobs/{job_id}", response_model=ReportJobOut)
+def get_report_job(job_id: uuid.UUID, db: Session = Depends(get_db)) -> ReportJobOut:
+    job = db.get(ReportJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report job not found.")
+    return report_job_out(db, job)
@@ -25,6 +25,83 @@ class Settings(BaseSettings):
     database_url: str | None = Field(default=None, validation_alias="DATABASE_URL")
     gemini_api_key: str | None = Field(default=None, validation_alias="GEMINI_API_KEY")
 
+    # Async stack (POST /report, /report/stream, /evaluation/report, /rag/search).
+    # google-genai 0.3.0 runs every client.aio call via asyncio.to_thread, so
+    # concurrent model and embedding calls per process are capped by the event
+    # loop's default executor, sized here; each report stream also holds one
+    # thread. The async engine has its own connection pool, which report lease
+    # heartbeats share with the requests.
+    async_executor_workers: int = Field(default=32, validation_alias="ASYNC_EXECUTOR_WORKERS")
+    async_db_pool_size: int = Field(default=10, validation_alias="ASYNC_DB_POOL_SIZE")
+    async_db_max_overflow: int = Field(default=20, validation_alias="ASYNC_DB_MAX_OVERFLOW")
+
+    # Transcript uploads (POST /ingest/file) are streamed in blocks of this size
+    # and rejected once they exceed the byte limit.
+    max_upload_bytes: int = Field(default=25 * 1024 * 1024, validation_alias="MAX_UPLOAD_BYTES")
+    upload_block_size: int = Field(default=64 * 1024, validation_alias="UPLOAD_BLOCK_SIZE")
+
+    # Chunk embedding: texts per embedding request and requests in flight per document.
+    embed_batch_size: int = Field(default=32, validation_alias="EMBED_BATCH_SIZE")
+    embed_concurrency: int = Field(default=4, validation_alias="EMBED_CONCURRENCY")
+
+    # Maximum number of query embeddings kept in the in-process LRU cache.
+    # Entries evicted from memory are still served from the query_embeddings table.
+    query_embedding_cache_size: int = Field(default=2048, validation_alias="QUERY_EMBEDDING_CACHE_SIZE")
+
+    # Approximate nearest-neighbour index on chunks.embedding (see scripts/vector_index.py).
+    # Build parameters only take effect when the index is (re)built.
+    vector_index_kind: Literal["hnsw", "ivfflat"] = Field(default="hnsw", validation_alias="VECTOR_INDEX_KIND")
+    hnsw_m: int = Field(default=16, validation_alias="HNSW_M")
+    hnsw_ef_construction: int = Field(default=64, validation_alias="HNSW_EF_CONSTRUCTION")
+    ivfflat_lists: int = Field(default=100, validation_alias="IVFFLAT_LISTS")
+    # Default per-query search parameters; None keeps the pgvector defaults
+    # (hnsw.ef_search=40, ivfflat.probes=1). Requests can override them. Searches
+    # scoped to a document rank its chunks exactly and do not use the index.
+    hnsw_ef_search: int | None = Field(default=None, validation_alias="HNSW_EF_SEARCH")
+    ivfflat_probes: int | None = Field(default=None, validation_alias="IVFFLAT_PROBES")
+
+    # "hybrid" fuses the vector top-k with a full-text top-k (reciprocal rank
+    # fusion). Each ranker contributes up to retrieval_candidates chunks; for
+    # searches not scoped to a document keep it at or below hnsw.ef_search, or
+    # the vector side returns fewer.
+    retrieval_mode: Literal["vector", "hybrid"] = Field(default="vector", validation_alias="RETRIEVAL_MODE")
+    retrieval_candidates: int = Field(default=40, validation_alias="RETRIEVAL_CANDIDATES")
+    rrf_k: int = Field(default=60, validation_alias="RRF_K")
+
+    # "local" answers per-document vector queries from memory-mapped .npy
+    # embedding matrices (see rag.local_index) instead of pgvector.
+    retrieval_backend: Literal["postgres", "local"] = Field(default="postgres", validation_alias="RETRIEVAL_BACKEND")
+    # Defaults to data/processed/vectors.
+    local_index_dir: str | None = Field(default=None, validation_alias="LOCAL_INDEX_DIR")
+
+    # Report job queue (POST /report/jobs). Jobs are executed by
+    # `python -m backend.app.jobs.worker` and/or by in-process worker threads.
+    report_job_workers: int = Field(default=0, validation_alias="REPORT_JOB_WORKERS")
+    report_job_poll_interval: float = Field(default=1.0, validation_alias="REPORT_JOB_POLL_INTERVAL")
+    # Running jobs (and report generation leases) whose heartbeat is older than
+    # this are assumed dead and are requeued; the heartbeat runs every quarter of it.
+    report_job_timeout_seconds: int = Field(default=60, validation_alias="REPORT_JOB_TIMEOUT_SECONDS")
+    report_job_max_attempts: int = Field(default=3, validation_alias="REPORT_JOB_MAX_ATTEMPTS")
+    # GET /reports/... queues no regeneration of a stale report while a job for
+    # the same key finished or failed less than this long ago.
+    report_refresh_cooldown_seconds: int = Field(default=900, validation_alias="REPORT_REFRESH_COOLDOWN_SECONDS")
+    # Queue a report job for (ticker, quarter, previous quarter) whenever a
+    # document finishes embedding; the job workers bound the concurrency.
+    report_precompute: bool = Field(default=True, validation_alias="REPORT_PRECOMPUTE")
+
+    # Report context assembly (llm.context): chunks are picked by maximal
+    # marginal relevance (1.0 = relevance only) until the estimated token
+    # budget is used up; 0 sends every retrieved chunk.
+    report_context_token_budget: int = Field(default=16000, validation_alias="REPORT_CONTEXT_TOKEN_BUDGET")
+    report_context_mmr_lambda: float = Field(default=0.7, validation_alias="REPORT_CONTEXT_MMR_LAMBDA")
+
+    # Label report context chunks with short aliases (C12, P4) instead of
+    # UUIDs in the prompt; citations are rewritten to the full form afterwards.
+    report_compact_citations: bool = Field(default=True, validation_alias="REPORT_COMPACT_CITATIONS")
+
+    # Cache-Control max-age of GET /reports/{ticker}/{quarter}.
+    report_cache_max_age: int = Field(default=300, validation_alias="REPORT_CACHE_MAX_AGE")
+
     def require_database_url(self) -> str:
         if not self.database_url:
             raise RuntimeError(
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 from functools import lru_cache
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
 
 from backend.app.config import get_settings
@@ -40,3 +42,39 @@ def get_db() -> Generator[Session, None, None]:
     finally:
         db.close()
 
+
+
+def _async_database_url(database_url: str) -> str:
+    # psycopg 3 serves both engines; a bare postgresql:// URL would pick psycopg2.
+    url = make_url(database_url)
+    if url.drivername in ("postgresql", "postgres"):
+        url = url.set(drivername="postgresql+psycopg")
+    return url.render_as_string(hide_password=False)
+
+
+@lru_cache(maxsize=1)
+def get_async_engine():
+    settings = get_settings()
+    database_url = settings.require_database_url()
+    return create_async_engine(
+        _async_database_url(database_url),
+        pool_pre_ping=True,
+        pool_size=settings.async_db_pool_size,
+        max_overflow=settings.async_db_max_overflow,
+        pool_timeout=30,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_async_sessionmaker():
+    return async_sessionmaker(
+        bind=get_async_engine(),
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    SessionLocal = get_async_sessionmaker()
+    async with SessionLocal() as db:
+        yield db
@@ -1,14 +1,31 @@
 from __future__ import annotations
 
+import hashlib
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
 
+from backend.app.ingestion.parser import TextPiece
 
-@dataclass
+
+@dataclass(slots=True)
 class ChunkInput:
     section: str
     speaker: str | None
     index: int
     text: str
+    speaker_title: str | None = None
+
+
+def normalize_chunk_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def chunk_text_hash(text: str) -> str:
+    """
+    sha256 of the whitespace-normalized text; chunks with the same hash share
+    an embedding.
+    """
+    return hashlib.sha256(normalize_chunk_text(text).encode("utf-8")).hexdigest()
 
 
 def chunk_section(
@@ -17,34 +34,188 @@ def chunk_section(
     max_chars: int = 1200,
     overlap_chars: int = 200,
 ) -> list[ChunkInput]:
-    text = section_text.strip()
-    if not text:
-        return []
+    """
+    Split a section into windows of at most max_chars, preferring to end a
+    window after the last paragraph break (or failing that, sentence break)
+    in it, with overlap_chars of overlap between consecutive windows.
+    """
+    chunker = SectionChunker(section_name, max_chars=max_chars, overlap_chars=overlap_chars)
+    return chunker.feed(section_text) + chunker.close()
+
+
+class _LastBreak:
+    """
+    Tracks the last occurrence of a break marker in the buffered text.
+
+    Window ends only move forward, so each query scans just the text added
+    since the previous one; every character is searched once per marker.
+    """
+
+    __slots__ = ("marker", "scanned_to", "last")
+
+    def __init__(self, marker: str) -> None:
+        self.marker = marker
+        self.scanned_to = 0  # match starts below this were already examined
+        self.last = -1
+
+    def last_between(self, buf: str, base: int, first: int, last: int) -> int:
+        """Last match starting at p with first <= p <= last, or -1."""
+        if last >= self.scanned_to:
+            lo = max(self.scanned_to, base) - base
+            found = buf.rfind(self.marker, lo, last + len(self.marker) - base)
+            if found != -1:
+                self.last = base + found
+            self.scanned_to = last + 1
+        return self.last if first <= self.last <= last else -1
+
+
+class SectionChunker:
+    """
+    Incremental chunk_section: feed text in pieces, get the same chunks.
 
-    chunks: list[ChunkInput] = []
-    start = 0
-    index = 0
+    Break markers are searched incrementally instead of once per window, and
+    fed text is joined only once at least max_chars of it is pending, so the
+    work is linear in the section length plus the size of the chunks
+    produced. Only the text from the current window start onward is
+    kept, so memory stays around 2 * max_chars plus one fed piece.
+    """
 
-    while start < len(text):
-        end = min(start + max_chars, len(text))
-        window = text[start:end]
+    def __init__(
+        self,
+        section_name: str,
+        max_chars: int = 1200,
+        overlap_chars: int = 200,
+        speaker: str | None = None,
+        speaker_title: str | None = None,
+        first_index: int = 0,
+    ) -> None:
+        self.section_name = section_name
+        self.max_chars = max_chars
+        self.overlap_chars = overlap_chars
+        self.speaker = speaker
+        self.speaker_title = speaker_title
 
-        last_break = window.rfind("\n\n")
-        if last_break == -1:
-            last_break = window.rfind(". ")
+        # Offsets are absolute positions in the left-stripped section text.
+        self._buf = ""
+        self._base = 0
+        self._pending: list[str] = []
+        self._pending_len = 0
+        self._length = 0
+        self._content_end = 0
+        self._start = 0
+        self._index = first_index
+        self._paragraphs = _LastBreak("\n\n")
+        self._sentences = _LastBreak(". ")
 
-        if last_break != -1 and end != len(text):
-            end = start + last_break + 1
+    def feed(self, piece: str) -> list[ChunkInput]:
+        if not self._length:
+            piece = piece.lstrip()
+            if not piece:
+                return []
 
-        chunk_text = text[start:end].strip()
-        if chunk_text:
-            chunks.append(ChunkInput(section=section_name, speaker=None, index=index, text=chunk_text))
-            index += 1
+        self._pending.append(piece)
+        self._pending_len += len(piece)
+        content_len = len(piece.rstrip())
+        if content_len:
+            self._content_end = self._length + content_len
+        self._length += len(piece)
 
-        if end == len(text):
-            break
+        if self._pending_len < self.max_chars:
+            return []
+        self._absorb()
+        return self._drain(final=False)
 
-        start = max(0, end - overlap_chars)
+    def close(self) -> list[ChunkInput]:
+        self._absorb()
+        return self._drain(final=True)
+
+    def _absorb(self) -> None:
+        if not self._pending:
+            return
+
+        kept = self._buf[self._start - self._base :]
+        self._buf = kept + "".join(self._pending)
+        self._base = self._start
+        self._pending.clear()
+        self._pending_len = 0
+
+    def _drain(self, final: bool) -> list[ChunkInput]:
+        chunks: list[ChunkInput] = []
+
+        while self._start < self._content_end:
+            start = self._start
+            limit = start + self.max_chars
+            if limit < self._content_end:
+                # Same as rfind in text[start:limit]: the marker must fit in the window.
+                last_break = self._paragraphs.last_between(self._buf, self._base, start, limit - 2)
+                if last_break == -1:
+                    last_break = self._sentences.last_between(self._buf, self._base, start, limit - 2)
+                end = last_break + 1 if last_break != -1 else limit
+            elif final:
+                end = self._content_end
+            else:
+                break
+
+            chunk_text = self._buf[start - self._base : end - self._base].strip()
+            if chunk_text:
+                chunks.append(
+                    ChunkInput(
+                        section=self.section_name,
+                        speaker=self.speaker,
+                        index=self._index,
+                        text=chunk_text,
+                        speaker_title=self.speaker_title,
+                    )
+                )
+                self._index += 1
+
+            if end == self._content_end:
+                self._start = end
+                break
+
+            # chunk_section used to loop forever when a window advanced by no
+            # more than the overlap, so such inputs have no reference output;
+            # move past the window instead.
+            self._start = end - self.overlap_chars if end - start > self.overlap_chars else end
+
+        return chunks
+
+    @property
+    def next_index(self) -> int:
+        return self._index
+
+
+def iter_chunks(
+    pieces: Iterable[TextPiece],
+    max_chars: int = 1200,
+    overlap_chars: int = 200,
+) -> Iterator[ChunkInput]:
+    """
+    Lazily chunk a stream of text pieces, e.g. from parser.iter_turns.
 
-    return chunks
+    Consecutive pieces of one turn are chunked as a single text, so chunks
+    never cross a speaker turn and carry its speaker. Chunk indices run on
+    across the turns of a section and restart for every section.
+    """
+    chunker: SectionChunker | None = None
+    key: tuple[str, int] | None = None
+    for piece in pieces:
+        if (piece.section, piece.turn) != key:
+            first_index = 0
+            if chunker is not None:
+                yield from chunker.close()
+                if chunker.section_name == piece.section:
+                    first_index = chunker.next_index
+            key = (piece.section, piece.turn)
+            chunker = SectionChunker(
+                piece.section,
+                max_chars=max_chars,
+                overlap_chars=overlap_chars,
+                speaker=piece.speaker,
+                speaker_title=piece.title,
+                first_index=first_index,
+            )
+        yield from chunker.feed(piece.text)
 
+    if chunker is not None:
+        yield from chunker.close()
@@ -1,35 +1,229 @@
 from __future__ import annotations
 
-from sqlalchemy.orm import Session
+import hashlib
+import uuid
+from collections.abc import Iterable, Sequence
+from datetime import date
+from typing import BinaryIO
 
-from backend.app.ingestion.chunker import ChunkInput, chunk_section
-from backend.app.ingestion.parser import parse_transcript
+import psycopg
+from sqlalchemy import insert, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, defer
+
+from backend.app.ingestion.chunker import ChunkInput, chunk_text_hash
+from backend.app.ingestion.parser import find_qa_split
+from backend.app.ingestion.stream import iter_text_blocks, iter_transcript_chunks
 from backend.app.models import Chunk, Document
 
 
-def create_chunks_for_document(db: Session, document: Document) -> list[Chunk]:
-    parsed = parse_transcript(document.raw_text)
-
-    chunk_inputs: list[ChunkInput] = []
-    for section_name, section_text in parsed.sections.items():
-        chunk_inputs.extend(chunk_section(section_name, section_text))
-
-    chunks: list[Chunk] = []
-    for ci in chunk_inputs:
-        chunk = Chunk(
-            document_id=document.id,
-            section=ci.section,
-            speaker=ci.speaker,
-            chunk_index=ci.index,
-            text=ci.text,
-        )
-        db.add(chunk)
-        chunks.append(chunk)
+# Chunks buffered per INSERT when ingesting a stream.
+STREAM_CHUNK_BATCH = 256
+
+
+def document_content_hash(raw_text: str) -> str:
+    """
+    sha256 of a transcript exactly as stored; report versions are keyed on it.
+    """
+    return hashlib.sha256(raw_text.encode("utf-8")).hexdigest()
+
+
+def build_chunk_inputs(raw_text: str) -> list[ChunkInput]:
+    return list(iter_transcript_chunks([raw_text.replace("\r\n", "\n")]))
+
+
+def _chunk_rows(document_id: uuid.UUID, chunk_inputs: Iterable[ChunkInput]) -> list[dict]:
+    return [
+        {
+            "document_id": document_id,
+            "section": ci.section,
+            "speaker": ci.speaker,
+            "speaker_title": ci.speaker_title,
+            "chunk_index": ci.index,
+            "text": ci.text,
+            "text_hash": chunk_text_hash(ci.text),
+        }
+        for ci in chunk_inputs
+    ]
+
+
+def insert_chunks(db: Session, document_id: uuid.UUID, chunk_inputs: Sequence[ChunkInput]) -> list[Chunk]:
+    """
+    Insert all chunks of a document with one INSERT ... RETURNING (batched by
+    SQLAlchemy's insertmanyvalues), without committing.
+    """
+    if not chunk_inputs:
+        return []
 
+    return list(db.scalars(insert(Chunk).returning(Chunk), _chunk_rows(document_id, chunk_inputs)))
+
+
+def create_chunks_for_document(db: Session, document: Document) -> list[Chunk]:
+    chunks = insert_chunks(db, document.id, build_chunk_inputs(document.raw_text))
     if chunks:
         db.commit()
-        for chunk in chunks:
-            db.refresh(chunk)
-
     return chunks
 
+
+def create_document_with_chunks(
+    db: Session,
+    ticker: str,
+    quarter: str,
+    call_date: date | None,
+    raw_text: str,
+) -> Document:
+    """
+    Insert a document and all of its chunks in one transaction.
+
+    Raises IntegrityError if (ticker, quarter) already exists; nothing is
+    written if chunking or any insert fails.
+    """
+    doc = Document(
+        ticker=ticker.strip().upper(),
+        quarter=quarter.strip().upper(),
+        call_date=call_date,
+        raw_text=raw_text,
+        content_hash=document_content_hash(raw_text),
+    )
+
+    try:
+        db.add(doc)
+        db.flush()
+        insert_chunks(db, doc.id, build_chunk_inputs(raw_text))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return doc
+
+
+def insert_documents_with_chunks(
+    db: Session,
+    documents: Sequence[tuple[str, str, date | None, str, Sequence[ChunkInput]]],
+) -> dict[tuple[str, str], uuid.UUID]:
+    """
+    Bulk-insert (ticker, quarter, call_date, raw_text, chunk_inputs) documents
+    and their chunks with one statement each, without committing.
+
+    Documents whose (ticker, quarter) already exists are skipped along with
+    their chunks. Returns the ids of the inserted documents.
+    """
+    if not documents:
+        return {}
+
+    chunks_by_key: dict[tuple[str, str], Sequence[ChunkInput]] = {}
+    doc_rows = []
+    for ticker, quarter, call_date, raw_text, chunk_inputs in documents:
+        key = (ticker.strip().upper(), quarter.strip().upper())
+        chunks_by_key[key] = chunk_inputs
+        doc_rows.append(
+            {
+                "ticker": key[0],
+                "quarter": key[1],
+                "call_date": call_date,
+                "raw_text": raw_text,
+                "content_hash": document_content_hash(raw_text),
+            }
+        )
+
+    stmt = (
+        pg_insert(Document)
+        .values(doc_rows)
+        .on_conflict_do_nothing(index_elements=[Document.ticker, Document.quarter])
+        .returning(Document.id, Document.ticker, Document.quarter)
+    )
+    inserted = {(ticker, quarter): doc_id for doc_id, ticker, quarter in db.execute(stmt)}
+
+    chunk_rows = [row for key, doc_id in inserted.items() for row in _chunk_rows(doc_id, chunks_by_key[key])]
+    if chunk_rows:
+        db.execute(insert(Chunk), chunk_rows)
+
+    return inserted
+
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_document_row(
+    db: Session,
+    document_id: uuid.UUID,
+    ticker: str,
+    quarter: str,
+    call_date: date | None,
+    blocks: Iterable[str],
+) -> str:
+    # COPY lets raw_text be written block by block instead of being
+    # materialized as one Python string. Returns its content hash.
+    content_hash = hashlib.sha256()
+    raw_conn = db.connection().connection.driver_connection
+    call_date_field = call_date.isoformat() if call_date else "\\N"
+    with raw_conn.cursor() as cur:
+        with cur.copy("COPY documents (id, ticker, quarter, call_date, raw_text) FROM STDIN") as copy:
+            copy.write(
+                f"{document_id}\t{ticker.translate(_COPY_ESCAPES)}\t{quarter.translate(_COPY_ESCAPES)}\t{call_date_field}\t"
+            )
+            for block in blocks:
+                content_hash.update(block.encode("utf-8"))
+                copy.write(block.translate(_COPY_ESCAPES))
+            copy.write("\n")
+    return content_hash.hexdigest()
+
+
+def ingest_transcript_stream(
+    db: Session,
+    ticker: str,
+    quarter: str,
+    call_date: date | None,
+    fileobj: BinaryIO,
+    max_bytes: int,
+    block_size: int = 64 * 1024,
+) -> Document:
+    """
+    Ingest a seekable UTF-8 transcript file with bounded memory.
+
+    The file is read three times in block_size pieces: once to enforce
+    max_bytes, validate the encoding and find the Q&A split, once to COPY the
+    raw text into the documents row, and once to chunk it on the fly. The
+    chunks are identical to create_document_with_chunks on the same text.
+    Nothing is written if any step fails; raises IntegrityError if
+    (ticker, quarter) already exists.
+    """
+    ticker = ticker.strip().upper()
+    quarter = quarter.strip().upper()
+
+    blocks = iter_text_blocks(fileobj, block_size, max_bytes)
+    split_index = find_qa_split(blocks)
+    # find_qa_split stops reading once the split is settled; read the rest so
+    # the whole file is size-checked and decoded before anything is written.
+    for _ in blocks:
+        pass
+
+    document_id = uuid.uuid4()
+    try:
+        fileobj.seek(0)
+        try:
+            # raw_text is stored exactly as uploaded, like the non-streaming path.
+            raw_blocks = iter_text_blocks(fileobj, block_size, max_bytes, normalize_newlines=False)
+            content_hash = _copy_document_row(db, document_id, ticker, quarter, call_date, raw_blocks)
+        except psycopg.errors.IntegrityError as exc:
+            raise IntegrityError("COPY documents", None, exc) from exc
+        db.execute(update(Document).where(Document.id == document_id).values(content_hash=content_hash))
+
+        fileobj.seek(0)
+        batch: list[ChunkInput] = []
+        for ci in iter_transcript_chunks(iter_text_blocks(fileobj, block_size, max_bytes), split_index):
+            batch.append(ci)
+            if len(batch) >= STREAM_CHUNK_BATCH:
+                db.execute(insert(Chunk), _chunk_rows(document_id, batch))
+                batch.clear()
+        if batch:
+            db.execute(insert(Chunk), _chunk_rows(document_id, batch))
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return db.get(Document, document_id, options=[defer(Document.raw_text)])
@@ -1,40 +1,356 @@
 from __future__ import annotations
 
+import itertools
+import re
+from collections import deque
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
+from functools import cached_property
 
 
 PreparedSectionName = str
 
+# In priority order: the first marker found anywhere wins, not the earliest match.
+QA_MARKERS = ["\nq&a", "\nq & a", "question-and-answer session", "questions and answers"]
+
+_NAME = r"[A-Z][\w.'’-]*(?: [A-Z][\w.'’-]*){1,3}"
+
+# "Name, Title:", "Name -- Title:", "Name (Firm):" or "Operator:" at the start of a line.
+SPEAKER_LABEL_RE = re.compile(
+    rf"[ \t]*(?P<speaker>Operator|{_NAME})"
+    r"(?:(?:,| --| –| —) (?P<title>[^:\n]{1,100})| \((?P<firm>[^()\n]{1,60})\))?"
+    r":(?=[ \t\n]|$)"
+)
+# "Name -- Title" or "Operator" on a line of its own, with the remarks below.
+SPEAKER_HEADING_RE = re.compile(
+    rf"[ \t]*(?:(?P<speaker>{_NAME}) (?:--|–|—) (?P<title>[^\n]{{1,100}}?)|(?P<operator>Operator))[ \t]*\n?"
+)
+# Labels are only looked for this far into a line.
+SPEAKER_LABEL_MAX_CHARS = 200
+
+
+@dataclass(slots=True)
+class SpeakerTurn:
+    section: PreparedSectionName
+    speaker: str | None
+    title: str | None
+    # Offsets into ParsedTranscript.sections[section]; a turn starts at its label line.
+    start: int
+    end: int
+
 
 @dataclass
 class ParsedTranscript:
     sections: dict[PreparedSectionName, str]
 
+    @cached_property
+    def turns(self) -> list[SpeakerTurn]:
+        # Finding turns costs far more than the section split, and ingestion
+        # does not need them (see iter_turns), so only on first access.
+        return [turn for name, text in self.sections.items() for turn in find_speaker_turns(name, text)]
+
 
 def parse_transcript(raw_text: str) -> ParsedTranscript:
     text = raw_text.replace("\r\n", "\n")
 
     lower = text.lower()
-    qa_markers = ["\nq&a", "\nq & a", "question-and-answer session", "questions and answers"]
-
     split_index = None
-    for marker in qa_markers:
+    for marker in QA_MARKERS:
         idx = lower.find(marker)
         if idx != -1:
             split_index = idx
             break
 
     if split_index is None:
-        return ParsedTranscript(sections={"prepared_remarks": text})
+        sections = {"prepared_remarks": text}
+    else:
+        prepared = text[:split_index].strip()
+        qa = text[split_index:].strip()
 
-    prepared = text[:split_index].strip()
-    qa = text[split_index:].strip()
-
-    sections: dict[str, str] = {}
-    if prepared:
-        sections["prepared_remarks"] = prepared
-    if qa:
-        sections["qa"] = qa
+        sections: dict[str, str] = {}
+        if prepared:
+            sections["prepared_remarks"] = prepared
+        if qa:
+            sections["qa"] = qa
 
     return ParsedTranscript(sections=sections)
 
+
+class QASplitFinder:
+    """
+    Incremental version of the Q&A split search in parse_transcript.
+
+    Feed newline-normalized blocks in order. Only a marker-length tail of the
+    previous block is kept, so memory does not grow with the text.
+    """
+
+    _keep = max(len(m) for m in QA_MARKERS) - 1
+
+    def __init__(self) -> None:
+        self._first_match: dict[str, int] = {}
+        self._tail = ""
+        self._offset = 0  # offset of _tail[0] in the lowered text
+
+    def feed(self, block: str) -> None:
+        window = self._tail + block.lower()
+        for marker in QA_MARKERS:
+            if marker not in self._first_match:
+                idx = window.find(marker)
+                if idx != -1:
+                    self._first_match[marker] = self._offset + idx
+        if len(window) > self._keep:
+            self._offset += len(window) - self._keep
+            self._tail = window[-self._keep :]
+        else:
+            self._tail = window
+
+    @property
+    def split(self) -> int | None:
+        """The split for the text fed so far (None if no marker was seen)."""
+        for marker in QA_MARKERS:
+            if marker in self._first_match:
+                return self._first_match[marker]
+        return None
+
+    @property
+    def settled(self) -> bool:
+        """True once more text can no longer move the split."""
+        return QA_MARKERS[0] in self._first_match
+
+    @property
+    def safe_end(self) -> int:
+        """Text before this offset belongs to the prepared remarks whatever follows."""
+        split = self.split
+        if self.settled:
+            return split
+        # A higher-priority marker can still start in the kept tail.
+        scanned = self._offset
+        return scanned if split is None else min(split, scanned)
+
+
+def find_qa_split(blocks: Iterable[str]) -> int | None:
+    """
+    Streaming equivalent of the Q&A split in parse_transcript.
+
+    blocks must already have \\r\\n normalized to \\n.
+    """
+    finder = QASplitFinder()
+    for block in blocks:
+        finder.feed(block)
+        if finder.settled:
+            break
+    return finder.split
+
+
+def normalize_newlines(blocks: Iterable[str]) -> Iterator[str]:
+    """
+    Replace \\r\\n with \\n across block boundaries, as parse_transcript does.
+    """
+    pending_cr = False
+    for block in blocks:
+        if pending_cr:
+            block = "\r" + block
+        # Hold back a trailing \r in case the matching \n is in the next block.
+        pending_cr = block.endswith("\r")
+        if pending_cr:
+            block = block[:-1]
+        block = block.replace("\r\n", "\n")
+        if block:
+            yield block
+    if pending_cr:
+        yield "\r"
+
+
+def _route(blocks: Iterable[str], split_index: int | None, offset: int = 0) -> Iterator[tuple[str, str]]:
+    for block in blocks:
+        if split_index is None or offset + len(block) <= split_index:
+            head, tail = block, ""
+        elif offset >= split_index:
+            head, tail = "", block
+        else:
+            cut = split_index - offset
+            head, tail = block[:cut], block[cut:]
+        offset += len(block)
+
+        if head:
+            yield "prepared_remarks", head
+        if tail:
+            yield "qa", tail
+
+
+def iter_sections(blocks: Iterable[str], split_index: int | None = None) -> Iterator[tuple[str, str]]:
+    """
+    Lazily split newline-normalized transcript text into (section, piece)
+    pairs, the streaming counterpart of parse_transcript.
+
+    With split_index (from find_qa_split) every block is routed as it
+    arrives. Otherwise the split is found on the way: text is yielded as soon
+    as it is known to be prepared remarks, and text after a lower-priority
+    Q&A marker is held back until a "Q&A" heading settles the split or the
+    input ends.
+    """
+    if split_index is not None:
+        yield from _route(blocks, split_index)
+        return
+
+    finder = QASplitFinder()
+    held: deque[str] = deque()
+    skip = 0  # chars of held[0] already yielded
+    routed = 0  # offset up to which text has been yielded
+
+    blocks = iter(blocks)
+    for block in blocks:
+        finder.feed(block)
+        held.append(block)
+        if finder.settled:
+            break
+
+        safe = finder.safe_end
+        while held and routed < safe:
+            first = held[0]
+            cut = min(len(first), skip + safe - routed)
+            yield "prepared_remarks", first[skip:cut]
+            routed += cut - skip
+            if cut == len(first):
+                held.popleft()
+                skip = 0
+            else:
+                skip = cut
+
+    if held:
+        held[0] = held[0][skip:]
+    rest = itertools.chain(held, blocks)
+    yield from _route(rest, finder.split, offset=routed)
+
+
+def match_speaker_label(head: str, line_complete: bool) -> tuple[str, str | None] | None:
+    """
+    (speaker, title) if head, the start of a line, is a speaker label.
+
+    head holds the whole line when line_complete is true, otherwise its
+    first SPEAKER_LABEL_MAX_CHARS characters.
+    """
+    m = SPEAKER_LABEL_RE.match(head)
+    if m is not None and (line_complete or m.end() < len(head)):
+        return m["speaker"], m["title"] or m["firm"]
+    if line_complete:
+        m = SPEAKER_HEADING_RE.fullmatch(head)
+        if m is not None:
+            return m["speaker"] or m["operator"], m["title"]
+    return None
+
+
+@dataclass(slots=True)
+class TextPiece:
+    section: PreparedSectionName
+    # Increments at every new section and speaker label.
+    turn: int
+    speaker: str | None
+    title: str | None
+    text: str
+
+
+class TurnSplitter:
+    """
+    Splits a stream of (section, text piece) pairs at speaker labels.
+
+    Only the start of the current line (at most SPEAKER_LABEL_MAX_CHARS) is
+    buffered while deciding whether it is a label; everything else passes
+    straight through.
+    """
+
+    def __init__(self) -> None:
+        self.section: str | None = None
+        self.turn = 0
+        self.speaker: str | None = None
+        self.title: str | None = None
+        self._head: str | None = ""  # start of the current line, None once decided
+        self._out: list[str] = []
+
+    def feed(self, section: str, piece: str) -> list[TextPiece]:
+        pieces: list[TextPiece] = []
+        if section != self.section:
+            self._finish_line(pieces)
+            self._flush(pieces)
+            # The current speaker keeps talking across the Q&A split.
+            self.section = section
+            self.turn += 1
+            self._head = ""
+
+        pos = 0
+        while pos < len(piece):
+            if self._head is None:
+                nl = piece.find("\n", pos)
+                if nl == -1:
+                    self._out.append(piece[pos:])
+                    break
+                self._out.append(piece[pos : nl + 1])
+                self._head = ""
+                pos = nl + 1
+                continue
+
+            room = SPEAKER_LABEL_MAX_CHARS - len(self._head)
+            nl = piece.find("\n", pos, pos + room)
+            if nl != -1:
+                self._head += piece[pos : nl + 1]
+                pos = nl + 1
+                self._decide(pieces, line_complete=True)
+                self._head = ""
+            else:
+                self._head += piece[pos : pos + room]
+                pos += room
+                if len(self._head) >= SPEAKER_LABEL_MAX_CHARS:
+                    self._decide(pieces, line_complete=False)
+
+        self._flush(pieces)
+        return pieces
+
+    def close(self) -> list[TextPiece]:
+        pieces: list[TextPiece] = []
+        self._finish_line(pieces)
+        self._flush(pieces)
+        return pieces
+
+    def _finish_line(self, pieces: list[TextPiece]) -> None:
+        if self._head:
+            self._decide(pieces, line_complete=True)
+        self._head = None
+
+    def _decide(self, pieces: list[TextPiece], line_complete: bool) -> None:
+        label = match_speaker_label(self._head, line_complete)
+        if label is not None:
+            self._flush(pieces)
+            self.turn += 1
+            self.speaker, self.title = label
+        self._out.append(self._head)
+        self._head = None
+
+    def _flush(self, pieces: list[TextPiece]) -> None:
+        if self._out:
+            pieces.append(TextPiece(self.section, self.turn, self.speaker, self.title, "".join(self._out)))
+            self._out.clear()
+
+
+def iter_turns(sections: Iterable[tuple[str, str]]) -> Iterator[TextPiece]:
+    """
+    Lazily split (section, piece) pairs from iter_sections into speaker turns.
+    """
+    splitter = TurnSplitter()
+    for section, piece in sections:
+        yield from splitter.feed(section, piece)
+    yield from splitter.close()
+
+
+def find_speaker_turns(section: str, text: str) -> list[SpeakerTurn]:
+    splitter = TurnSplitter()
+    turns: list[SpeakerTurn] = []
+    current_turn = None
+    offset = 0
+    for piece in splitter.feed(section, text) + splitter.close():
+        if piece.turn == current_turn:
+            turns[-1].end += len(piece.text)
+        else:
+            current_turn = piece.turn
+            turns.append(SpeakerTurn(section, piece.speaker, piece.title, offset, offset + len(piece.text)))
+        offset += len(piece.text)
+    return turns
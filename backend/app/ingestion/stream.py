@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import codecs
+from collections.abc import Iterable, Iterator
+from typing import BinaryIO
+
+from backend.app.ingestion.chunker import ChunkInput, iter_chunks
+from backend.app.ingestion.parser import iter_sections, iter_turns
+
+
+class TranscriptTooLargeError(ValueError):
+    pass
+
+
+def iter_text_blocks(
+    fileobj: BinaryIO,
+    block_size: int,
+    max_bytes: int,
+    normalize_newlines: bool = True,
+) -> Iterator[str]:
+    """
+    Read a UTF-8 file in fixed-size blocks and yield the decoded text, by
+    default with \\r\\n normalized to \\n as parse_transcript does.
+
+    Raises TranscriptTooLargeError once more than max_bytes have been read and
+    UnicodeDecodeError on invalid UTF-8.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    total = 0
+    pending_cr = False
+
+    while True:
+        raw = fileobj.read(block_size)
+        final = not raw
+        total += len(raw)
+        if total > max_bytes:
+            raise TranscriptTooLargeError(f"Transcript exceeds the {max_bytes} byte upload limit.")
+
+        text = decoder.decode(raw, final=final)
+        if normalize_newlines:
+            if pending_cr:
+                text = "\r" + text
+            # Hold back a trailing \r in case the matching \n is in the next block.
+            pending_cr = not final and text.endswith("\r")
+            if pending_cr:
+                text = text[:-1]
+            text = text.replace("\r\n", "\n")
+
+        if text:
+            yield text
+        if final:
+            return
+
+
+def iter_transcript_chunks(
+    blocks: Iterable[str],
+    split_index: int | None = None,
+    max_chars: int = 1200,
+    overlap_chars: int = 200,
+) -> Iterator[ChunkInput]:
+    """
+    Chunk newline-normalized transcript text on the fly, one speaker turn at
+    a time.
+
+    Pass the split found by find_qa_split to keep memory bounded; without it
+    the split is found in the same pass (see parser.iter_sections).
+    """
+    return iter_chunks(iter_turns(iter_sections(blocks, split_index)), max_chars=max_chars, overlap_chars=overlap_chars)
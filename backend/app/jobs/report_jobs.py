@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from backend.app.config import get_settings
+from backend.app.db import get_sessionmaker
+from backend.app.llm.report_store import ReportKey, get_cached_report, get_or_create_report
+from backend.app.models import (
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    Chunk,
+    Document,
+    Report,
+    ReportJob,
+)
+from backend.app.schemas import ReportJobOut
+
+
+logger = logging.getLogger(__name__)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def enqueue_report_job(db: Session, key: ReportKey) -> ReportJob:
+    """
+    Queue a report generation job for key.
+
+    An identical queued/running job is reused, and a key that is already in
+    the report cache gets a job that is immediately marked as succeeded.
+    """
+    ticker, quarter, prev_quarter = key
+
+    active = db.scalars(
+        select(ReportJob)
+        .where(ReportJob.ticker == ticker)
+        .where(ReportJob.quarter == quarter)
+        .where(ReportJob.prev_quarter == prev_quarter)
+        .where(ReportJob.status.in_([JOB_QUEUED, JOB_RUNNING]))
+        .order_by(ReportJob.created_at.desc())
+    ).first()
+    if active is not None:
+        return active
+
+    job = ReportJob(ticker=ticker, quarter=quarter, prev_quarter=prev_quarter, status=JOB_QUEUED, attempts=0)
+
+    cached = get_cached_report(db, key)
+    if cached is not None:
+        job.status = JOB_SUCCEEDED
+        job.report_id = cached.id
+        job.finished_at = _now()
+
+    db.add(job)
+    db.commit()
+    return job
+
+
+def enqueue_refresh_job(db: Session, key: ReportKey) -> ReportJob | None:
+    """
+    Queue the regeneration of a stale report for key, unless a job for key
+    finished or failed within REPORT_REFRESH_COOLDOWN_SECONDS; then None.
+    Keeps repeated reads of a stale report from paying for a generation each.
+    """
+    ticker, quarter, prev_quarter = key
+    cooldown = timedelta(seconds=get_settings().report_refresh_cooldown_seconds)
+    recent = db.scalars(
+        select(ReportJob.id)
+        .where(ReportJob.ticker == ticker)
+        .where(ReportJob.quarter == quarter)
+        .where(ReportJob.prev_quarter == prev_quarter)
+        .where(ReportJob.status.in_([JOB_SUCCEEDED, JOB_FAILED]))
+        .where(ReportJob.finished_at > func.now() - cooldown)
+        .limit(1)
+    ).first()
+    if recent is not None:
+        return None
+    return enqueue_report_job(db, key)
+
+
+def _fully_embedded(db: Session, document_id) -> bool:
+    pending = db.scalar(
+        select(func.count())
+        .select_from(Chunk)
+        .where(Chunk.document_id == document_id)
+        .where(Chunk.embedding.is_(None))
+    )
+    return pending == 0
+
+
+def _adjacent_document(db: Session, doc: Document, later: bool) -> Document | None:
+    # Quarters are YYYY_QN, so string order is chronological.
+    stmt = select(Document).where(Document.ticker == doc.ticker)
+    if later:
+        stmt = stmt.where(Document.quarter > doc.quarter).order_by(Document.quarter.asc())
+    else:
+        stmt = stmt.where(Document.quarter < doc.quarter).order_by(Document.quarter.desc())
+    return db.scalars(stmt.limit(1)).first()
+
+
+def precompute_reports_for_document(db: Session, document_id) -> list[ReportJob]:
+    """
+    Queue the comparison reports a freshly embedded document takes part in,
+    so the first request for them is a cache hit: this quarter against the
+    ticker's previous one and, when quarters were embedded out of order, the
+    next quarter against this one.
+
+    A pair is skipped while either document still has chunks without
+    embeddings; the other document's embedding run queues it instead.
+    """
+    if not get_settings().report_precompute:
+        return []
+
+    doc = db.get(Document, document_id)
+    if doc is None or not _fully_embedded(db, doc.id):
+        return []
+
+    pairs = []
+    prev_doc = _adjacent_document(db, doc, later=False)
+    if prev_doc is not None:
+        pairs.append((doc, prev_doc))
+    next_doc = _adjacent_document(db, doc, later=True)
+    if next_doc is not None:
+        pairs.append((next_doc, doc))
+
+    jobs: list[ReportJob] = []
+    for current, prev in pairs:
+        other = prev if current is doc else current
+        if not _fully_embedded(db, other.id):
+            logger.info("Not precomputing %s %s vs %s: embeddings incomplete", doc.ticker, current.quarter, prev.quarter)
+            continue
+        job = enqueue_report_job(db, (doc.ticker, current.quarter, prev.quarter))
+        logger.info("Precompute job %s (%s) for %s %s vs %s", job.id, job.status, doc.ticker, current.quarter, prev.quarter)
+        jobs.append(job)
+    return jobs
+
+
+def report_job_out(db: Session, job: ReportJob) -> ReportJobOut:
+    data = None
+    if job.status == JOB_SUCCEEDED and job.report_id is not None:
+        report = db.get(Report, job.report_id)
+        data = report.report_data if report is not None else None
+
+    return ReportJobOut(
+        id=job.id,
+        status=job.status,
+        ticker=job.ticker,
+        quarter=job.quarter,
+        prev_quarter=job.prev_quarter,
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        data=data,
+    )
+
+
+def claim_next_job(db: Session) -> ReportJob | None:
+    """
+    Atomically move the oldest queued job to running.
+
+    FOR UPDATE SKIP LOCKED lets any number of workers poll the same table
+    without claiming a job twice or blocking on each other.
+    """
+    stmt = (
+        select(ReportJob)
+        .where(ReportJob.status == JOB_QUEUED)
+        .order_by(ReportJob.created_at.asc())
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job = db.scalars(stmt).first()
+    if job is None:
+        db.rollback()
+        return None
+
+    job.status = JOB_RUNNING
+    job.started_at = _now()
+    job.heartbeat_at = func.now()
+    job.attempts += 1
+    db.commit()
+    return job
+
+
+def requeue_stale_jobs(db: Session) -> int:
+    """
+    Requeue running jobs whose heartbeat stopped (their worker or request
+    died), or fail them once they have used up their attempts.
+    """
+    settings = get_settings()
+    cutoff = func.now() - timedelta(seconds=settings.report_job_timeout_seconds)
+    stale = (
+        ReportJob.status == JOB_RUNNING,
+        func.coalesce(ReportJob.heartbeat_at, ReportJob.started_at) < cutoff,
+    )
+
+    failed = db.execute(
+        update(ReportJob)
+        .where(*stale, ReportJob.attempts >= settings.report_job_max_attempts)
+        .values(status=JOB_FAILED, error="Worker timed out.", finished_at=_now())
+    ).rowcount
+    requeued = db.execute(
+        update(ReportJob).where(*stale).values(status=JOB_QUEUED, started_at=None, heartbeat_at=None)
+    ).rowcount
+    db.commit()
+
+    if failed or requeued:
+        logger.warning("Report jobs: requeued %d stale job(s), failed %d", requeued, failed)
+    return int(requeued or 0)
+
+
+def run_job(db: Session, job: ReportJob) -> None:
+    try:
+        # The running job is the generation lease, kept alive by its heartbeat.
+        report = get_or_create_report(db, (job.ticker, job.quarter, job.prev_quarter), lease_id=job.id)
+    except Exception as exc:
+        logger.exception("Report job %s failed", job.id)
+        db.rollback()
+        job.status = JOB_FAILED
+        job.error = f"{type(exc).__name__}: {exc}"
+        job.finished_at = _now()
+        db.commit()
+        return
+
+    job.status = JOB_SUCCEEDED
+    job.report_id = report.id
+    job.error = None
+    job.finished_at = _now()
+    db.commit()
+
+
+def run_worker(stop_event: threading.Event | None = None) -> None:
+    """
+    Poll the report_jobs table and execute jobs until stop_event is set.
+    """
+    settings = get_settings()
+    stop_event = stop_event or threading.Event()
+    SessionLocal = get_sessionmaker()
+    last_sweep = 0.0
+
+    while not stop_event.is_set():
+        try:
+            with SessionLocal() as db:
+                now = _now().timestamp()
+                if now - last_sweep > settings.report_job_timeout_seconds / 2:
+                    requeue_stale_jobs(db)
+                    last_sweep = now
+
+                job = claim_next_job(db)
+                if job is not None:
+                    logger.info("Running report job %s (%s %s vs %s)", job.id, job.ticker, job.quarter, job.prev_quarter)
+                    run_job(db, job)
+                    continue
+        except Exception:
+            logger.exception("Report worker iteration failed")
+
+        stop_event.wait(settings.report_job_poll_interval)
+
+
+def start_worker_threads(count: int, stop_event: threading.Event) -> list[threading.Thread]:
+    threads = [
+        threading.Thread(target=run_worker, args=(stop_event,), name=f"report-worker-{i}", daemon=True)
+        for i in range(count)
+    ]
+    for t in threads:
+        t.start()
+    return threads
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import threading
+
+from backend.app.jobs.report_jobs import start_worker_threads
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run report generation workers.")
+    parser.add_argument("--concurrency", type=int, default=2, help="Number of jobs to run in parallel.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(threadName)s %(message)s")
+
+    stop_event = threading.Event()
+    threads = start_worker_threads(args.concurrency, stop_event)
+    try:
+        for t in threads:
+            while t.is_alive():
+                t.join(timeout=1.0)
+    except KeyboardInterrupt:
+        stop_event.set()
+        for t in threads:
+            t.join()
+
+
+if __name__ == "__main__":
+    main()
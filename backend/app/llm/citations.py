@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import re
+from typing import Any
+
+
+# Short labels for context chunks in the compact prompt: C<n> for the current
+# quarter, P<n> for the previous one.
+ALIAS_PREFIXES = {"current": "C", "prev": "P"}
+
+# "[C12]", "[C12, P4]" or "(C12)" as cited by the model.
+ALIAS_GROUP_RE = re.compile(r"[\[(]\s*([CP]\d+(?:\s*[,;]\s*[CP]\d+)*)\s*[\])]")
+ALIAS_RE = re.compile(r"[CP]\d+")
+
+# "(document_id: <id>, chunk_id: <id>, chunk_index: <n>)", see format_citation;
+# chunk_index may be left out.
+CITATION_RE = re.compile(
+    r"\(\s*document_id:\s*(?P<document_id>[^\s,()]+)\s*,\s*chunk_id:\s*(?P<chunk_id>[^\s,()]+)"
+    r"\s*(?:,\s*chunk_index:\s*(?P<chunk_index>\d+)\s*)?\)"
+)
+
+
+def format_citation(document_id: str, chunk_id: str, chunk_index: int) -> str:
+    return f"(document_id: {document_id}, chunk_id: {chunk_id}, chunk_index: {chunk_index})"
+
+
+def alias_context(context_chunks: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], dict[str, dict[str, Any]]]:
+    """
+    Replace the ids of context chunks with short aliases.
+
+    Returns the compact chunks ({"id", "speaker", "text"}, in the same order)
+    and a map from alias to the original chunk.
+    """
+    counters = dict.fromkeys(ALIAS_PREFIXES.values(), 0)
+    compact: list[dict[str, Any]] = []
+    aliases: dict[str, dict[str, Any]] = {}
+    for chunk in context_chunks:
+        prefix = ALIAS_PREFIXES[chunk["role"]]
+        counters[prefix] += 1
+        alias = f"{prefix}{counters[prefix]}"
+        aliases[alias] = chunk
+        compact.append({"id": alias, "speaker": chunk.get("speaker"), "text": chunk["text"]})
+    return compact, aliases
+
+
+def expand_citations(value: Any, aliases: dict[str, dict[str, Any]]) -> tuple[Any, int]:
+    """
+    Rewrite alias citations in every string of a generated report into the
+    canonical "(document_id: ..., chunk_id: ..., chunk_index: ...)" form.
+
+    Returns the rewritten value and the number of aliases expanded. A group
+    that names an unknown alias is left as written.
+    """
+    expanded = 0
+
+    def replace(match: re.Match[str]) -> str:
+        nonlocal expanded
+        names = ALIAS_RE.findall(match.group(1))
+        if not all(name in aliases for name in names):
+            return match.group(0)
+        expanded += len(names)
+        return " ".join(
+            format_citation(aliases[n]["document_id"], aliases[n]["chunk_id"], aliases[n]["chunk_index"]) for n in names
+        )
+
+    def walk(v: Any) -> Any:
+        if isinstance(v, str):
+            return ALIAS_GROUP_RE.sub(replace, v)
+        if isinstance(v, list):
+            return [walk(item) for item in v]
+        if isinstance(v, dict):
+            return {key: walk(item) for key, item in v.items()}
+        return v
+
+    return walk(value), expanded
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from backend.app.models import Chunk
+
+
+# Rough chars-per-token ratio for budgeting and logging; no tokenizer call.
+CHARS_PER_TOKEN = 4
+
+# Shortest shared text treated as chunk overlap rather than a coincidence.
+MIN_OVERLAP_CHARS = 20
+
+
+def text_overlap(first: str, second: str) -> int:
+    """
+    Length of the longest suffix of first that is also a prefix of second
+    (the window overlap between consecutive chunks), or 0 if it is shorter
+    than MIN_OVERLAP_CHARS.
+    """
+    if len(second) < MIN_OVERLAP_CHARS:
+        return 0
+    probe = second[:MIN_OVERLAP_CHARS]
+    start = max(0, len(first) - len(second))
+    pos = first.find(probe, start)
+    while pos != -1:
+        if second.startswith(first[pos:]):
+            return len(first) - pos
+        pos = first.find(probe, pos + 1)
+    return 0
+
+
+@dataclass
+class _Candidate:
+    chunk: Chunk
+    role: str
+    relevance: float = 0.0
+    # Overlap with the chunk right before / after it in the same section.
+    overlap_prev: int = 0
+    overlap_next: int = 0
+
+
+def assemble_context(
+    results: list[list[list[Chunk]]],
+    roles: list[str],
+    token_budget: int | None = None,
+    mmr_lambda: float = 0.7,
+) -> list[dict[str, Any]]:
+    """
+    Turn retrieval results ([list][document] chunks, ranked) into the report
+    context.
+
+    Every chunk is scored by the reciprocal ranks it got across the lists.
+    Chunks are then picked by maximal marginal relevance (relevance against
+    cosine similarity to the chunks already picked, using the stored
+    embeddings) until the next pick would exceed token_budget. A chunk that
+    continues one already picked only costs its new text.
+
+    The picks come back in transcript order, one entry per chunk (the unit
+    of citation). The text a chunk shares with a picked chunk right before
+    it is cut, so merge_spans can join them into one continuous passage.
+    """
+    candidates: dict[tuple[str, str], _Candidate] = {}
+    for per_document in results:
+        for chunks, role in zip(per_document, roles):
+            for rank, chunk in enumerate(chunks):
+                key = (role, str(chunk.id))
+                candidate = candidates.get(key)
+                if candidate is None:
+                    candidate = candidates[key] = _Candidate(chunk=chunk, role=role)
+                candidate.relevance += 1.0 / (rank + 1)
+    if not candidates:
+        return []
+
+    pool = list(candidates.values())
+    by_position = {(c.role, c.chunk.section, c.chunk.chunk_index): i for i, c in enumerate(pool)}
+    for i, c in enumerate(pool):
+        j = by_position.get((c.role, c.chunk.section, c.chunk.chunk_index + 1))
+        if j is not None:
+            overlap = text_overlap(c.chunk.text, pool[j].chunk.text)
+            c.overlap_next = pool[j].overlap_prev = overlap
+
+    selected = _select_mmr(pool, by_position, token_budget, mmr_lambda)
+    selected.sort(key=lambda i: (roles.index(pool[i].role), pool[i].chunk.section, pool[i].chunk.chunk_index))
+
+    chosen = set(selected)
+    context: list[dict[str, Any]] = []
+    for i in selected:
+        c = pool[i]
+        text = c.chunk.text
+        if by_position.get((c.role, c.chunk.section, c.chunk.chunk_index - 1)) in chosen and c.overlap_prev:
+            text = text[c.overlap_prev :].lstrip()
+            if not text:
+                continue
+        context.append(
+            {
+                "role": c.role,
+                "section": c.chunk.section,
+                "speaker": c.chunk.speaker,
+                "document_id": str(c.chunk.document_id),
+                "chunk_id": str(c.chunk.id),
+                "chunk_index": c.chunk.chunk_index,
+                "text": text,
+            }
+        )
+    return context
+
+
+def merge_spans(
+    context_chunks: list[dict[str, Any]],
+    parts: list[dict[str, Any]],
+    span_fields: tuple[str, ...],
+) -> list[dict[str, Any]]:
+    """
+    Group assembled context chunks into spans of consecutive chunks (same
+    role and section, chunk_index + 1) for the prompt.
+
+    parts holds what the prompt shows of each chunk, in the same order. A
+    span carries span_fields of its first chunk once and the parts of its
+    chunks under "chunks", so every part stays citable on its own.
+    """
+    spans: list[dict[str, Any]] = []
+    previous: dict[str, Any] | None = None
+    for chunk, part in zip(context_chunks, parts):
+        if (
+            previous is not None
+            and chunk["role"] == previous["role"]
+            and chunk["section"] == previous["section"]
+            and chunk["chunk_index"] == previous["chunk_index"] + 1
+        ):
+            spans[-1]["chunks"].append(part)
+        else:
+            spans.append({**{name: chunk[name] for name in span_fields}, "chunks": [part]})
+        previous = chunk
+    return spans
+
+
+def _select_mmr(
+    pool: list[_Candidate],
+    by_position: dict[tuple[str, str, int], int],
+    token_budget: int | None,
+    mmr_lambda: float,
+) -> list[int]:
+    n = len(pool)
+    relevance = np.array([c.relevance for c in pool], dtype=np.float32)
+    relevance /= relevance.max()
+
+    dim = Chunk.embedding.type.dim
+    vectors = np.zeros((n, dim), dtype=np.float32)
+    for i, c in enumerate(pool):
+        if c.chunk.embedding is not None:
+            vectors[i] = c.chunk.embedding
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.where(norms == 0, 1, norms)
+    similarity = vectors @ vectors.T
+
+    chars = np.array([len(c.chunk.text) for c in pool], dtype=np.int64)
+    max_similarity = np.zeros(n, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    budget_chars = None if token_budget is None else token_budget * CHARS_PER_TOKEN
+    used_chars = 0
+    selected: list[int] = []
+
+    while available.any():
+        scores = mmr_lambda * relevance - (1 - mmr_lambda) * max_similarity
+        fits = available if budget_chars is None else available & (chars <= budget_chars - used_chars)
+        if not fits.any():
+            break
+        best = int(np.argmax(np.where(fits, scores, -np.inf)))
+
+        used_chars += int(chars[best])
+        selected.append(best)
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, similarity[best])
+
+        # Neighbours of the pick no longer pay for the text they share with it.
+        c = pool[best]
+        for delta, overlap in ((-1, c.overlap_prev), (1, c.overlap_next)):
+            j = by_position.get((c.role, c.chunk.section, c.chunk.chunk_index + delta))
+            if j is not None and available[j]:
+                chars[j] -= overlap
+
+    return selected
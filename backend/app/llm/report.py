@@ -1,17 +1,36 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
 from functools import lru_cache
+from collections.abc import AsyncIterator
 from typing import Any
 
 from google import genai
-from sqlalchemy import select
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from backend.app.config import get_settings
-from backend.app.llm.prompts import BASE_REPORT_INSTRUCTIONS, REPORT_JSON_SCHEMA
+from backend.app.llm.citations import alias_context, expand_citations, format_citation
+from backend.app.llm.context import CHARS_PER_TOKEN, assemble_context, merge_spans
+from backend.app.llm.prompts import (
+    BASE_REPORT_INSTRUCTIONS,
+    COMPACT_CITATION_REMINDER,
+    COMPACT_REPORT_INSTRUCTIONS,
+    FULL_CITATION_REMINDER,
+    REPORT_JSON_SCHEMA,
+)
 from backend.app.models import Chunk, Document
-from backend.app.rag.retriever import retrieve_top_k
+from backend.app.rag.retriever import RetrievalMode, aretrieve_top_k_many, retrieve_top_k_many
+
+
+logger = logging.getLogger(__name__)
 
 
 @lru_cache(maxsize=1)
@@ -24,6 +43,7 @@ def _get_client() -> genai.Client:
 REPORT_MODEL = "gemini-2.5-flash"
 
 
+
 def _get_document_by_ticker_and_quarter(db: Session, ticker: str, quarter: str) -> Document | None:
     stmt = (
         select(Document)
@@ -33,83 +53,129 @@ def _get_document_by_ticker_and_quarter(db: Session, ticker: str, quarter: str)
     return db.scalars(stmt).first()
 
 
+REPORT_QUERIES_BY_THEME: dict[str, list[str]] = {
+    "guidance": [
+        "guidance outlook",
+        "revenue outlook",
+        "EPS guidance",
+        "full year outlook",
+    ],
+    "growth_drivers": [
+        "growth drivers",
+        "AI revenue",
+        "cloud growth",
+        "subscriptions growth",
+    ],
+    "risks": [
+        "macro headwinds",
+        "regulatory risk",
+        "currency headwind",
+        "competition",
+    ],
+    "margin_dynamics": [
+        "operating margin",
+        "margin expansion",
+        "depreciation headwind",
+        "cost of revenues",
+    ],
+    "qa_pressure_points": [
+        "analyst concerns",
+        "follow up question",
+        "can you elaborate",
+        "clarify risk",
+    ],
+}
+
+REPORT_QUERIES: list[str] = [q for theme_queries in REPORT_QUERIES_BY_THEME.values() for q in theme_queries]
+
+# Guidance mostly comes from the CFO, so their turns that mention it are added
+# to the context directly instead of relying on the vector search alone.
+GUIDANCE_SPEAKER_TITLES = ("%CFO%", "%Chief Financial Officer%")
+GUIDANCE_TERMS = ("%guidance%", "%outlook%", "%expect%")
+
+
+def _context_documents(current_doc: Document, prev_doc: Document | None) -> tuple[list[str], list[str]]:
+    document_ids = [str(current_doc.id)]
+    roles = ["current"]
+    if prev_doc is not None:
+        document_ids.append(str(prev_doc.id))
+        roles.append("prev")
+    return document_ids, roles
+
+
+def _assemble_context(results: list[list[list[Chunk]]], roles: list[str]) -> list[dict[str, Any]]:
+    settings = get_settings()
+    return assemble_context(
+        results,
+        roles,
+        token_budget=settings.report_context_token_budget or None,
+        mmr_lambda=settings.report_context_mmr_lambda,
+    )
+
+
+def _guidance_turn_chunks(db: Session, document_ids: list[str], per_document: int = 6) -> list[list[Chunk]]:
+    """
+    Chunks of CFO turns that talk about guidance, per document, in transcript
+    order. One query for all documents.
+    """
+    ranked = (
+        select(
+            Chunk.id,
+            func.row_number()
+            .over(partition_by=Chunk.document_id, order_by=(Chunk.section.asc(), Chunk.chunk_index.asc()))
+            .label("rank"),
+        )
+        .where(Chunk.document_id.in_(document_ids))
+        .where(or_(*[Chunk.speaker_title.ilike(p) for p in GUIDANCE_SPEAKER_TITLES]))
+        .where(or_(*[Chunk.text.ilike(t) for t in GUIDANCE_TERMS]))
+        .subquery()
+    )
+    stmt = (
+        select(Chunk)
+        .join(ranked, Chunk.id == ranked.c.id)
+        .where(ranked.c.rank <= per_document)
+        .order_by(Chunk.section.asc(), Chunk.chunk_index.asc())
+    )
+    by_document: dict[str, list[Chunk]] = {document_id: [] for document_id in document_ids}
+    for chunk in db.scalars(stmt):
+        by_document[str(chunk.document_id)].append(chunk)
+    return [by_document[document_id] for document_id in document_ids]
+
+
 def _collect_context_for_report(
     db: Session,
     current_doc: Document,
     prev_doc: Document | None,
     k_per_query: int = 4,
+    mode: RetrievalMode | None = None,
 ) -> list[dict[str, Any]]:
-    queries_by_theme: dict[str, list[str]] = {
-        "guidance": [
-            "guidance outlook",
-            "revenue outlook",
-            "EPS guidance",
-            "full year outlook",
-        ],
-        "growth_drivers": [
-            "growth drivers",
-            "AI revenue",
-            "cloud growth",
-            "subscriptions growth",
-        ],
-        "risks": [
-            "macro headwinds",
-            "regulatory risk",
-            "currency headwind",
-            "competition",
-        ],
-        "margin_dynamics": [
-            "operating margin",
-            "margin expansion",
-            "depreciation headwind",
-            "cost of revenues",
-        ],
-        "qa_pressure_points": [
-            "analyst concerns",
-            "follow up question",
-            "can you elaborate",
-            "clarify risk",
-        ],
-    }
+    document_ids, roles = _context_documents(current_doc, prev_doc)
+    results = retrieve_top_k_many(db, queries=REPORT_QUERIES, document_ids=document_ids, k=k_per_query, mode=mode)
+    results.append(_guidance_turn_chunks(db, document_ids))
+    return _assemble_context(results, roles)
 
-    seen_chunk_ids: set[tuple[str, str]] = set()
-    context: list[dict[str, Any]] = []
-
-    def add_chunks(chunks: list[Chunk], role: str) -> None:
-        for c in chunks:
-            key = (role, str(c.id))
-            if key in seen_chunk_ids:
-                continue
-            seen_chunk_ids.add(key)
-            context.append(
-                {
-                    "role": role,
-                    "section": c.section,
-                    "document_id": str(c.document_id),
-                    "chunk_id": str(c.id),
-                    "chunk_index": c.chunk_index,
-                    "text": c.text,
-                }
-            )
-
-    for theme, queries in queries_by_theme.items():
-        for q in queries:
-            current_chunks = retrieve_top_k(db, query=q, k=k_per_query, document_id=str(current_doc.id))
-            add_chunks(current_chunks, role="current")
-
-            if prev_doc is not None:
-                prev_chunks = retrieve_top_k(db, query=q, k=k_per_query, document_id=str(prev_doc.id))
-                add_chunks(prev_chunks, role="prev")
-
-    return context
 
+async def _acollect_context_for_report(
+    db: AsyncSession,
+    current_doc: Document,
+    prev_doc: Document | None,
+    k_per_query: int = 4,
+    mode: RetrievalMode | None = None,
+) -> list[dict[str, Any]]:
+    document_ids, roles = _context_documents(current_doc, prev_doc)
+    results = await aretrieve_top_k_many(
+        db, queries=REPORT_QUERIES, document_ids=document_ids, k=k_per_query, mode=mode
+    )
+    results.append(await db.run_sync(_guidance_turn_chunks, document_ids))
+    return _assemble_context(results, roles)
 
-def generate_quarter_comparison_report(
+
+def _resolve_documents(
     db: Session,
     ticker: str,
     quarter: str,
     prev_quarter: str | None,
-) -> dict[str, Any]:
+) -> tuple[Document, Document | None, str | None]:
     current_doc = _get_document_by_ticker_and_quarter(db, ticker, quarter)
     if current_doc is None:
         raise ValueError("Current quarter document not found.")
@@ -120,41 +186,142 @@ def generate_quarter_comparison_report(
         if prev_doc is None:
             prev_quarter = None
 
-    context_chunks = _collect_context_for_report(db, current_doc, prev_doc)
+    return current_doc, prev_doc, prev_quarter
+
 
-    if len(context_chunks) == 0:
+def _context_spans(
+    context_chunks: list[dict[str, Any]], compact: bool
+) -> tuple[list[dict[str, Any]], dict[str, dict[str, Any]] | None]:
+    """
+    The prompt's view of the context: spans of consecutive chunks, each chunk
+    with its full citation or, when compact, its alias (see alias_context).
+    Returns the spans and the alias map (None without aliases).
+    """
+    if not compact:
+        parts = [{name: c[name] for name in ("chunk_id", "chunk_index", "speaker", "text")} for c in context_chunks]
+        return merge_spans(context_chunks, parts, ("role", "document_id", "section")), None
+    parts, aliases = alias_context(context_chunks)
+    return merge_spans(context_chunks, parts, ("section",)), aliases
+
+
+def _build_report_contents(
+    ticker: str,
+    quarter: str,
+    prev_quarter: str | None,
+    context_spans: list[dict[str, Any]],
+    compact: bool = False,
+) -> list[dict[str, Any]]:
+    if len(context_spans) == 0:
         raise RuntimeError("No context chunks retrieved. Ensure documents are embedded.")
 
     payload: dict[str, Any] = {
         "ticker": ticker.upper().strip(),
         "quarter": quarter.upper().strip(),
         "prev_quarter": prev_quarter.upper().strip() if prev_quarter else None,
-        "context_chunks": context_chunks,
-        "schema": json.loads(REPORT_JSON_SCHEMA),
+        "context_spans": context_spans,
     }
+    if compact:
+        # The schema is already its own part of the prompt.
+        instruction, reminder = COMPACT_REPORT_INSTRUCTIONS, COMPACT_CITATION_REMINDER
+        payload_text = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    else:
+        payload["schema"] = json.loads(REPORT_JSON_SCHEMA)
+        instruction, reminder = BASE_REPORT_INSTRUCTIONS, FULL_CITATION_REMINDER
+        payload_text = json.dumps(payload, ensure_ascii=False)
 
-    instruction = BASE_REPORT_INSTRUCTIONS
+    return [
+        {
+            "role": "user",
+            "parts": [
+                {"text": instruction},
+                {"text": "Here is the JSON schema you must follow:"},
+                {"text": REPORT_JSON_SCHEMA},
+                {"text": "Here is the input payload with metadata and context chunks:"},
+                {"text": payload_text},
+                {"text": reminder},
+            ],
+        }
+    ]
 
-    client = _get_client()
-    response = client.models.generate_content(
-        model=REPORT_MODEL,
-        contents=[
-            {
-                "role": "user",
-                "parts": [
-                    {"text": instruction},
-                    {"text": "Here is the JSON schema you must follow:"},
-                    {"text": REPORT_JSON_SCHEMA},
-                    {"text": "Here is the input payload with metadata and context chunks:"},
-                    {"text": json.dumps(payload, ensure_ascii=False)},
-                    {
-                        "text": "Now produce a single JSON object that follows the schema and only uses evidence from the provided chunks. IMPORTANT: Every evidence quote must include its citation in the format: '(document_id: <id>, chunk_id: <id>, chunk_index: <num>)' at the end of the quote.",
-                    },
-                ],
-            }
-        ],
+
+def _contents_chars(contents: list[dict[str, Any]]) -> int:
+    return sum(len(part["text"]) for message in contents for part in message["parts"])
+
+
+@dataclass
+class ReportPrompt:
+    contents: list[dict[str, Any]]
+    # Alias -> context chunk when the prompt uses compact citations.
+    aliases: dict[str, dict[str, Any]] | None
+    prompt_chars: int
+    # Estimated prompt chars the aliases save over full UUID citations.
+    prompt_chars_saved: int
+
+
+def _build_report_prompt(
+    ticker: str,
+    quarter: str,
+    prev_quarter: str | None,
+    context_chunks: list[dict[str, Any]],
+) -> ReportPrompt:
+    compact = get_settings().report_compact_citations
+    spans, aliases = _context_spans(context_chunks, compact)
+    contents = _build_report_contents(ticker, quarter, prev_quarter, spans, compact=compact)
+    if aliases is None:
+        return ReportPrompt(contents=contents, aliases=None, prompt_chars=_contents_chars(contents), prompt_chars_saved=0)
+
+    # Each chunk is labelled with its alias instead of the ids of the full
+    # citation the model would otherwise have to copy.
+    saved = sum(
+        len(format_citation(chunk["document_id"], chunk["chunk_id"], chunk["chunk_index"])) - len(alias)
+        for alias, chunk in aliases.items()
+    )
+    return ReportPrompt(contents=contents, aliases=aliases, prompt_chars=_contents_chars(contents), prompt_chars_saved=saved)
+
+
+def report_prompt_fingerprint() -> str:
+    """
+    sha256 of what shapes a report besides the model and the transcripts:
+    the instructions and citation mode in use, the schema and the retrieval
+    queries. Stored reports with another fingerprint are regenerated.
+    """
+    if get_settings().report_compact_citations:
+        instruction, reminder = COMPACT_REPORT_INSTRUCTIONS, COMPACT_CITATION_REMINDER
+    else:
+        instruction, reminder = BASE_REPORT_INSTRUCTIONS, FULL_CITATION_REMINDER
+    queries = json.dumps([REPORT_QUERIES, GUIDANCE_SPEAKER_TITLES, GUIDANCE_TERMS])
+    raw = "\0".join([instruction, reminder, REPORT_JSON_SCHEMA, queries])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _finish_report(prompt: ReportPrompt, report: dict[str, Any], usage: Any, ticker: str, quarter: str) -> dict[str, Any]:
+    """
+    Rewrite alias citations in a parsed report to the canonical form and log
+    token usage and the estimated savings of compact citations.
+    """
+    output_chars_saved = 0
+    if prompt.aliases is not None:
+        compact_chars = len(json.dumps(report, ensure_ascii=False))
+        report, expanded = expand_citations(report, prompt.aliases)
+        output_chars_saved = len(json.dumps(report, ensure_ascii=False)) - compact_chars
+        logger.debug("Expanded %d citation aliases in the %s %s report", expanded, ticker, quarter)
+
+    logger.info(
+        "Report %s %s: %s prompt / %s output tokens; compact citations saved ~%d prompt and ~%d output tokens "
+        "(%d / %d chars)",
+        ticker,
+        quarter,
+        getattr(usage, "prompt_token_count", None),
+        getattr(usage, "candidates_token_count", None),
+        prompt.prompt_chars_saved // CHARS_PER_TOKEN,
+        output_chars_saved // CHARS_PER_TOKEN,
+        prompt.prompt_chars_saved,
+        output_chars_saved,
     )
+    return report
 
+
+def _parse_report_response(response: Any) -> dict[str, Any]:
     if not response.candidates:
         raise RuntimeError("Gemini returned no candidates for report generation.")
 
@@ -163,6 +330,10 @@ def generate_quarter_comparison_report(
 
     text = response.candidates[0].content.parts[0].text  # type: ignore[assignment]
 
+    return _parse_report_text(text, response)
+
+
+def _parse_report_text(text: str | None, response: Any = None) -> dict[str, Any]:
     if not text or not text.strip():
         raise RuntimeError(f"Gemini returned empty text. Full response: {response}")
 
@@ -182,3 +353,143 @@ def generate_quarter_comparison_report(
 
     return report
 
+
+def generate_quarter_comparison_report(
+    db: Session,
+    ticker: str,
+    quarter: str,
+    prev_quarter: str | None,
+) -> dict[str, Any]:
+    current_doc, prev_doc, prev_quarter = _resolve_documents(db, ticker, quarter, prev_quarter)
+
+    context_chunks = _collect_context_for_report(db, current_doc, prev_doc)
+    prompt = _build_report_prompt(ticker, quarter, prev_quarter, context_chunks)
+
+    # Give the connection back to the pool for the (long) model call.
+    db.commit()
+
+    client = _get_client()
+    response = client.models.generate_content(model=REPORT_MODEL, contents=prompt.contents)
+
+    report = _parse_report_response(response)
+    return _finish_report(prompt, report, getattr(response, "usage_metadata", None), ticker, quarter)
+
+
+async def agenerate_quarter_comparison_report(
+    db: AsyncSession,
+    ticker: str,
+    quarter: str,
+    prev_quarter: str | None,
+) -> dict[str, Any]:
+    current_doc, prev_doc, prev_quarter = await db.run_sync(_resolve_documents, ticker, quarter, prev_quarter)
+
+    context_chunks = await _acollect_context_for_report(db, current_doc, prev_doc)
+    prompt = _build_report_prompt(ticker, quarter, prev_quarter, context_chunks)
+
+    # Give the connection back to the pool for the (long) model call.
+    await db.commit()
+
+    client = _get_client()
+    response = await client.aio.models.generate_content(model=REPORT_MODEL, contents=prompt.contents)
+
+    report = _parse_report_response(response)
+    return _finish_report(prompt, report, getattr(response, "usage_metadata", None), ticker, quarter)
+
+
+async def _astream_model_chunks(contents: list[dict[str, Any]]) -> AsyncIterator[Any]:
+    """
+    The chunks of a streamed generate_content call, read on an executor
+    thread and handed to the event loop through a queue. The SDK's
+    aio.models.generate_content_stream reads the response body synchronously
+    (google-genai 0.3.0), which would stall the loop for the whole stream.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[Any] = asyncio.Queue()
+    done = object()
+    stop = threading.Event()
+
+    def put(item: Any) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            # The loop is gone; nobody is reading any more.
+            stop.set()
+
+    def produce() -> None:
+        try:
+            stream = _get_client().models.generate_content_stream(model=REPORT_MODEL, contents=contents)
+            for chunk in stream:
+                if stop.is_set():
+                    break
+                put(chunk)
+        except Exception as exc:
+            put(exc)
+        finally:
+            put(done)
+
+    producer = loop.run_in_executor(None, produce)
+    try:
+        while (item := await queue.get()) is not done:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Lets the thread stop at its next chunk if the client went away.
+        stop.set()
+    await producer
+
+
+async def astream_quarter_comparison_report(
+    db: AsyncSession,
+    ticker: str,
+    quarter: str,
+    prev_quarter: str | None,
+) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+    """
+    agenerate_quarter_comparison_report as a stream of (event, data) pairs.
+
+    Yields "stage" events (documents, retrieval, prompt, llm_start), one
+    "token" event per streamed model chunk and finally a "report" event with
+    the parsed report. Nothing is stored. Raises ValueError like
+    _resolve_documents before the first event if the current quarter is
+    missing.
+    """
+    started = time.perf_counter()
+
+    def elapsed_ms() -> int:
+        return int((time.perf_counter() - started) * 1000)
+
+    current_doc, prev_doc, prev_quarter = await db.run_sync(_resolve_documents, ticker, quarter, prev_quarter)
+    yield "stage", {
+        "stage": "documents",
+        "quarter": current_doc.quarter,
+        "prev_quarter": prev_quarter,
+        "elapsed_ms": elapsed_ms(),
+    }
+
+    context_chunks = await _acollect_context_for_report(db, current_doc, prev_doc)
+    yield "stage", {"stage": "retrieval", "context_chunks": len(context_chunks), "elapsed_ms": elapsed_ms()}
+
+    prompt = _build_report_prompt(ticker, quarter, prev_quarter, context_chunks)
+    yield "stage", {
+        "stage": "prompt",
+        "prompt_chars": prompt.prompt_chars,
+        "estimated_prompt_tokens": prompt.prompt_chars // CHARS_PER_TOKEN,
+        "elapsed_ms": elapsed_ms(),
+    }
+
+    # Give the connection back to the pool for the (long) model call.
+    await db.commit()
+
+    yield "stage", {"stage": "llm_start", "model": REPORT_MODEL, "elapsed_ms": elapsed_ms()}
+    parts: list[str] = []
+    usage = None
+    async for chunk in _astream_model_chunks(prompt.contents):
+        usage = getattr(chunk, "usage_metadata", None) or usage
+        text = chunk.text
+        if text:
+            parts.append(text)
+            yield "token", {"text": text}
+
+    report = _parse_report_text("".join(parts))
+    yield "report", _finish_report(prompt, report, usage, ticker, quarter)
@@ -0,0 +1,615 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any
+
+from sqlalchemy import JSON, func, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.app.config import get_settings
+from backend.app.llm.report import (
+    REPORT_MODEL,
+    agenerate_quarter_comparison_report,
+    astream_quarter_comparison_report,
+    generate_quarter_comparison_report,
+    report_prompt_fingerprint,
+)
+from backend.app.models import JOB_FAILED, JOB_RUNNING, JOB_SUCCEEDED, Document, Report, ReportJob
+
+
+logger = logging.getLogger(__name__)
+
+ReportKey = tuple[str, str, str | None]
+
+
+def normalize_report_key(ticker: str, quarter: str, prev_quarter: str | None) -> ReportKey:
+    return (
+        ticker.upper().strip(),
+        quarter.upper().strip(),
+        prev_quarter.upper().strip() if prev_quarter else None,
+    )
+
+
+def report_json(data: dict[str, Any]) -> str:
+    """
+    Canonical JSON of report_data: the body of GET /reports and the input
+    of its content hash.
+    """
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def report_content_hash(data: dict[str, Any]) -> str:
+    return hashlib.sha256(report_json(data).encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class ReportVersion:
+    """
+    What a report is generated from besides its key. A stored report whose
+    version differs from the current one is stale.
+    """
+
+    model: str
+    prompt_fingerprint: str
+    # sha256 over the content hashes of the current and previous transcripts;
+    # None while a transcript's hash is unknown (see scripts/init_db.py).
+    source_hash: str | None
+
+    def matches(self, report: Any) -> bool:
+        # report is a Report or a row with the same columns. An unknown source
+        # matches nothing, so such reports count as stale.
+        return (
+            self.source_hash is not None
+            and report.model == self.model
+            and report.prompt_fingerprint == self.prompt_fingerprint
+            and report.source_hash == self.source_hash
+        )
+
+
+def report_version(db: Session, key: ReportKey) -> ReportVersion | None:
+    """
+    The version a report for key would be generated with now, or None if the
+    current quarter's document does not exist. A missing previous quarter is
+    part of the version too, so ingesting it later makes the report stale.
+    Documents without a content_hash give an unknown source_hash.
+    """
+    ticker, quarter, prev_quarter = key
+    quarters = [quarter] if prev_quarter is None else [quarter, prev_quarter]
+    rows = db.execute(
+        select(Document.quarter, Document.content_hash)
+        .where(Document.ticker == ticker)
+        .where(Document.quarter.in_(quarters))
+    ).all()
+    return _version_from_hashes(key, {row.quarter: row.content_hash for row in rows})
+
+
+def _document_hashes(key: ReportKey):
+    """
+    Scalar subquery of {quarter: content_hash} for the documents of key, as
+    report_version reads them (NULL if there are none).
+    """
+    ticker, quarter, prev_quarter = key
+    quarters = [quarter] if prev_quarter is None else [quarter, prev_quarter]
+    return (
+        select(func.json_object_agg(Document.quarter, Document.content_hash, type_=JSON))
+        .where(Document.ticker == ticker)
+        .where(Document.quarter.in_(quarters))
+        .scalar_subquery()
+    )
+
+
+def _version_from_hashes(key: ReportKey, hashes: dict[str, str | None]) -> ReportVersion | None:
+    _, quarter, prev_quarter = key
+    if quarter not in hashes:
+        return None
+
+    source_hash = None
+    if None not in hashes.values():
+        raw = f"{hashes[quarter]}|{hashes.get(prev_quarter) or ''}" if prev_quarter else hashes[quarter]
+        source_hash = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    return ReportVersion(
+        model=REPORT_MODEL,
+        prompt_fingerprint=report_prompt_fingerprint(),
+        source_hash=source_hash,
+    )
+
+
+def get_stored_report(db: Session, key: ReportKey) -> Report | None:
+    """
+    The report stored for key, current or stale.
+    """
+    ticker, quarter, prev_quarter = key
+    stmt = (
+        select(Report)
+        .where(Report.ticker == ticker)
+        .where(Report.quarter == quarter)
+        .where(Report.prev_quarter == prev_quarter)
+    )
+    return db.scalars(stmt).first()
+
+
+def get_cached_report(db: Session, key: ReportKey) -> Report | None:
+    """
+    The report stored for key if it is current, else None. Stale reports
+    count as misses and are replaced when regenerated.
+    """
+    report = get_stored_report(db, key)
+    if report is None:
+        return None
+    version = report_version(db, key)
+    if version is None or not version.matches(report):
+        logger.info("Stored report %s for %s is stale", report.id, key)
+        return None
+    return report
+
+
+def get_report_etag(db: Session, key: ReportKey) -> tuple[uuid.UUID, str, bool] | None:
+    """
+    (report id, content hash, current) for key without loading report_data,
+    or None if no report is stored. One statement, read-only: the hash of a
+    report stored before content_hash existed is computed here but only
+    written by scripts/init_db.py.
+    """
+    ticker, quarter, prev_quarter = key
+    row = db.execute(
+        select(
+            Report.id,
+            Report.content_hash,
+            Report.model,
+            Report.prompt_fingerprint,
+            Report.source_hash,
+            _document_hashes(key).label("document_hashes"),
+        )
+        .where(Report.ticker == ticker)
+        .where(Report.quarter == quarter)
+        .where(Report.prev_quarter == prev_quarter)
+    ).first()
+    if row is None:
+        return None
+    version = _version_from_hashes(key, row.document_hashes or {})
+    current = version is not None and version.matches(row)
+    if row.content_hash is not None:
+        return row.id, row.content_hash, current
+
+    data = db.scalar(select(Report.report_data).where(Report.id == row.id))
+    return row.id, report_content_hash(data), current
+
+
+def find_stale_reports(db: Session) -> list[tuple[uuid.UUID, ReportKey]]:
+    """
+    (report id, key) of every stored report that is no longer current.
+    """
+    rows = db.execute(
+        select(
+            Report.id,
+            Report.ticker,
+            Report.quarter,
+            Report.prev_quarter,
+            Report.model,
+            Report.prompt_fingerprint,
+            Report.source_hash,
+        ).order_by(Report.ticker, Report.quarter)
+    ).all()
+    stale = []
+    for row in rows:
+        key = (row.ticker, row.quarter, row.prev_quarter)
+        version = report_version(db, key)
+        if version is None or not version.matches(row):
+            stale.append((row.id, key))
+    return stale
+
+
+def store_report(db: Session, key: ReportKey, data: dict, version: ReportVersion) -> Report:
+    """
+    Store a report generated at version, replacing a stale one for key. If a
+    report of the same version was stored meanwhile, that one is kept.
+    """
+    ticker, quarter, prev_quarter = key
+    fields = {
+        "report_data": data,
+        "content_hash": report_content_hash(data),
+        "model": version.model,
+        "prompt_fingerprint": version.prompt_fingerprint,
+        "source_hash": version.source_hash,
+    }
+
+    existing = get_stored_report(db, key)
+    if existing is not None:
+        if version.matches(existing):
+            return existing
+        for name, value in fields.items():
+            setattr(existing, name, value)
+        existing.created_at = func.now()
+        db.commit()
+        db.refresh(existing)
+        return existing
+
+    report = Report(ticker=ticker, quarter=quarter, prev_quarter=prev_quarter, **fields)
+    db.add(report)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Someone else stored the same key first; theirs wins.
+        db.rollback()
+        existing = get_stored_report(db, key)
+        if existing is None:
+            raise
+        return existing
+    return report
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.error: BaseException | None = None
+
+
+_flights: dict[ReportKey, _Flight] = {}
+_flights_lock = threading.Lock()
+
+
+def report_lock_id(key: ReportKey) -> int:
+    """
+    Stable signed 64-bit id for pg_advisory_xact_lock, shared by all workers.
+    """
+    raw = "report:" + "|".join(part or "" for part in key)
+    return int.from_bytes(hashlib.sha256(raw.encode("utf-8")).digest()[:8], "big", signed=True)
+
+
+# Across processes, the one generating a report holds a lease: a running
+# report_jobs row for the key whose heartbeat_at is refreshed while the model
+# runs. The key's advisory lock is only held for the short transactions that
+# check the cache, take the lease and store the report, never across the
+# model call, so waiting callers do not pin pooled connections.
+LEASE_POLL_SECONDS = 0.5
+
+
+def _lease_timeout() -> timedelta:
+    return timedelta(seconds=get_settings().report_job_timeout_seconds)
+
+
+def _heartbeat_interval() -> float:
+    return get_settings().report_job_timeout_seconds / 4
+
+
+def _heartbeat_stmt(lease_id: uuid.UUID):
+    return (
+        update(ReportJob)
+        .where(ReportJob.id == lease_id)
+        .where(ReportJob.status == JOB_RUNNING)
+        .values(heartbeat_at=func.now())
+    )
+
+
+def _claim_generation(db: Session, key: ReportKey, lease_id: uuid.UUID | None) -> tuple[Report | None, uuid.UUID | None]:
+    """
+    One short transaction under the key's advisory lock: (current report,
+    None) on a hit, (None, lease id) when the caller may generate, or
+    (None, None) while someone else's lease is alive. lease_id is the caller's
+    own running job, if it has one; otherwise a lease row is created.
+    """
+    db.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": report_lock_id(key)})
+    if lease_id is not None:
+        # Keeps a waiting worker's job from looking dead.
+        db.execute(_heartbeat_stmt(lease_id))
+
+    cached = get_cached_report(db, key)
+    if cached is not None:
+        db.commit()
+        return cached, None
+
+    ticker, quarter, prev_quarter = key
+    stmt = (
+        select(ReportJob.id)
+        .where(ReportJob.ticker == ticker)
+        .where(ReportJob.quarter == quarter)
+        .where(ReportJob.prev_quarter == prev_quarter)
+        .where(ReportJob.status == JOB_RUNNING)
+        .where(ReportJob.heartbeat_at > func.now() - _lease_timeout())
+    )
+    if lease_id is not None:
+        stmt = stmt.where(ReportJob.id != lease_id)
+    if db.scalars(stmt.limit(1)).first() is not None:
+        db.commit()
+        return None, None
+
+    if lease_id is None:
+        lease = ReportJob(
+            ticker=ticker,
+            quarter=quarter,
+            prev_quarter=prev_quarter,
+            status=JOB_RUNNING,
+            attempts=1,
+            started_at=func.now(),
+            heartbeat_at=func.now(),
+        )
+        db.add(lease)
+        db.flush()
+        lease_id = lease.id
+    db.commit()
+    return None, lease_id
+
+
+def _store_leased(db: Session, key: ReportKey, data: dict, version: ReportVersion) -> Report:
+    db.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": report_lock_id(key)})
+    report = store_report(db, key, data, version)
+    db.commit()
+    return report
+
+
+def _release_lease(db: Session, lease_id: uuid.UUID, report: Report | None, error: BaseException | None) -> None:
+    db.execute(
+        update(ReportJob)
+        .where(ReportJob.id == lease_id)
+        .values(
+            status=JOB_FAILED if report is None else JOB_SUCCEEDED,
+            report_id=None if report is None else report.id,
+            error=None if error is None else f"{type(error).__name__}: {error}",
+            finished_at=func.now(),
+        )
+    )
+    db.commit()
+
+
+@contextmanager
+def _heartbeat(db: Session, lease_id: uuid.UUID) -> Iterator[None]:
+    # Beats on short connections of its own; db stays with the caller.
+    bind = db.get_bind()
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(_heartbeat_interval()):
+            try:
+                with bind.begin() as conn:
+                    conn.execute(_heartbeat_stmt(lease_id))
+            except Exception:
+                logger.exception("Heartbeat of report lease %s failed", lease_id)
+
+    thread = threading.Thread(target=beat, name=f"report-lease-{lease_id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _generate_with_lease(db: Session, key: ReportKey, lease_id: uuid.UUID | None) -> Report:
+    owned = lease_id is None
+    while True:
+        cached, lease = _claim_generation(db, key, lease_id)
+        if cached is not None:
+            return cached
+        if lease is not None:
+            break
+        time.sleep(LEASE_POLL_SECONDS)
+
+    report = None
+    error = None
+    try:
+        # Taken before generating: if a transcript changes meanwhile, the
+        # stored report is stale at once.
+        version = report_version(db, key)
+        ticker, quarter, prev_quarter = key
+        with _heartbeat(db, lease):
+            data = generate_quarter_comparison_report(
+                db=db,
+                ticker=ticker,
+                quarter=quarter,
+                prev_quarter=prev_quarter,
+            )
+        report = _store_leased(db, key, data, version)
+        return report
+    except BaseException as exc:
+        error = exc
+        db.rollback()
+        raise
+    finally:
+        # A caller-supplied lease is its job, which the caller finishes.
+        if owned:
+            _release_lease(db, lease, report, error)
+
+
+def get_or_create_report(db: Session, key: ReportKey, lease_id: uuid.UUID | None = None) -> Report:
+    """
+    Return the cached report for key, generating and storing it on a miss
+    or when the stored one is stale.
+
+    Concurrent misses for the same key are coalesced: within a process the
+    first caller generates and the others wait for it, and across workers the
+    generator holds a lease (a running report job with a heartbeat) while the
+    others poll until the report is stored or the lease is gone. A report job
+    worker passes its running job as lease_id.
+    """
+    cached = get_cached_report(db, key)
+    if cached is not None:
+        return cached
+
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        report = get_cached_report(db, key)
+        if report is None:
+            raise RuntimeError("Coalesced report generation finished without storing a report.")
+        return report
+
+    try:
+        return _generate_with_lease(db, key, lease_id)
+    except BaseException as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+
+_async_flights: dict[tuple[asyncio.AbstractEventLoop, ReportKey], asyncio.Future[None]] = {}
+
+
+@asynccontextmanager
+async def _aheartbeat(db: AsyncSession, lease_id: uuid.UUID) -> AsyncIterator[None]:
+    bind = db.bind
+
+    async def beat() -> None:
+        while True:
+            await asyncio.sleep(_heartbeat_interval())
+            try:
+                async with bind.begin() as conn:
+                    await conn.execute(_heartbeat_stmt(lease_id))
+            except Exception:
+                logger.exception("Heartbeat of report lease %s failed", lease_id)
+
+    task = asyncio.create_task(beat())
+    try:
+        yield
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+async def _agenerate_with_lease(db: AsyncSession, key: ReportKey) -> Report:
+    while True:
+        cached, lease = await db.run_sync(_claim_generation, key, None)
+        if cached is not None:
+            return cached
+        if lease is not None:
+            break
+        await asyncio.sleep(LEASE_POLL_SECONDS)
+
+    report = None
+    error = None
+    try:
+        version = await db.run_sync(report_version, key)
+        ticker, quarter, prev_quarter = key
+        async with _aheartbeat(db, lease):
+            data = await agenerate_quarter_comparison_report(
+                db=db,
+                ticker=ticker,
+                quarter=quarter,
+                prev_quarter=prev_quarter,
+            )
+        report = await db.run_sync(_store_leased, key, data, version)
+        return report
+    except BaseException as exc:
+        error = exc
+        await db.rollback()
+        raise
+    finally:
+        await db.run_sync(_release_lease, lease, report, error)
+
+
+async def aget_or_create_report(db: AsyncSession, key: ReportKey) -> Report:
+    """
+    Async variant of get_or_create_report with the same coalescing rules;
+    waiting requests park on a future instead of a thread.
+    """
+    cached = await db.run_sync(get_cached_report, key)
+    if cached is not None:
+        return cached
+
+    loop = asyncio.get_running_loop()
+    flight_key = (loop, key)
+    flight = _async_flights.get(flight_key)
+    if flight is not None:
+        try:
+            await asyncio.shield(flight)
+        except asyncio.CancelledError:
+            if not flight.cancelled():
+                raise
+            # The leading request was cancelled (client went away); take over.
+            return await aget_or_create_report(db, key)
+        report = await db.run_sync(get_cached_report, key)
+        if report is None:
+            raise RuntimeError("Coalesced report generation finished without storing a report.")
+        return report
+
+    flight = _async_flights[flight_key] = loop.create_future()
+    try:
+        report = await _agenerate_with_lease(db, key)
+    except asyncio.CancelledError:
+        flight.cancel()
+        raise
+    except BaseException as exc:
+        flight.set_exception(exc)
+        # Mark the exception as retrieved when nobody else was waiting.
+        flight.exception()
+        raise
+    else:
+        flight.set_result(None)
+        return report
+    finally:
+        _async_flights.pop(flight_key, None)
+
+
+async def astream_report(db: AsyncSession, key: ReportKey) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+    """
+    (event, data) pairs for POST /report/stream: a current stored report is
+    returned at once as a "cached" stage and a "report" event. Otherwise the stages
+    and tokens of astream_quarter_comparison_report are passed through, and
+    the report is stored before the final "report" event.
+
+    Streams are coalesced like get_or_create_report: the stream that takes
+    the key's lease generates; while another request or job holds it, a
+    "waiting" stage is sent and its report follows as a cached one.
+    """
+    cached = await db.run_sync(get_cached_report, key)
+    waiting = False
+    while cached is None:
+        cached, lease = await db.run_sync(_claim_generation, key, None)
+        if lease is not None:
+            break
+        if cached is None:
+            if not waiting:
+                waiting = True
+                yield "stage", {"stage": "waiting"}
+            await asyncio.sleep(LEASE_POLL_SECONDS)
+    if cached is not None:
+        yield "stage", {"stage": "cached"}
+        yield "report", {"data": cached.report_data, "content_hash": cached.content_hash}
+        return
+
+    report = None
+    error = None
+    try:
+        version = await db.run_sync(report_version, key)
+        ticker, quarter, prev_quarter = key
+        async with _aheartbeat(db, lease):
+            async for event, data in astream_quarter_comparison_report(db, ticker, quarter, prev_quarter):
+                if event == "report":
+                    report = await db.run_sync(_store_leased, key, data, version)
+                else:
+                    yield event, data
+        if report is None:
+            raise RuntimeError("Report stream ended without a report.")
+    except BaseException as exc:
+        # Includes GeneratorExit when the client goes away: the lease is
+        # released as failed and a waiting request takes over.
+        error = exc
+        await db.rollback()
+        raise
+    finally:
+        await db.run_sync(_release_lease, lease, report, error)
+    yield "report", {"data": report.report_data, "content_hash": report.content_hash}
@@ -1,203 +1,288 @@
 from __future__ import annotations
 
+import uuid
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
 from typing import Any
 
+from sqlalchemy import select
+from sqlalchemy.orm import Session
 
-def validate_report_structure(report: dict[str, Any]) -> list[str]:
-    """
-    Validates that the report follows the expected schema structure.
-    Returns a list of validation errors (empty if valid).
-    """
-    errors: list[str] = []
+from backend.app.llm.citations import CITATION_RE
+from backend.app.models import Chunk
 
-    required_fields = ["ticker", "quarter", "summary", "guidance", "growth_drivers", "risks", "margin_dynamics", "qa_pressure_points"]
-    for field in required_fields:
-        if field not in report:
-            errors.append(f"Missing required field: {field}")
 
-    if "summary" in report:
-        summary = report["summary"]
-        if not isinstance(summary, dict):
-            errors.append("Summary must be a dictionary")
-        else:
-            if "high_level" not in summary:
-                errors.append("Summary missing 'high_level' field")
-            if "tone" not in summary:
-                errors.append("Summary missing 'tone' field")
-            elif summary["tone"] not in ["neutral", "positive", "negative"]:
-                errors.append(f"Invalid tone value: {summary['tone']}")
+# Section -> (claim field, evidence fields); drives every check below.
+SECTION_FIELDS: dict[str, tuple[str, tuple[str, ...]]] = {
+    "guidance": ("claim", ("evidence_current", "evidence_prev")),
+    "growth_drivers": ("claim", ("evidence",)),
+    "risks": ("claim", ("evidence_current", "evidence_first_mention")),
+    "margin_dynamics": ("claim", ("evidence",)),
+    "qa_pressure_points": ("theme", ("evidence_question", "evidence_answer")),
+}
 
-    list_fields = ["guidance", "growth_drivers", "risks", "margin_dynamics", "qa_pressure_points"]
-    for field in list_fields:
-        if field in report:
-            if not isinstance(report[field], list):
-                errors.append(f"{field} must be a list")
-            else:
-                for idx, item in enumerate(report[field]):
-                    if not isinstance(item, dict):
-                        errors.append(f"{field}[{idx}] must be a dictionary")
+REQUIRED_FIELDS = ("ticker", "quarter", "summary", *SECTION_FIELDS)
+SUMMARY_TONES = ("neutral", "positive", "negative")
 
-    return errors
+# Bump when the checks or the scoring change; batch results are keyed on it.
+EVALUATOR_VERSION = 2
 
+# Cited chunk ids looked up per query, well below Postgres' bind parameter limit.
+CITATION_LOOKUP_BATCH = 10000
 
-def validate_evidence_coverage(report: dict[str, Any]) -> dict[str, Any]:
-    """
-    Checks that claims have evidence quotes.
-    Returns metrics about evidence coverage.
-    """
-    metrics = {
-        "total_claims": 0,
-        "claims_with_evidence": 0,
-        "claims_without_evidence": 0,
-        "evidence_coverage_rate": 0.0,
-        "details": [],
-    }
-
-    def check_evidence(item: dict[str, Any], claim_field: str, evidence_fields: list[str], section_name: str) -> None:
-        claim = item.get(claim_field, "")
-        if not claim or claim.strip() == "":
-            return
 
-        metrics["total_claims"] += 1
-        has_evidence = False
+def _has_text(value: Any) -> bool:
+    return isinstance(value, str) and value.strip() != "" and value.strip().lower() != "unknown"
 
-        for evidence_field in evidence_fields:
-            evidence = item.get(evidence_field)
-            if evidence and isinstance(evidence, str) and evidence.strip() and evidence.strip().lower() != "unknown":
-                has_evidence = True
-                break
-
-        if has_evidence:
-            metrics["claims_with_evidence"] += 1
-        else:
-            metrics["claims_without_evidence"] += 1
-            metrics["details"].append({
-                "section": section_name,
-                "claim": claim[:100] + "..." if len(claim) > 100 else claim,
-                "missing_evidence_fields": evidence_fields,
-            })
 
-    if "guidance" in report and isinstance(report["guidance"], list):
-        for item in report["guidance"]:
-            check_evidence(item, "claim", ["evidence_current", "evidence_prev"], "guidance")
+@dataclass
+class _Citation:
+    document_id: str
+    chunk_id: str
+    # None until checked against the database, then None (ok), "unknown_chunk" or "wrong_document".
+    problem: str | None = None
 
-    if "growth_drivers" in report and isinstance(report["growth_drivers"], list):
-        for item in report["growth_drivers"]:
-            check_evidence(item, "claim", ["evidence"], "growth_drivers")
 
-    if "risks" in report and isinstance(report["risks"], list):
-        for item in report["risks"]:
-            check_evidence(item, "claim", ["evidence_current", "evidence_first_mention"], "risks")
+@dataclass
+class _EvidenceField:
+    section: str
+    index: int
+    name: str
+    citations: list[_Citation]
 
-    if "margin_dynamics" in report and isinstance(report["margin_dynamics"], list):
-        for item in report["margin_dynamics"]:
-            check_evidence(item, "claim", ["evidence"], "margin_dynamics")
+    def result(self) -> dict[str, Any]:
+        invalid = [c for c in self.citations if c.problem is not None]
+        return {
+            "field": f"{self.section}[{self.index}].{self.name}",
+            "citations": len(self.citations),
+            "invalid_citations": [
+                {"document_id": c.document_id, "chunk_id": c.chunk_id, "reason": c.problem} for c in invalid
+            ],
+            "ok": bool(self.citations) and not invalid,
+        }
 
-    if "qa_pressure_points" in report and isinstance(report["qa_pressure_points"], list):
-        for item in report["qa_pressure_points"]:
-            check_evidence(item, "theme", ["evidence_question", "evidence_answer"], "qa_pressure_points")
 
-    if metrics["total_claims"] > 0:
-        metrics["evidence_coverage_rate"] = metrics["claims_with_evidence"] / metrics["total_claims"]
-
-    return metrics
-
-
-def validate_citation_format(report: dict[str, Any]) -> dict[str, Any]:
+@dataclass
+class ReportScan:
     """
-    Checks if evidence quotes contain citation references (document_id, chunk_id).
-    Returns metrics about citation quality.
+    What scan_report found in one report, before citations are verified.
     """
-    metrics = {
-        "total_evidence_fields": 0,
-        "evidence_with_citations": 0,
-        "evidence_without_citations": 0,
-        "citation_rate": 0.0,
-    }
-
-    def check_citations(item: dict[str, Any], evidence_fields: list[str]) -> None:
-        for field in evidence_fields:
-            evidence = item.get(field)
-            if evidence and isinstance(evidence, str) and evidence.strip() and evidence.strip().lower() != "unknown":
-                metrics["total_evidence_fields"] += 1
-                if "document_id" in evidence.lower() or "chunk_id" in evidence.lower():
-                    metrics["evidence_with_citations"] += 1
-                else:
-                    metrics["evidence_without_citations"] += 1
-
-    if "guidance" in report and isinstance(report["guidance"], list):
-        for item in report["guidance"]:
-            check_citations(item, ["evidence_current", "evidence_prev"])
-
-    if "growth_drivers" in report and isinstance(report["growth_drivers"], list):
-        for item in report["growth_drivers"]:
-            check_citations(item, ["evidence"])
-
-    if "risks" in report and isinstance(report["risks"], list):
-        for item in report["risks"]:
-            check_citations(item, ["evidence_current", "evidence_first_mention"])
 
-    if "margin_dynamics" in report and isinstance(report["margin_dynamics"], list):
-        for item in report["margin_dynamics"]:
-            check_citations(item, ["evidence"])
+    structure_errors: list[str] = field(default_factory=list)
+    total_claims: int = 0
+    claims_without_evidence: list[dict[str, Any]] = field(default_factory=list)
+    evidence_fields: list[_EvidenceField] = field(default_factory=list)
 
-    if "qa_pressure_points" in report and isinstance(report["qa_pressure_points"], list):
-        for item in report["qa_pressure_points"]:
-            check_citations(item, ["evidence_question", "evidence_answer"])
-
-    if metrics["total_evidence_fields"] > 0:
-        metrics["citation_rate"] = metrics["evidence_with_citations"] / metrics["total_evidence_fields"]
-
-    return metrics
 
+def scan_report(report: dict[str, Any]) -> ReportScan:
+    """
+    One pass over the report: schema structure, evidence per claim and the
+    citations of every evidence field.
+    """
+    scan = ReportScan()
+    for name in REQUIRED_FIELDS:
+        if name not in report:
+            scan.structure_errors.append(f"Missing required field: {name}")
 
-def evaluate_report(report: dict[str, Any]) -> dict[str, Any]:
+    if "summary" in report:
+        summary = report["summary"]
+        if not isinstance(summary, dict):
+            scan.structure_errors.append("Summary must be a dictionary")
+        else:
+            if "high_level" not in summary:
+                scan.structure_errors.append("Summary missing 'high_level' field")
+            if "tone" not in summary:
+                scan.structure_errors.append("Summary missing 'tone' field")
+            elif summary["tone"] not in SUMMARY_TONES:
+                scan.structure_errors.append(f"Invalid tone value: {summary['tone']}")
+
+    for section, (claim_field, evidence_fields) in SECTION_FIELDS.items():
+        if section not in report:
+            continue
+        items = report[section]
+        if not isinstance(items, list):
+            scan.structure_errors.append(f"{section} must be a list")
+            continue
+
+        for idx, item in enumerate(items):
+            if not isinstance(item, dict):
+                scan.structure_errors.append(f"{section}[{idx}] must be a dictionary")
+                continue
+
+            has_evidence = False
+            for name in evidence_fields:
+                evidence = item.get(name)
+                if not _has_text(evidence):
+                    continue
+                has_evidence = True
+                citations = [
+                    _Citation(document_id=m.group("document_id"), chunk_id=m.group("chunk_id"))
+                    for m in CITATION_RE.finditer(evidence)
+                ]
+                scan.evidence_fields.append(_EvidenceField(section=section, index=idx, name=name, citations=citations))
+
+            claim = item.get(claim_field)
+            if isinstance(claim, str) and claim.strip():
+                scan.total_claims += 1
+                if not has_evidence:
+                    scan.claims_without_evidence.append(
+                        {
+                            "section": section,
+                            "claim": claim[:100] + "..." if len(claim) > 100 else claim,
+                            "missing_evidence_fields": list(evidence_fields),
+                        }
+                    )
+    return scan
+
+
+def _lookup_chunk_documents(db: Session, chunk_ids: Iterable[str]) -> dict[str, str]:
     """
-    Comprehensive evaluation of a report.
-    Returns evaluation results with scores and issues.
+    chunk_id -> document_id for the cited chunks that exist. Ids that are not
+    UUIDs cannot exist and are not sent to the database.
     """
-    structure_errors = validate_report_structure(report)
-    evidence_metrics = validate_evidence_coverage(report)
-    citation_metrics = validate_citation_format(report)
+    wanted: list[uuid.UUID] = []
+    for chunk_id in chunk_ids:
+        try:
+            wanted.append(uuid.UUID(chunk_id))
+        except ValueError:
+            continue
+
+    found: dict[str, str] = {}
+    for start in range(0, len(wanted), CITATION_LOOKUP_BATCH):
+        batch = wanted[start : start + CITATION_LOOKUP_BATCH]
+        for chunk_id, document_id in db.execute(select(Chunk.id, Chunk.document_id).where(Chunk.id.in_(batch))):
+            found[str(chunk_id)] = str(document_id)
+    return found
+
+
+def _verify_citations(db: Session, scans: Sequence[ReportScan]) -> None:
+    citations = [c for scan in scans for f in scan.evidence_fields for c in f.citations]
+    documents = _lookup_chunk_documents(db, {c.chunk_id.lower() for c in citations})
+    for c in citations:
+        document_id = documents.get(c.chunk_id.lower())
+        if document_id is None:
+            c.problem = "unknown_chunk"
+        elif document_id != c.document_id.lower():
+            c.problem = "wrong_document"
+
+
+def _evaluation(scan: ReportScan, verified: bool) -> dict[str, Any]:
+    total_claims = scan.total_claims
+    claims_without = len(scan.claims_without_evidence)
+    evidence_metrics = {
+        "total_claims": total_claims,
+        "claims_with_evidence": total_claims - claims_without,
+        "claims_without_evidence": claims_without,
+        "evidence_coverage_rate": (total_claims - claims_without) / total_claims if total_claims else 0.0,
+        "details": scan.claims_without_evidence,
+    }
 
-    evaluation = {
-        "is_valid": len(structure_errors) == 0,
-        "structure_errors": structure_errors,
-        "evidence_coverage": evidence_metrics,
-        "citation_quality": citation_metrics,
-        "overall_score": 0.0,
-        "recommendations": [],
+    fields = [f.result() for f in scan.evidence_fields]
+    total_fields = len(fields)
+    with_citations = sum(1 for f in fields if f["ok"])
+    with_invalid = sum(1 for f in fields if f["invalid_citations"])
+    invalid_citations = sum(len(f["invalid_citations"]) for f in fields)
+    citation_metrics = {
+        "total_evidence_fields": total_fields,
+        "evidence_with_citations": with_citations,
+        "evidence_without_citations": total_fields - with_citations - with_invalid,
+        "evidence_with_invalid_citations": with_invalid,
+        "citation_rate": with_citations / total_fields if total_fields else 0.0,
+        "total_citations": sum(f["citations"] for f in fields),
+        "invalid_citations": invalid_citations,
+        "citations_verified": verified,
     }
 
-    if not evaluation["is_valid"]:
-        evaluation["recommendations"].append("Fix schema structure errors before proceeding")
+    is_valid = not scan.structure_errors
+    recommendations: list[str] = []
+    if not is_valid:
+        recommendations.append("Fix schema structure errors before proceeding")
 
-    if evidence_metrics["total_claims"] > 0:
+    if total_claims > 0:
         coverage_rate = evidence_metrics["evidence_coverage_rate"]
         if coverage_rate < 0.9:
-            evaluation["recommendations"].append(
-                f"Low evidence coverage ({coverage_rate:.1%}). Ensure all claims have supporting quotes."
-            )
-        if evidence_metrics["claims_without_evidence"] > 0:
-            evaluation["recommendations"].append(
-                f"{evidence_metrics['claims_without_evidence']} claims missing evidence quotes"
-            )
+            recommendations.append(f"Low evidence coverage ({coverage_rate:.1%}). Ensure all claims have supporting quotes.")
+        if claims_without > 0:
+            recommendations.append(f"{claims_without} claims missing evidence quotes")
 
-    if citation_metrics["total_evidence_fields"] > 0:
+    if total_fields > 0:
         citation_rate = citation_metrics["citation_rate"]
         if citation_rate < 0.5:
-            evaluation["recommendations"].append(
+            recommendations.append(
                 f"Low citation rate ({citation_rate:.1%}). Evidence should include document/chunk references."
             )
+    if invalid_citations:
+        recommendations.append(
+            f"{invalid_citations} citations reference chunks that do not exist or belong to another document"
+        )
 
     overall_score = 0.0
-    if evaluation["is_valid"]:
+    if is_valid:
         overall_score += 0.3
-    if evidence_metrics["total_claims"] > 0:
+    if total_claims > 0:
         overall_score += 0.4 * evidence_metrics["evidence_coverage_rate"]
-    if citation_metrics["total_evidence_fields"] > 0:
+    if total_fields > 0:
         overall_score += 0.3 * citation_metrics["citation_rate"]
 
-    evaluation["overall_score"] = overall_score
+    return {
+        "is_valid": is_valid,
+        "structure_errors": scan.structure_errors,
+        "evidence_coverage": evidence_metrics,
+        "citation_quality": citation_metrics,
+        "fields": fields,
+        "overall_score": overall_score,
+        "recommendations": recommendations,
+    }
+
+
+def validate_report_structure(report: dict[str, Any]) -> list[str]:
+    """
+    Validates that the report follows the expected schema structure.
+    Returns a list of validation errors (empty if valid).
+    """
+    return scan_report(report).structure_errors
+
+
+def validate_evidence_coverage(report: dict[str, Any]) -> dict[str, Any]:
+    """
+    Checks that claims have evidence quotes.
+    Returns metrics about evidence coverage.
+    """
+    return _evaluation(scan_report(report), verified=False)["evidence_coverage"]
+
+
+def validate_citation_format(report: dict[str, Any]) -> dict[str, Any]:
+    """
+    Checks that evidence quotes contain well-formed citations
+    "(document_id: ..., chunk_id: ...[, chunk_index: ...])".
+    Returns metrics about citation quality.
+    """
+    return _evaluation(scan_report(report), verified=False)["citation_quality"]
+
 
-    return evaluation
+def evaluate_scans(db: Session | None, scans: Sequence[ReportScan]) -> list[dict[str, Any]]:
+    """
+    Evaluations of scanned reports. With a session, every cited chunk is
+    checked to exist and belong to the cited document, with one lookup for
+    all of them.
+    """
+    if db is not None:
+        _verify_citations(db, scans)
+    return [_evaluation(scan, verified=db is not None) for scan in scans]
+
+
+def evaluate_reports(db: Session, reports: Sequence[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Evaluate many reports, verifying their citations together.
+    """
+    return evaluate_scans(db, [scan_report(report) for report in reports])
+
+
+def evaluate_report(report: dict[str, Any], db: Session | None = None) -> dict[str, Any]:
+    """
+    Comprehensive evaluation of a report in a single pass.
+    Returns evaluation results with scores, issues and per-field citation
+    results. Citations are only checked against the stored chunks when a
+    session is given.
+    """
+    return evaluate_scans(db, [scan_report(report)])[0]
@@ -1,5 +1,11 @@
 from __future__ import annotations
 
+import asyncio
+import threading
+from collections.abc import AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -8,10 +14,32 @@ from backend.app.api.routes_ingest import router as ingest_router
 from backend.app.api.routes_report import router as report_router
 from backend.app.api.routes_rag import router as rag_router
 from backend.app.api.routes_evaluation import router as evaluation_router
+from backend.app.jobs.report_jobs import start_worker_threads
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    settings = get_settings()
+    # The async Gemini calls (and report streams) run on the loop's default
+    # executor; size it explicitly rather than min(32, cpu_count + 4).
+    executor = ThreadPoolExecutor(max_workers=settings.async_executor_workers, thread_name_prefix="loop-executor")
+    asyncio.get_running_loop().set_default_executor(executor)
+
+    # Optional in-process report job workers; production deployments can
+    # run `python -m backend.app.jobs.worker` instead.
+    stop_event = threading.Event()
+    workers = settings.report_job_workers
+    if workers > 0:
+        start_worker_threads(workers, stop_event)
+    try:
+        yield
+    finally:
+        stop_event.set()
+        executor.shutdown(wait=False, cancel_futures=True)
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Earnings Call Intelligence Engine", version="0.1.0")
+    app = FastAPI(title="Earnings Call Intelligence Engine", version="0.1.0", lifespan=lifespan)
  
     # For this project we keep CORS simple: allow all origins.
     # This avoids deployment/env mismatches while you're iterating.
@@ -3,13 +3,16 @@ from __future__ import annotations
 import uuid
 from datetime import date, datetime
 
-from sqlalchemy import Date, DateTime, ForeignKey, Index, String, Text, func
-from sqlalchemy.dialects.postgresql import JSON, UUID
+from sqlalchemy import Computed, Date, DateTime, ForeignKey, Index, Integer, String, Text, func
+from sqlalchemy.dialects.postgresql import JSON, TSVECTOR, UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 from pgvector.sqlalchemy import Vector
 
 
+# Text search configuration of chunks.text_search; queries must use the same one.
+TEXT_SEARCH_CONFIG = "english"
+
 class Base(DeclarativeBase):
     pass
 
@@ -22,6 +25,8 @@ class Document(Base):
     quarter: Mapped[str] = mapped_column(String(16), nullable=False)
     call_date: Mapped[date | None] = mapped_column(Date, nullable=True)
     raw_text: Mapped[str] = mapped_column(Text, nullable=False)
+    # sha256 of raw_text, see ingestion.ingest.document_content_hash.
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
 
 
@@ -35,15 +40,30 @@ class Chunk(Base):
     document_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
     section: Mapped[str] = mapped_column(String(32), nullable=False)
     speaker: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    # Role or firm from the speaker label, e.g. "SVP and CFO" or "Morgan Stanley".
+    speaker_title: Mapped[str | None] = mapped_column(String(128), nullable=True)
     chunk_index: Mapped[int] = mapped_column(nullable=False)
     text: Mapped[str] = mapped_column(Text, nullable=False)
+    # Maintained by Postgres for full-text search; deferred so it is never loaded with the chunk.
+    text_search: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed(f"to_tsvector('{TEXT_SEARCH_CONFIG}', text)", persisted=True),
+        deferred=True,
+    )
+
+    # sha256 of the whitespace-normalized text, see ingestion.chunker.chunk_text_hash.
+    text_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
 
     embedding: Mapped[list[float] | None] = mapped_column(Vector(768), nullable=True)
+    embedding_model: Mapped[str | None] = mapped_column(String(64), nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
 
 
 Index("ix_chunks_document_section_index", Chunk.document_id, Chunk.section, Chunk.chunk_index, unique=True)
+Index("ix_chunks_text_hash_model", Chunk.text_hash, Chunk.embedding_model)
+Index("ix_chunks_document_section_speaker", Chunk.document_id, Chunk.section, Chunk.speaker)
+Index("ix_chunks_text_search", Chunk.text_search, postgresql_using="gin")
 
 
 class Report(Base):
@@ -54,8 +74,52 @@ class Report(Base):
     quarter: Mapped[str] = mapped_column(String(16), nullable=False, index=True)
     prev_quarter: Mapped[str | None] = mapped_column(String(16), nullable=True)
     report_data: Mapped[dict] = mapped_column(JSON, nullable=False)
+    # sha256 of the canonical JSON of report_data; the ETag of GET /reports.
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    # What the report was generated from (see llm.report_store.ReportVersion);
+    # a report whose values no longer match is stale.
+    model: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    prompt_fingerprint: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    source_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
 
 
 Index("ix_reports_ticker_quarter_prev", Report.ticker, Report.quarter, Report.prev_quarter, unique=True)
 
+
+class ReportJob(Base):
+    __tablename__ = "report_jobs"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    ticker: Mapped[str] = mapped_column(String(16), nullable=False)
+    quarter: Mapped[str] = mapped_column(String(16), nullable=False)
+    prev_quarter: Mapped[str | None] = mapped_column(String(16), nullable=True)
+    # queued -> running -> succeeded | failed. A running row is also the lease
+    # on generating its report (see llm.report_store).
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="queued")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    report_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("reports.id", ondelete="SET NULL"), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # Refreshed while running; a running job with an old heartbeat is dead.
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+Index("ix_report_jobs_status_created", ReportJob.status, ReportJob.created_at)
+
+
+class QueryEmbedding(Base):
+    __tablename__ = "query_embeddings"
+
+    model: Mapped[str] = mapped_column(String(64), primary_key=True)
+    text_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    embedding: Mapped[list[float]] = mapped_column(Vector(768), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
@@ -1,11 +1,19 @@
 from __future__ import annotations
 
+import hashlib
+import threading
+from collections import OrderedDict
 from collections.abc import Sequence
 from functools import lru_cache
 
 from google import genai
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
 from backend.app.config import get_settings
+from backend.app.models import QueryEmbedding
 
 
 @lru_cache(maxsize=1)
@@ -30,7 +38,207 @@ def embed_texts(texts: Sequence[str]) -> list[list[float]]:
     return [e.values for e in response.embeddings]
 
 
-def embed_query(text: str) -> list[float]:
-    vectors = embed_texts([text])
+async def aembed_texts(texts: Sequence[str]) -> list[list[float]]:
+    if not texts:
+        return []
+
+    client = _get_client()
+    response = await client.aio.models.embed_content(
+        model=EMBED_MODEL,
+        contents=[{"parts": [{"text": t}]} for t in texts],
+    )
+
+    return [e.values for e in response.embeddings]
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class QueryEmbeddingCache:
+    """
+    Thread-safe in-process LRU of query embeddings keyed by (model, text hash).
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple[str, str]) -> list[float] | None:
+        with self._lock:
+            vec = self._entries.get(key)
+            if vec is not None:
+                self._entries.move_to_end(key)
+            return vec
+
+    def put(self, key: tuple[str, str], vec: list[float]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = vec
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record(self, memory_hits: int = 0, db_hits: int = 0, misses: int = 0) -> None:
+        with self._lock:
+            self.memory_hits += memory_hits
+            self.db_hits += db_hits
+            self.misses += misses
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            lookups = self.memory_hits + self.db_hits + self.misses
+            hits = self.memory_hits + self.db_hits
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "embedding_calls_saved": hits,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.memory_hits = 0
+            self.db_hits = 0
+            self.misses = 0
+
+
+@lru_cache(maxsize=1)
+def get_query_cache() -> QueryEmbeddingCache:
+    return QueryEmbeddingCache(max_entries=get_settings().query_embedding_cache_size)
+
+
+def _load_persisted(db: Session, hashes: Sequence[str]) -> dict[str, list[float]]:
+    stmt = (
+        select(QueryEmbedding.text_hash, QueryEmbedding.embedding)
+        .where(QueryEmbedding.model == EMBED_MODEL)
+        .where(QueryEmbedding.text_hash.in_(hashes))
+    )
+    return {h: [float(x) for x in emb] for h, emb in db.execute(stmt).all()}
+
+
+def _store_stmt(vectors: dict[str, list[float]]):
+    return (
+        pg_insert(QueryEmbedding)
+        .values([{"model": EMBED_MODEL, "text_hash": h, "embedding": v} for h, v in vectors.items()])
+        .on_conflict_do_nothing(index_elements=[QueryEmbedding.model, QueryEmbedding.text_hash])
+    )
+
+
+# Cache rows are written on a short-lived connection of their own, so the
+# caller's transaction (and its pending changes) is left alone.
+
+def _store_persisted(db: Session, vectors: dict[str, list[float]]) -> None:
+    with db.get_bind().begin() as conn:
+        conn.execute(_store_stmt(vectors))
+
+
+async def _astore_persisted(db: AsyncSession, vectors: dict[str, list[float]]) -> None:
+    async with db.bind.begin() as conn:
+        await conn.execute(_store_stmt(vectors))
+
+
+class _QueryLookup:
+    """
+    Bookkeeping for one embed_queries call, shared by the sync and async paths.
+    """
+
+    def __init__(self, texts: Sequence[str]) -> None:
+        self.cache = get_query_cache()
+        self.hashes = [text_hash(t) for t in texts]
+        self.text_by_hash = dict(zip(self.hashes, texts))
+        self.found: dict[str, list[float]] = {}
+        self.db_hits = 0
+
+        for h in self.text_by_hash:
+            vec = self.cache.get((EMBED_MODEL, h))
+            if vec is not None:
+                self.found[h] = vec
+        self.memory_hits = len(self.found)
+
+    def missing(self) -> list[str]:
+        return [h for h in self.text_by_hash if h not in self.found]
+
+    def add_persisted(self, persisted: dict[str, list[float]]) -> None:
+        for h, vec in persisted.items():
+            self.cache.put((EMBED_MODEL, h), vec)
+        self.found.update(persisted)
+        self.db_hits = len(persisted)
+
+    def add_fresh(self, missing: list[str], vectors: list[list[float]]) -> dict[str, list[float]]:
+        fresh = dict(zip(missing, vectors, strict=True))
+        for h, vec in fresh.items():
+            self.cache.put((EMBED_MODEL, h), vec)
+        self.found.update(fresh)
+        return fresh
+
+    def finish(self, misses: int) -> list[list[float]]:
+        self.cache.record(memory_hits=self.memory_hits, db_hits=self.db_hits, misses=misses)
+        return [self.found[h] for h in self.hashes]
+
+
+def embed_queries(texts: Sequence[str], db: Session | None = None) -> list[list[float]]:
+    """
+    Embed search queries through the query cache.
+
+    Lookups go to the in-process LRU first, then to the query_embeddings table
+    (when a session is given), and only the remaining texts are sent to the
+    embedding API, in a single call.
+    """
+    if not texts:
+        return []
+
+    lookup = _QueryLookup(texts)
+
+    missing = lookup.missing()
+    if missing and db is not None:
+        lookup.add_persisted(_load_persisted(db, missing))
+        missing = lookup.missing()
+
+    if missing:
+        fresh = lookup.add_fresh(missing, embed_texts([lookup.text_by_hash[h] for h in missing]))
+        if db is not None:
+            _store_persisted(db, fresh)
+
+    return lookup.finish(misses=len(missing))
+
+
+async def aembed_queries(texts: Sequence[str], db: AsyncSession | None = None) -> list[list[float]]:
+    """
+    Async variant of embed_queries.
+    """
+    if not texts:
+        return []
+
+    lookup = _QueryLookup(texts)
+
+    missing = lookup.missing()
+    if missing and db is not None:
+        lookup.add_persisted(await db.run_sync(_load_persisted, missing))
+        missing = lookup.missing()
+
+    if missing:
+        fresh = lookup.add_fresh(missing, await aembed_texts([lookup.text_by_hash[h] for h in missing]))
+        if db is not None:
+            await _astore_persisted(db, fresh)
+
+    return lookup.finish(misses=len(missing))
+
+
+def embed_query(text: str, db: Session | None = None) -> list[float]:
+    vectors = embed_queries([text], db=db)
     return vectors[0]
 
+
+async def aembed_query(text: str, db: AsyncSession | None = None) -> list[float]:
+    vectors = await aembed_queries([text], db=db)
+    return vectors[0]
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from typing import Literal
+
+from sqlalchemy import Connection, text
+from sqlalchemy.orm import Session
+
+from backend.app.config import get_settings
+
+
+VECTOR_INDEX_NAME = "ix_chunks_embedding_ann"
+
+IndexKind = Literal["hnsw", "ivfflat"]
+
+
+def vector_index_ddl(
+    kind: IndexKind | None = None,
+    m: int | None = None,
+    ef_construction: int | None = None,
+    lists: int | None = None,
+    concurrently: bool = False,
+) -> str:
+    settings = get_settings()
+    kind = kind or settings.vector_index_kind
+
+    if kind == "hnsw":
+        params = (
+            f"m = {int(m or settings.hnsw_m)}, "
+            f"ef_construction = {int(ef_construction or settings.hnsw_ef_construction)}"
+        )
+    elif kind == "ivfflat":
+        params = f"lists = {int(lists or settings.ivfflat_lists)}"
+    else:
+        raise ValueError(f"Unknown vector index kind: {kind}")
+
+    return (
+        f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {VECTOR_INDEX_NAME} "
+        f"ON chunks USING {kind} (embedding vector_cosine_ops) WITH ({params})"
+    )
+
+
+def create_vector_index(conn: Connection, replace: bool = False, **kwargs) -> str:
+    """
+    Create the ANN index on chunks.embedding and return the DDL that was run.
+
+    With concurrently=True the connection must be in AUTOCOMMIT mode.
+    """
+    if replace:
+        drop_vector_index(conn, concurrently=kwargs.get("concurrently", False))
+    ddl = vector_index_ddl(**kwargs)
+    conn.exec_driver_sql(ddl)
+    return ddl
+
+
+def drop_vector_index(conn: Connection, concurrently: bool = False) -> None:
+    conn.exec_driver_sql(
+        f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {VECTOR_INDEX_NAME}"
+    )
+
+
+def get_vector_index_definition(conn: Connection) -> str | None:
+    return conn.execute(
+        text("SELECT indexdef FROM pg_indexes WHERE tablename = 'chunks' AND indexname = :name"),
+        {"name": VECTOR_INDEX_NAME},
+    ).scalar()
+
+
+def apply_search_params(db: Session, ef_search: int | None = None, probes: int | None = None) -> None:
+    """
+    Set transaction-local ANN search parameters before a vector query.
+
+    Higher values trade latency for recall. Falls back to the Settings
+    defaults; when neither is set the pgvector defaults apply.
+    """
+    settings = get_settings()
+    ef_search = ef_search if ef_search is not None else settings.hnsw_ef_search
+    probes = probes if probes is not None else settings.ivfflat_probes
+
+    if ef_search is not None:
+        db.execute(text("SELECT set_config('hnsw.ef_search', :v, true)"), {"v": str(int(ef_search))})
+    if probes is not None:
+        db.execute(text("SELECT set_config('ivfflat.probes', :v, true)"), {"v": str(int(probes))})
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import os
+import threading
+import uuid
+from collections.abc import Sequence
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.app.config import get_settings
+from backend.app.models import Chunk
+
+
+DEFAULT_INDEX_DIR = Path(__file__).resolve().parents[3] / "data" / "processed" / "vectors"
+
+
+class LocalVectorIndex:
+    """
+    Per-document embedding matrices kept on disk as .npy files and searched
+    in process.
+
+    For each document, <id>.npy holds the L2-normalized float32 embeddings
+    (one row per embedded chunk) and <id>.ids.npy the matching chunk ids.
+    Files are built from the database on first use and memory-mapped, so
+    every worker process on the host shares the same pages. A document's
+    files are rebuilt after invalidate() removes them; loaded matrices are
+    re-checked against the file on every lookup, so invalidation by another
+    process is noticed too.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self._loaded: dict[str, tuple[tuple[int, int], np.ndarray, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def _paths(self, document_id) -> tuple[Path, Path]:
+        return self.directory / f"{document_id}.npy", self.directory / f"{document_id}.ids.npy"
+
+    def invalidate(self, document_id) -> None:
+        vectors_path, ids_path = self._paths(document_id)
+        # Vectors first: a vectors file is only trusted with a matching ids file.
+        vectors_path.unlink(missing_ok=True)
+        ids_path.unlink(missing_ok=True)
+        with self._lock:
+            self._loaded.pop(str(document_id), None)
+
+    def _build(self, db: Session, document_id) -> None:
+        rows = db.execute(
+            select(Chunk.id, Chunk.embedding)
+            .where(Chunk.document_id == document_id)
+            .where(Chunk.embedding.is_not(None))
+            .order_by(Chunk.section.asc(), Chunk.chunk_index.asc())
+        ).all()
+
+        vectors = np.zeros((len(rows), Chunk.embedding.type.dim), dtype=np.float32)
+        for i, (_, embedding) in enumerate(rows):
+            vectors[i] = embedding
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+        ids = np.array([str(chunk_id) for chunk_id, _ in rows], dtype="<U36")
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        vectors_path, ids_path = self._paths(document_id)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        # np.save appends .npy to names without it, so write to explicit file objects.
+        for path, array in ((ids_path, ids), (vectors_path, vectors)):
+            tmp = path.with_name(path.name + suffix)
+            with open(tmp, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp, path)
+
+    def _load(self, document_id) -> tuple[np.ndarray, np.ndarray] | None:
+        vectors_path, ids_path = self._paths(document_id)
+        try:
+            st = vectors_path.stat()
+        except FileNotFoundError:
+            return None
+        stamp = (st.st_mtime_ns, st.st_ino)
+
+        key = str(document_id)
+        with self._lock:
+            cached = self._loaded.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1], cached[2]
+
+        try:
+            vectors = np.load(vectors_path, mmap_mode="r")
+            ids = np.load(ids_path)
+        except (FileNotFoundError, ValueError):
+            return None
+        if len(ids) != len(vectors):
+            # Caught between another process's writes; rebuild.
+            return None
+
+        with self._lock:
+            self._loaded[key] = (stamp, ids, vectors)
+        return ids, vectors
+
+    def matrix(self, db: Session, document_id) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (chunk ids, normalized embedding matrix) of a document, building the
+        files from the database if needed.
+        """
+        loaded = self._load(document_id)
+        if loaded is None:
+            self._build(db, document_id)
+            loaded = self._load(document_id)
+        if loaded is None:
+            raise RuntimeError(f"Could not load the local vector index for document {document_id}")
+        return loaded
+
+    def search(
+        self,
+        db: Session,
+        qvecs: Sequence[Sequence[float]],
+        document_ids: Sequence[str],
+        k: int,
+    ) -> list[list[list[uuid.UUID]]]:
+        """
+        Exact cosine top-k chunk ids for every (query, document) pair, indexed
+        as [query][document]. All queries are scored against a document with
+        one matrix multiply.
+        """
+        results: list[list[list[uuid.UUID]]] = [[[] for _ in document_ids] for _ in qvecs]
+        if not len(qvecs) or not document_ids or k <= 0:
+            return results
+
+        queries = np.asarray(qvecs, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1, norms)
+
+        for di, document_id in enumerate(document_ids):
+            ids, vectors = self.matrix(db, document_id)
+            if not len(ids):
+                continue
+            scores = queries @ vectors.T
+            top = min(k, len(ids))
+            if top < len(ids):
+                candidates = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+            else:
+                candidates = np.broadcast_to(np.arange(len(ids)), scores.shape)
+            for qi in range(len(queries)):
+                row = candidates[qi]
+                ordered = row[np.argsort(-scores[qi, row], kind="stable")]
+                results[qi][di] = [uuid.UUID(ids[i]) for i in ordered]
+
+        return results
+
+
+@lru_cache(maxsize=1)
+def get_local_index() -> LocalVectorIndex:
+    directory = get_settings().local_index_dir
+    return LocalVectorIndex(Path(directory) if directory else DEFAULT_INDEX_DIR)
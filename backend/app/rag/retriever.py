@@ -1,25 +1,459 @@
 from __future__ import annotations
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from collections.abc import Sequence
+from typing import Literal
 
-from backend.app.models import Chunk
-from backend.app.rag.embeddings import embed_query
+from sqlalchemy import Float, Integer, bindparam, column, select, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
 
+from backend.app.config import get_settings
+from backend.app.models import TEXT_SEARCH_CONFIG, Chunk
+from backend.app.rag.embeddings import aembed_queries, aembed_query, embed_queries, embed_query
+from backend.app.rag.index import apply_search_params
+from backend.app.rag.local_index import get_local_index
 
-def retrieve_top_k(
+
+RetrievalMode = Literal["vector", "hybrid"]
+
+# Columns loaded with a Chunk; text_search is deferred and never selected.
+_CHUNK_COLUMNS = [col for col in Chunk.__table__.c if col.name != "text_search"]
+
+# plainto_tsquery ANDs every term, which rarely matches a whole question;
+# OR them instead and let ts_rank prefer chunks that match more of them.
+_TSQUERY = (
+    f"CAST(replace(CAST(plainto_tsquery('{TEXT_SEARCH_CONFIG}', {{query}}) AS text), ' & ', ' | ') AS tsquery)"
+)
+
+# The ANN index is global, and pgvector (before 0.8's iterative scans) applies
+# WHERE filters after the index scan, which yields at most hnsw.ef_search
+# candidates. A document's few hundred chunks can all fall outside those, so
+# queries scoped to a document rank its chunks exactly instead: the OFFSET 0
+# fence keeps the planner from answering ORDER BY distance with the index,
+# and the rows come from the document_id btree. {columns}, {qvec} and
+# {filters} are SQL fragments supplied by the caller.
+_EXACT_TOP_SQL = """
+SELECT s.*
+FROM (
+    SELECT {columns}, c.embedding <=> {qvec} AS distance
+    FROM chunks AS c
+    WHERE c.embedding IS NOT NULL{filters}
+    OFFSET 0
+) AS s
+ORDER BY s.distance
+LIMIT {limit}
+"""
+
+_ANN_TOP_SQL = """
+SELECT {columns}, c.embedding <=> {qvec} AS distance
+FROM chunks AS c
+WHERE c.embedding IS NOT NULL{filters}
+ORDER BY c.embedding <=> {qvec}
+LIMIT {limit}
+"""
+
+# Reciprocal rank fusion of a vector top-N and a full-text top-N:
+# score = sum over rankers of 1 / (rrf_k + rank). {vector} is _EXACT_TOP_SQL
+# or _ANN_TOP_SQL; {tsquery} and {filters} are SQL fragments supplied by the
+# caller.
+_HYBRID_SQL = """
+SELECT f.id, sum(1.0 / (:rrf_k + f.rank)) AS score
+FROM (
+    SELECT v.id, row_number() OVER (ORDER BY v.distance) AS rank
+    FROM ({vector}) AS v
+    UNION ALL
+    SELECT l.id, row_number() OVER (ORDER BY l.score DESC) AS rank
+    FROM (
+        SELECT c.id, ts_rank(c.text_search, {tsquery}) AS score
+        FROM chunks AS c
+        WHERE c.text_search @@ {tsquery}{filters}
+        ORDER BY score DESC
+        LIMIT :candidates
+    ) AS l
+) AS f
+GROUP BY f.id
+ORDER BY score DESC, f.id
+LIMIT :k
+"""
+
+
+def _vector_top_sql(columns: str, qvec: str, filters: str, limit: str, exact: bool) -> str:
+    return (_EXACT_TOP_SQL if exact else _ANN_TOP_SQL).format(columns=columns, qvec=qvec, filters=filters, limit=limit)
+
+
+def _hybrid_sql(qvec: str, tsquery: str, filters: str, exact: bool) -> str:
+    vector = _vector_top_sql("c.id", qvec, filters, ":candidates", exact)
+    return _HYBRID_SQL.format(vector=vector, tsquery=tsquery, filters=filters)
+
+
+def _fusion_params(k: int) -> list:
+    settings = get_settings()
+    return [
+        bindparam("k", k),
+        bindparam("candidates", max(k, settings.retrieval_candidates)),
+        bindparam("rrf_k", settings.rrf_k),
+    ]
+
+
+def search_by_vector(
     db: Session,
-    query: str,
+    qvec: Sequence[float],
     k: int = 8,
     document_id: str | None = None,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    section: str | None = None,
+    speaker: str | None = None,
 ) -> list[Chunk]:
-    qvec = embed_query(query)
+    """
+    Top-k chunks by cosine distance. With a document_id the document's chunks
+    are ranked exactly (see _EXACT_TOP_SQL); otherwise the ANN index answers
+    and ef_search/probes apply.
+    """
+    apply_search_params(db, ef_search=ef_search, probes=probes)
 
-    stmt = select(Chunk).where(Chunk.embedding.is_not(None))
+    distance = Chunk.embedding.op("<=>")(qvec)
+    stmt = select(*_CHUNK_COLUMNS, distance.label("distance")).where(Chunk.embedding.is_not(None))
     if document_id is not None:
         stmt = stmt.where(Chunk.document_id == document_id)
+    # Served by ix_chunks_document_section_speaker.
+    if section is not None:
+        stmt = stmt.where(Chunk.section == section)
+    if speaker is not None:
+        stmt = stmt.where(Chunk.speaker == speaker)
+
+    if document_id is None:
+        stmt = stmt.order_by(distance).limit(k)
+    else:
+        # The OFFSET 0 fence of _EXACT_TOP_SQL.
+        stmt = stmt.offset(0)
+    ranked = stmt.subquery("ranked")
+    ranked_chunk = aliased(Chunk, ranked)
+
+    return list(db.scalars(select(ranked_chunk).order_by(ranked.c.distance).limit(k)).all())
+
 
-    stmt = stmt.order_by(Chunk.embedding.op("<=>")(qvec)).limit(k)
+def search_hybrid(
+    db: Session,
+    query: str,
+    qvec: Sequence[float],
+    k: int = 8,
+    document_id: str | None = None,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    section: str | None = None,
+    speaker: str | None = None,
+) -> list[Chunk]:
+    """
+    Top-k chunks by reciprocal rank fusion of the vector and full-text
+    rankings, in one statement. Takes the same filters as search_by_vector.
+    """
+    apply_search_params(db, ef_search=ef_search, probes=probes)
+
+    filters = ""
+    params = [
+        bindparam("qvec", list(qvec), type_=Chunk.embedding.type),
+        bindparam("query", query),
+        *_fusion_params(k),
+    ]
+    if document_id is not None:
+        filters += " AND c.document_id = CAST(:document_id AS uuid)"
+        params.append(bindparam("document_id", str(document_id)))
+    if section is not None:
+        filters += " AND c.section = :section"
+        params.append(bindparam("section", section))
+    if speaker is not None:
+        filters += " AND c.speaker = :speaker"
+        params.append(bindparam("speaker", speaker))
+
+    fused = (
+        text(
+            _hybrid_sql(
+                "CAST(:qvec AS vector)",
+                _TSQUERY.format(query=":query"),
+                filters,
+                exact=document_id is not None,
+            )
+        )
+        .bindparams(*params)
+        .columns(column("id", UUID(as_uuid=True)), column("score", Float))
+        .subquery("fused")
+    )
+    stmt = select(Chunk).join(fused, Chunk.id == fused.c.id).order_by(fused.c.score.desc(), Chunk.id)
 
     return list(db.scalars(stmt).all())
 
+
+def search_top_k_multi(
+    db: Session,
+    qvecs: Sequence[Sequence[float]],
+    document_ids: Sequence[str],
+    k: int = 8,
+    ef_search: int | None = None,
+    probes: int | None = None,
+) -> list[list[list[Chunk]]]:
+    """
+    Top-k chunks for every (query vector, document) pair in one statement.
+
+    Each pair is answered by a LATERAL subquery that ranks the document's
+    chunks exactly, like search_by_vector with a document_id, so the chunks
+    and their order match the per-call path. Results are indexed as
+    [query][document].
+    """
+    results: list[list[list[Chunk]]] = [[[] for _ in document_ids] for _ in qvecs]
+    if not qvecs or not document_ids:
+        return results
+
+    apply_search_params(db, ef_search=ef_search, probes=probes)
+
+    chunk_columns = _CHUNK_COLUMNS
+    query_rows = ", ".join(f"({i}, CAST(:q{i} AS vector))" for i in range(len(qvecs)))
+    select_list = ", ".join(f"c.{col.name}" for col in chunk_columns)
+    top_sql = _vector_top_sql(select_list, "q.qvec", " AND c.document_id = d.document_id", ":k", exact=True)
+
+    ranked = (
+        text(
+            f"""
+            SELECT q.qi, d.di, t.distance, {", ".join(f"t.{col.name}" for col in chunk_columns)}
+            FROM (VALUES {query_rows}) AS q(qi, qvec)
+            CROSS JOIN unnest(CAST(:document_ids AS uuid[])) WITH ORDINALITY AS d(document_id, di)
+            CROSS JOIN LATERAL ({top_sql}) AS t
+            """
+        )
+        .bindparams(
+            *[bindparam(f"q{i}", list(v), type_=Chunk.embedding.type) for i, v in enumerate(qvecs)],
+            bindparam("document_ids", [str(d) for d in document_ids]),
+            bindparam("k", k),
+        )
+        .columns(column("qi", Integer), column("di", Integer), column("distance", Float), *chunk_columns)
+        .subquery("ranked")
+    )
+    ranked_chunk = aliased(Chunk, ranked)
+
+    stmt = select(ranked.c.qi, ranked.c.di, ranked_chunk).order_by(
+        ranked.c.qi, ranked.c.di, ranked.c.distance
+    )
+    for qi, di, chunk in db.execute(stmt):
+        # WITH ORDINALITY is 1-based.
+        results[qi][di - 1].append(chunk)
+
+    return results
+
+
+def search_hybrid_multi(
+    db: Session,
+    queries: Sequence[str],
+    qvecs: Sequence[Sequence[float]],
+    document_ids: Sequence[str],
+    k: int = 8,
+    ef_search: int | None = None,
+    probes: int | None = None,
+) -> list[list[list[Chunk]]]:
+    """
+    Hybrid counterpart of search_top_k_multi: every (query, document) pair is
+    answered by a LATERAL reciprocal-rank-fusion subquery, all in one
+    statement. Results are indexed as [query][document].
+    """
+    results: list[list[list[Chunk]]] = [[[] for _ in document_ids] for _ in qvecs]
+    if not qvecs or not document_ids:
+        return results
+
+    apply_search_params(db, ef_search=ef_search, probes=probes)
+
+    query_rows = ", ".join(
+        f"({i}, CAST(:q{i} AS vector), {_TSQUERY.format(query=f':t{i}')})" for i in range(len(qvecs))
+    )
+    fused_sql = _hybrid_sql("q.qvec", "q.tsq", " AND c.document_id = d.document_id", exact=True)
+
+    ranked = (
+        text(
+            f"""
+            SELECT q.qi, d.di, t.id, t.score
+            FROM (VALUES {query_rows}) AS q(qi, qvec, tsq)
+            CROSS JOIN unnest(CAST(:document_ids AS uuid[])) WITH ORDINALITY AS d(document_id, di)
+            CROSS JOIN LATERAL ({fused_sql}) AS t
+            """
+        )
+        .bindparams(
+            *[bindparam(f"q{i}", list(v), type_=Chunk.embedding.type) for i, v in enumerate(qvecs)],
+            *[bindparam(f"t{i}", q) for i, q in enumerate(queries)],
+            bindparam("document_ids", [str(d) for d in document_ids]),
+            *_fusion_params(k),
+        )
+        .columns(column("qi", Integer), column("di", Integer), column("id", UUID(as_uuid=True)), column("score", Float))
+        .subquery("ranked")
+    )
+
+    stmt = (
+        select(ranked.c.qi, ranked.c.di, Chunk)
+        .join(Chunk, Chunk.id == ranked.c.id)
+        .order_by(ranked.c.qi, ranked.c.di, ranked.c.score.desc(), Chunk.id)
+    )
+    for qi, di, chunk in db.execute(stmt):
+        # WITH ORDINALITY is 1-based.
+        results[qi][di - 1].append(chunk)
+
+    return results
+
+
+def search_local_multi(
+    db: Session,
+    qvecs: Sequence[Sequence[float]],
+    document_ids: Sequence[str],
+    k: int = 8,
+) -> list[list[list[Chunk]]]:
+    """
+    search_top_k_multi answered from the in-process LocalVectorIndex (exact
+    search); only the winning chunks are read from the database.
+    """
+    ranked_ids = get_local_index().search(db, qvecs, document_ids, k)
+    wanted = {chunk_id for per_query in ranked_ids for per_doc in per_query for chunk_id in per_doc}
+    if not wanted:
+        return [[[] for _ in document_ids] for _ in qvecs]
+
+    chunks = {c.id: c for c in db.scalars(select(Chunk).where(Chunk.id.in_(wanted)))}
+    return [[[chunks[i] for i in per_doc if i in chunks] for per_doc in per_query] for per_query in ranked_ids]
+
+
+def _backend(mode: RetrievalMode | None, filtered: bool = False) -> str:
+    """
+    "hybrid", "local" or "postgres" for a query. The local index only serves
+    plain vector queries scoped to documents.
+    """
+    settings = get_settings()
+    if (mode or settings.retrieval_mode) == "hybrid":
+        return "hybrid"
+    if settings.retrieval_backend == "local" and not filtered:
+        return "local"
+    return "postgres"
+
+
+def retrieve_top_k(
+    db: Session,
+    query: str,
+    k: int = 8,
+    document_id: str | None = None,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    section: str | None = None,
+    speaker: str | None = None,
+    mode: RetrievalMode | None = None,
+) -> list[Chunk]:
+    """
+    Top-k chunks for a query; mode defaults to the RETRIEVAL_MODE setting.
+    """
+    qvec = embed_query(query, db=db)
+    backend = _backend(mode, filtered=document_id is None or section is not None or speaker is not None)
+    if backend == "local":
+        return search_local_multi(db, [qvec], [document_id], k=k)[0][0]
+    if backend == "hybrid":
+        return search_hybrid(
+            db,
+            query,
+            qvec,
+            k=k,
+            document_id=document_id,
+            ef_search=ef_search,
+            probes=probes,
+            section=section,
+            speaker=speaker,
+        )
+    return search_by_vector(
+        db,
+        qvec,
+        k=k,
+        document_id=document_id,
+        ef_search=ef_search,
+        probes=probes,
+        section=section,
+        speaker=speaker,
+    )
+
+
+def retrieve_top_k_many(
+    db: Session,
+    queries: Sequence[str],
+    document_ids: Sequence[str],
+    k: int = 8,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    mode: RetrievalMode | None = None,
+) -> list[list[list[Chunk]]]:
+    """
+    Retrieve top-k chunks for every (query, document) pair.
+
+    All queries are embedded in one pass through the query cache (at most one
+    embedding API call), and all (query, document) pairs are answered by a
+    single SQL statement. Results are indexed as [query][document].
+    """
+    qvecs = embed_queries(queries, db=db)
+
+    backend = _backend(mode)
+    if backend == "local":
+        return search_local_multi(db, qvecs, document_ids, k=k)
+    if backend == "hybrid":
+        return search_hybrid_multi(db, queries, qvecs, document_ids, k=k, ef_search=ef_search, probes=probes)
+    return search_top_k_multi(db, qvecs, document_ids, k=k, ef_search=ef_search, probes=probes)
+
+
+async def aretrieve_top_k(
+    db: AsyncSession,
+    query: str,
+    k: int = 8,
+    document_id: str | None = None,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    section: str | None = None,
+    speaker: str | None = None,
+    mode: RetrievalMode | None = None,
+) -> list[Chunk]:
+    qvec = await aembed_query(query, db=db)
+    backend = _backend(mode, filtered=document_id is None or section is not None or speaker is not None)
+    if backend == "local":
+        results = await db.run_sync(search_local_multi, [qvec], [document_id], k=k)
+        return results[0][0]
+    if backend == "hybrid":
+        return await db.run_sync(
+            search_hybrid,
+            query,
+            qvec,
+            k=k,
+            document_id=document_id,
+            ef_search=ef_search,
+            probes=probes,
+            section=section,
+            speaker=speaker,
+        )
+    return await db.run_sync(
+        search_by_vector,
+        qvec,
+        k=k,
+        document_id=document_id,
+        ef_search=ef_search,
+        probes=probes,
+        section=section,
+        speaker=speaker,
+    )
+
+
+async def aretrieve_top_k_many(
+    db: AsyncSession,
+    queries: Sequence[str],
+    document_ids: Sequence[str],
+    k: int = 8,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    mode: RetrievalMode | None = None,
+) -> list[list[list[Chunk]]]:
+    qvecs = await aembed_queries(queries, db=db)
+    backend = _backend(mode)
+    if backend == "local":
+        return await db.run_sync(search_local_multi, qvecs, document_ids, k=k)
+    if backend == "hybrid":
+        return await db.run_sync(
+            search_hybrid_multi, queries, qvecs, document_ids, k=k, ef_search=ef_search, probes=probes
+        )
+    return await db.run_sync(
+        search_top_k_multi, qvecs, document_ids, k=k, ef_search=ef_search, probes=probes
+    )
@@ -1,35 +1,221 @@
 from __future__ import annotations
 
-from collections.abc import Sequence
+import logging
+import uuid
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 
-from sqlalchemy import select
+from sqlalchemy import bindparam, func, select, text, tuple_
 from sqlalchemy.orm import Session
 
+from backend.app.config import get_settings
+from backend.app.ingestion.chunker import chunk_text_hash
 from backend.app.models import Chunk
-from backend.app.rag.embeddings import embed_texts
+from backend.app.rag.embeddings import EMBED_MODEL, embed_texts
+from backend.app.rag.local_index import get_local_index
 
 
-def embed_chunks_for_document(db: Session, document_id, batch_size: int = 32) -> int:
-    total = 0
+logger = logging.getLogger(__name__)
 
+ProgressCallback = Callable[[int, int], None]
+
+
+@dataclass
+class EmbeddingStats:
+    chunks_embedded: int = 0
+    # Distinct texts sent to the embedding API, and the requests used for them.
+    texts_embedded: int = 0
+    api_calls: int = 0
+
+    @property
+    def reused(self) -> int:
+        """Chunks that got an existing embedding instead of an API call."""
+        return self.chunks_embedded - self.texts_embedded
+
+
+def _pending_batches(db: Session, document_id, batch_size: int) -> Iterator[list[tuple[uuid.UUID, str, str]]]:
+    """
+    Yield (chunk id, text, text hash) batches of un-embedded chunks, paging by
+    (section, chunk_index) so each row is read exactly once.
+    """
+    last: tuple[str, int] | None = None
     while True:
         stmt = (
-            select(Chunk)
+            select(Chunk.id, Chunk.text, Chunk.text_hash, Chunk.section, Chunk.chunk_index)
             .where(Chunk.document_id == document_id)
             .where(Chunk.embedding.is_(None))
             .order_by(Chunk.section.asc(), Chunk.chunk_index.asc())
             .limit(batch_size)
         )
-        batch: Sequence[Chunk] = db.scalars(stmt).all()
-        if not batch:
-            break
+        if last is not None:
+            stmt = stmt.where(tuple_(Chunk.section, Chunk.chunk_index) > last)
+
+        rows = db.execute(stmt).all()
+        if not rows:
+            return
+        last = (rows[-1].section, rows[-1].chunk_index)
+        # Chunks stored before text_hash existed get their hash here.
+        yield [(row.id, row.text, row.text_hash or chunk_text_hash(row.text)) for row in rows]
+
+
+def find_reusable_embeddings(db: Session, hashes: Iterable[str]) -> dict[str, list[float]]:
+    """
+    Existing embeddings from EMBED_MODEL for any of the given text hashes.
+    """
+    hashes = list(set(hashes))
+    if not hashes:
+        return {}
+
+    stmt = (
+        select(Chunk.text_hash, Chunk.embedding)
+        .where(Chunk.text_hash.in_(hashes))
+        .where(Chunk.embedding_model == EMBED_MODEL)
+        .where(Chunk.embedding.is_not(None))
+        .distinct(Chunk.text_hash)
+    )
+    return {h: [float(x) for x in emb] for h, emb in db.execute(stmt).all()}
+
+
+def write_embeddings(
+    db: Session,
+    ids: Sequence[uuid.UUID],
+    hashes: Sequence[str],
+    vectors: Sequence[Sequence[float]],
+) -> None:
+    """
+    Store a batch of embeddings (with their text hash and EMBED_MODEL) using a
+    single UPDATE ... FROM (VALUES ...).
+    """
+    if not ids:
+        return
+
+    values = ", ".join(
+        f"(CAST(:id{i} AS uuid), CAST(:h{i} AS varchar), CAST(:e{i} AS vector))" for i in range(len(ids))
+    )
+    stmt = text(
+        f"""
+        UPDATE chunks AS c
+        SET embedding = v.embedding, text_hash = v.text_hash, embedding_model = :model
+        FROM (VALUES {values}) AS v(id, text_hash, embedding)
+        WHERE c.id = v.id
+        """
+    ).bindparams(
+        *[bindparam(f"id{i}", str(chunk_id)) for i, chunk_id in enumerate(ids)],
+        *[bindparam(f"h{i}", h) for i, h in enumerate(hashes)],
+        *[bindparam(f"e{i}", list(vec), type_=Chunk.embedding.type) for i, vec in enumerate(vectors)],
+        bindparam("model", EMBED_MODEL),
+    )
+    db.execute(stmt)
+
+
+def embed_chunks_for_document(
+    db: Session,
+    document_id,
+    batch_size: int | None = None,
+    concurrency: int | None = None,
+    progress: ProgressCallback | None = None,
+) -> EmbeddingStats:
+    """
+    Embed every chunk of a document that has no embedding yet.
+
+    Chunks whose normalized text was already embedded with EMBED_MODEL (in
+    any document, or earlier in this run) reuse that embedding; only new
+    texts go to the API. Up to `concurrency` embedding requests of at most
+    `batch_size` texts are in flight at once; each finished batch is written
+    back and committed while the others are still running, so an interrupted
+    run resumes where it stopped. progress(done, total) is called after
+    every committed batch. The document's LocalVectorIndex files are removed
+    once anything was written, so they are rebuilt on the next query. When
+    the document ends up fully embedded, its comparison report against the
+    previous quarter is queued (see precompute_reports_for_document).
+    """
+    settings = get_settings()
+    batch_size = batch_size or settings.embed_batch_size
+    concurrency = max(1, concurrency or settings.embed_concurrency)
+    stats = EmbeddingStats()
+
+    total = db.scalar(
+        select(func.count())
+        .select_from(Chunk)
+        .where(Chunk.document_id == document_id)
+        .where(Chunk.embedding.is_(None))
+    ) or 0
+    if total == 0:
+        return stats
+
+    known: dict[str, list[float]] = {}
+    batches = _pending_batches(db, document_id, batch_size)
+    in_flight: dict[Future, list[str]] = {}
+    submitted: set[str] = set()
+    # Batches waiting for at least one embedding that is still in flight.
+    waiting: list[list[tuple[uuid.UUID, str, str]]] = []
+
+    def write_ready() -> None:
+        for batch in list(waiting):
+            if all(h in known for _, _, h in batch):
+                waiting.remove(batch)
+                write_embeddings(db, [i for i, _, _ in batch], [h for _, _, h in batch], [known[h] for _, _, h in batch])
+                db.commit()
+                stats.chunks_embedded += len(batch)
+                if progress is not None:
+                    progress(stats.chunks_embedded, total)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="embed") as pool:
+        try:
+            while True:
+                while len(in_flight) < concurrency:
+                    batch = next(batches, None)
+                    if batch is None:
+                        break
+
+                    missing = {h for _, _, h in batch if h not in known and h not in submitted}
+                    known.update(find_reusable_embeddings(db, missing))
+                    new_texts = {h: t for _, t, h in batch if h in missing and h not in known}
+                    waiting.append(batch)
+                    if not new_texts:
+                        write_ready()
+                        continue
+
+                    new_hashes = list(new_texts)
+                    in_flight[pool.submit(embed_texts, [new_texts[h] for h in new_hashes])] = new_hashes
+                    submitted.update(new_hashes)
+                    stats.texts_embedded += len(new_hashes)
+                    stats.api_calls += 1
+
+                if not in_flight:
+                    break
 
-        vectors = embed_texts([c.text for c in batch])
-        for chunk, vec in zip(batch, vectors, strict=True):
-            chunk.embedding = vec
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    known.update(zip(in_flight.pop(future), future.result(), strict=True))
+                write_ready()
+        except BaseException:
+            for future in in_flight:
+                future.cancel()
+            db.rollback()
+            raise
+        finally:
+            # Committed batches change the document's vectors even if a later one failed.
+            if stats.chunks_embedded:
+                get_local_index().invalidate(document_id)
 
-        db.commit()
-        total += len(batch)
+    logger.info(
+        "Embedded %d chunks of document %s with %d API call(s); %d reused an existing embedding",
+        stats.chunks_embedded,
+        document_id,
+        stats.api_calls,
+        stats.reused,
+    )
 
-    return total
+    if stats.chunks_embedded and settings.report_precompute:
+        # Imported here: the report modules depend on the rag package.
+        from backend.app.jobs.report_jobs import precompute_reports_for_document
 
+        try:
+            precompute_reports_for_document(db, document_id)
+        except Exception:
+            # Embedding succeeded; a missing precompute only costs latency later.
+            logger.exception("Could not queue report precompute for document %s", document_id)
+            db.rollback()
+    return stats
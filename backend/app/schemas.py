@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import uuid
 from datetime import date, datetime
+from typing import Literal
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator
 
@@ -43,6 +44,7 @@ class ChunkOut(BaseModel):
     document_id: uuid.UUID
     section: str
     speaker: str | None
+    speaker_title: str | None = None
     chunk_index: int
     text: str
     created_at: datetime
@@ -52,6 +54,15 @@ class RagSearchRequest(BaseModel):
     query: str
     k: int = 8
     document_id: uuid.UUID | None = None
+    # ANN recall/latency knobs; higher is slower but more accurate.
+    ef_search: int | None = Field(default=None, ge=1, le=1000)
+    probes: int | None = Field(default=None, ge=1)
+    # Exact-match filters, e.g. section="qa", speaker="Anat Ashkenazi".
+    section: Literal["prepared_remarks", "qa"] | None = None
+    speaker: str | None = None
+    # "hybrid" adds full-text matches (exact tokens such as "EPS" or "$91-93B")
+    # via reciprocal rank fusion; None uses RETRIEVAL_MODE.
+    mode: Literal["vector", "hybrid"] | None = None
 
 
 class RagSearchChunk(BaseModel):
@@ -60,6 +71,7 @@ class RagSearchChunk(BaseModel):
     chunk_index: int
     section: str
     speaker: str | None
+    speaker_title: str | None = None
     text: str
 
 
@@ -79,6 +91,19 @@ class ReportResponse(BaseModel):
     data: dict[str, object]
 
 
+class ReportJobOut(BaseModel):
+    id: uuid.UUID
+    status: str
+    ticker: str
+    quarter: str
+    prev_quarter: str | None
+    error: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    data: dict[str, object] | None = None
+
+
 
 class EvaluationResponse(BaseModel):
     evaluation: Dict[str, Any]
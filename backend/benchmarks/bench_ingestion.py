@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from pathlib import Path
+
+import pytest
+
+from backend.app.ingestion.chunker import chunk_section
+from backend.app.ingestion.ingest import build_chunk_inputs
+from backend.app.ingestion.parser import normalize_newlines, parse_transcript
+from backend.app.ingestion.stream import iter_transcript_chunks
+
+
+TRANSCRIPT_DIR = Path(__file__).resolve().parents[2] / "data" / "raw_transcripts"
+
+# The transcripts concatenated this many times over.
+SCALES = (1, 10, 100)
+
+pytestmark = pytest.mark.benchmark(group="ingestion")
+
+scaled = pytest.mark.parametrize("scale", SCALES, ids=lambda scale: f"{scale}x")
+
+
+@lru_cache(maxsize=None)
+def corpus(scale: int) -> str:
+    """
+    All transcripts in data/raw_transcripts, repeated scale times.
+    """
+    texts = [path.read_text(encoding="utf-8") for path in sorted(TRANSCRIPT_DIR.glob("*.txt"))]
+    if not texts:
+        pytest.skip(f"No transcripts in {TRANSCRIPT_DIR}")
+    return "\n\n".join(["\n\n".join(texts)] * scale)
+
+
+@scaled
+def bench_parse_transcript(benchmark, scale: int) -> None:
+    text = corpus(scale)
+    benchmark.extra_info["chars"] = len(text)
+    parsed = benchmark(parse_transcript, text)
+    benchmark.extra_info["sections"] = len(parsed.sections)
+
+
+@scaled
+def bench_chunk_section(benchmark, scale: int) -> None:
+    sections = parse_transcript(corpus(scale)).sections
+
+    def chunk_all() -> int:
+        return sum(len(chunk_section(name, text)) for name, text in sections.items())
+
+    benchmark.extra_info["chunks"] = benchmark(chunk_all)
+
+
+@scaled
+def bench_build_chunk_inputs(benchmark, scale: int) -> None:
+    # The ingestion path: sections, speaker turns and chunks.
+    chunks = benchmark(build_chunk_inputs, corpus(scale))
+    benchmark.extra_info["chunks"] = len(chunks)
+
+
+@scaled
+def bench_iter_transcript_chunks(benchmark, scale: int) -> None:
+    # The upload path: the same chunks from a stream of lines.
+    lines = corpus(scale).splitlines(keepends=True)
+
+    def stream_all() -> int:
+        return sum(1 for _ in iter_transcript_chunks(normalize_newlines(lines)))
+
+    benchmark.extra_info["chunks"] = benchmark(stream_all)
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import Session
+
+from backend.app.ingestion.ingest import build_chunk_inputs, insert_documents_with_chunks
+from backend.app.llm.report import _collect_context_for_report
+from backend.app.llm.validate import evaluate_reports
+from backend.app.models import Chunk, Document
+from backend.app.rag import retriever
+from backend.app.rag.embeddings import EMBED_MODEL
+from backend.app.rag.local_index import get_local_index
+from backend.benchmarks.bench_ingestion import TRANSCRIPT_DIR
+from backend.benchmarks.bench_validation import generate_report
+
+
+# The retrieval benchmarks ingest fixture documents into this database, never
+# DATABASE_URL, inside a transaction that is rolled back afterwards.
+BENCHMARK_DATABASE_URL = os.environ.get("BENCHMARK_DATABASE_URL")
+
+BENCH_TICKER = "ZZBENCH"
+
+QUARTER_RE = re.compile(r"(\d{4}_Q[1-4])", re.IGNORECASE)
+
+pytestmark = pytest.mark.skipif(not BENCHMARK_DATABASE_URL, reason="BENCHMARK_DATABASE_URL is not set")
+
+
+def fake_embedding(text: str) -> list[float]:
+    """
+    Deterministic unit vector standing in for the embedding API.
+    """
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    vector = np.random.default_rng(seed).standard_normal(Chunk.embedding.type.dim)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def fake_embed_queries(texts: Sequence[str], db=None) -> list[list[float]]:
+    # Bypasses the query cache too, so no fake vector is persisted.
+    return [fake_embedding(text) for text in texts]
+
+
+@dataclass
+class BenchDocuments:
+    connection: object
+    current_id: object
+    prev_id: object
+
+
+@pytest.fixture(scope="module")
+def documents():
+    """
+    The last two transcripts ingested under BENCH_TICKER with fake chunk
+    embeddings, in a transaction of its own that is rolled back at the end.
+    """
+    paths = sorted(TRANSCRIPT_DIR.glob("*.txt"))
+    quarters = [QUARTER_RE.search(path.stem) for path in paths]
+    pairs = [(m.group(1).upper(), path) for m, path in zip(quarters, paths) if m]
+    if len(pairs) < 2:
+        pytest.skip(f"Need two TICKER_YYYY_QN.txt transcripts in {TRANSCRIPT_DIR}")
+    (prev_quarter, prev_path), (quarter, path) = sorted(pairs)[-2:]
+
+    engine = create_engine(BENCHMARK_DATABASE_URL)
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        with Session(bind=conn, join_transaction_mode="create_savepoint") as db:
+            rows = []
+            for q, p in ((prev_quarter, prev_path), (quarter, path)):
+                raw_text = p.read_text(encoding="utf-8")
+                rows.append((BENCH_TICKER, q, None, raw_text, build_chunk_inputs(raw_text)))
+            ids = insert_documents_with_chunks(db, rows)
+
+            chunks = db.execute(select(Chunk.id, Chunk.text).where(Chunk.document_id.in_(ids.values()))).all()
+            db.execute(
+                update(Chunk),
+                [
+                    {"id": chunk_id, "embedding": fake_embedding(text), "embedding_model": EMBED_MODEL}
+                    for chunk_id, text in chunks
+                ],
+            )
+            db.commit()
+        try:
+            yield BenchDocuments(
+                connection=conn,
+                current_id=ids[(BENCH_TICKER, quarter)],
+                prev_id=ids[(BENCH_TICKER, prev_quarter)],
+            )
+        finally:
+            transaction.rollback()
+            # Vector files written when RETRIEVAL_BACKEND=local.
+            for document_id in ids.values():
+                get_local_index().invalidate(document_id)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(documents):
+    with Session(bind=documents.connection, join_transaction_mode="create_savepoint") as session:
+        yield session
+
+
+@pytest.mark.benchmark(group="retrieval")
+@pytest.mark.parametrize("mode", ["vector", "hybrid"])
+def bench_collect_context_for_report(benchmark, documents, db, monkeypatch, mode: str) -> None:
+    monkeypatch.setattr(retriever, "embed_queries", fake_embed_queries)
+    current_doc = db.get(Document, documents.current_id)
+    prev_doc = db.get(Document, documents.prev_id)
+    context = benchmark(_collect_context_for_report, db, current_doc, prev_doc, mode=mode)
+    benchmark.extra_info["context_chunks"] = len(context)
+
+
+@pytest.mark.benchmark(group="validation")
+@pytest.mark.parametrize("items_per_section", [500], ids=lambda n: f"{n}-items-verified")
+def bench_evaluate_reports(benchmark, documents, db, items_per_section: int) -> None:
+    refs = [
+        (str(document_id), str(chunk_id), chunk_index)
+        for chunk_id, document_id, chunk_index in db.execute(
+            select(Chunk.id, Chunk.document_id, Chunk.chunk_index).where(
+                Chunk.document_id.in_([documents.current_id, documents.prev_id])
+            )
+        )
+    ]
+    report = generate_report(items_per_section, chunk_refs=refs)
+    evaluations = benchmark(evaluate_reports, db, [report])
+    benchmark.extra_info["citations"] = evaluations[0]["citation_quality"]["total_citations"]
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import random
+import uuid
+from typing import Any
+
+import pytest
+
+from backend.app.llm.citations import format_citation
+from backend.app.llm.validate import SECTION_FIELDS, evaluate_report
+
+
+# Items per report section.
+REPORT_SIZES = (50, 500)
+
+
+def generate_report(items_per_section: int, chunk_refs: list[tuple[str, str, int]] | None = None, seed: int = 0) -> dict[str, Any]:
+    """
+    A schema-valid report with items_per_section items in every section,
+    each evidence field quoting a sentence with one or two citations. Citations
+    point at chunk_refs (document_id, chunk_id, chunk_index) when given, else
+    at random ids; every tenth evidence field is left uncited.
+    """
+    rng = random.Random(seed)
+    document_id = str(uuid.UUID(int=rng.getrandbits(128)))
+
+    def citation() -> str:
+        if chunk_refs:
+            return format_citation(*rng.choice(chunk_refs))
+        return format_citation(document_id, str(uuid.UUID(int=rng.getrandbits(128))), rng.randrange(100))
+
+    def evidence() -> str:
+        quote = "We expect revenue growth to continue in the second half, driven by cloud and subscriptions. "
+        if rng.random() < 0.1:
+            return quote
+        return quote + " ".join(citation() for _ in range(rng.randint(1, 2)))
+
+    report: dict[str, Any] = {
+        "ticker": "BENCH",
+        "quarter": "2025_Q3",
+        "prev_quarter": "2025_Q2",
+        "summary": {"high_level": "Benchmark report.", "tone": "neutral"},
+    }
+    for section, (claim_field, evidence_fields) in SECTION_FIELDS.items():
+        report[section] = [
+            {claim_field: f"{section} claim {i}", **{name: evidence() for name in evidence_fields}}
+            for i in range(items_per_section)
+        ]
+    return report
+
+
+@pytest.mark.benchmark(group="validation")
+@pytest.mark.parametrize("items_per_section", REPORT_SIZES, ids=lambda n: f"{n}-items")
+def bench_evaluate_report(benchmark, items_per_section: int) -> None:
+    report = generate_report(items_per_section)
+    evaluation = benchmark(evaluate_report, report)
+    benchmark.extra_info["evidence_fields"] = evaluation["citation_quality"]["total_evidence_fields"]
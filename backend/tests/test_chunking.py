@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import io
+from pathlib import Path
+
+import pytest
+
+from backend.app.ingestion.chunker import chunk_section, iter_chunks
+from backend.app.ingestion.ingest import build_chunk_inputs
+from backend.app.ingestion.parser import TextPiece, find_qa_split, iter_sections, normalize_newlines, parse_transcript
+from backend.app.ingestion.stream import iter_text_blocks, iter_transcript_chunks
+
+
+TRANSCRIPT_DIR = Path(__file__).resolve().parents[2] / "data" / "raw_transcripts"
+TRANSCRIPTS = sorted(TRANSCRIPT_DIR.glob("*.txt"))
+
+# Odd sizes so block boundaries land in the middle of words, labels and markers.
+BLOCK_SIZES = (7, 509, 4096, 1 << 20)
+
+
+def reference_chunks(raw_text: str) -> list[tuple[str, int, str]]:
+    """
+    chunk_section over every speaker turn of parse_transcript, with chunk
+    indices running on across the turns of a section.
+    """
+    parsed = parse_transcript(raw_text)
+    chunks = []
+    next_index: dict[str, int] = {}
+    for turn in parsed.turns:
+        first = next_index.get(turn.section, 0)
+        turn_chunks = chunk_section(turn.section, parsed.sections[turn.section][turn.start : turn.end])
+        chunks.extend((c.section, first + c.index, c.text) for c in turn_chunks)
+        next_index[turn.section] = first + len(turn_chunks)
+    return chunks
+
+
+def as_tuples(chunks) -> list[tuple[str, int, str]]:
+    return [(c.section, c.index, c.text) for c in chunks]
+
+
+def streamed(data: bytes, block_size: int, split_index: int | None = None) -> list[tuple[str, int, str]]:
+    blocks = iter_text_blocks(io.BytesIO(data), block_size, max_bytes=len(data))
+    return as_tuples(iter_transcript_chunks(blocks, split_index))
+
+
+@pytest.fixture(params=TRANSCRIPTS, ids=lambda path: path.stem)
+def transcript(request) -> str:
+    return request.param.read_text(encoding="utf-8")
+
+
+def test_fixtures_present():
+    assert TRANSCRIPTS, f"No transcripts in {TRANSCRIPT_DIR}"
+
+
+def test_build_chunk_inputs_matches_chunk_section(transcript):
+    assert as_tuples(build_chunk_inputs(transcript)) == reference_chunks(transcript)
+
+
+def test_whole_sections_match_chunk_section(transcript):
+    # Without speaker turns the pipeline is chunk_section per section.
+    pieces = (TextPiece(section, 0, None, None, text) for section, text in iter_sections([transcript]))
+    expected = [
+        (c.section, c.index, c.text)
+        for name, text in parse_transcript(transcript).sections.items()
+        for c in chunk_section(name, text)
+    ]
+    assert as_tuples(iter_chunks(pieces)) == expected
+
+
+@pytest.mark.parametrize("block_size", BLOCK_SIZES)
+def test_iter_transcript_chunks_matches_build_chunk_inputs(transcript, block_size):
+    data = transcript.encode("utf-8")
+    expected = as_tuples(build_chunk_inputs(transcript))
+    assert streamed(data, block_size) == expected
+
+    split_index = find_qa_split(iter_text_blocks(io.BytesIO(data), block_size, max_bytes=len(data)))
+    assert streamed(data, block_size, split_index) == expected
+
+
+def test_crlf_split_across_blocks(transcript):
+    data = transcript.replace("\n", "\r\n").encode("utf-8")
+    # The first block ends between the \r and the \n of the first line break.
+    block_size = data.index(b"\r\n") + 1
+    assert streamed(data, block_size) == as_tuples(build_chunk_inputs(transcript))
+
+
+def test_normalize_newlines_joins_crlf_across_blocks():
+    assert "".join(normalize_newlines(["a\r", "\nb\r", "\r\n", "c\r"])) == "a\nb\r\nc\r"
+
+
+def test_no_qa_marker():
+    raw = (
+        "Operator: Good afternoon and welcome.\n\n"
+        "Jane Doe -- Chief Financial Officer: Revenue grew 12% year over year. " * 40
+    )
+    assert find_qa_split([raw]) is None
+    assert set(parse_transcript(raw).sections) == {"prepared_remarks"}
+
+    chunks = as_tuples(build_chunk_inputs(raw))
+    assert chunks == reference_chunks(raw)
+    assert {section for section, _, _ in chunks} == {"prepared_remarks"}
+    assert streamed(raw.encode("utf-8"), 64) == chunks
+
+
+@pytest.mark.parametrize("text", ["", "   ", "\n\n \t\n"])
+def test_empty_section(text):
+    assert chunk_section("qa", text) == []
+    assert list(iter_chunks([TextPiece("qa", 0, None, None, text)])) == []
+
+
+def test_empty_prepared_remarks_are_dropped():
+    raw = "\nQ&A\nBob Smith (Morgan Stanley): How is demand trending?\n"
+    chunks = as_tuples(build_chunk_inputs(raw))
+    assert chunks == reference_chunks(raw)
+    assert {section for section, _, _ in chunks} == {"qa"}
+    assert streamed(raw.encode("utf-8"), 5) == chunks
+
+
+def test_empty_transcript():
+    assert build_chunk_inputs("") == []
+    assert streamed(b"", 16) == []
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import uuid
+from typing import Any
+
+from backend.app.llm.citations import CITATION_RE, alias_context, expand_citations, format_citation
+
+
+CURRENT_DOC = str(uuid.UUID(int=1))
+PREV_DOC = str(uuid.UUID(int=2))
+
+
+def context_chunk(role: str, n: int) -> dict[str, Any]:
+    return {
+        "role": role,
+        "document_id": CURRENT_DOC if role == "current" else PREV_DOC,
+        "chunk_id": str(uuid.UUID(int=100 * (role == "current") + n)),
+        "chunk_index": n,
+        "section": "qa" if n % 2 else "prepared_remarks",
+        "speaker": "Operator" if n == 0 else None,
+        "text": f"{role} chunk {n}.",
+    }
+
+
+CONTEXT = [context_chunk("current", n) for n in range(3)] + [context_chunk("prev", n) for n in range(2)]
+
+
+def cited(text: str) -> list[tuple[str, str, int]]:
+    return [(m["document_id"], m["chunk_id"], int(m["chunk_index"])) for m in CITATION_RE.finditer(text)]
+
+
+def original(chunk: dict[str, Any]) -> tuple[str, str, int]:
+    return chunk["document_id"], chunk["chunk_id"], chunk["chunk_index"]
+
+
+def test_alias_context():
+    compact, aliases = alias_context(CONTEXT)
+    assert [c["id"] for c in compact] == ["C1", "C2", "C3", "P1", "P2"]
+    assert [aliases[c["id"]] for c in compact] == CONTEXT
+    # Only the alias identifies a chunk in the prompt.
+    assert compact[0] == {"id": "C1", "speaker": "Operator", "text": "current chunk 0."}
+
+
+def test_every_alias_round_trips():
+    compact, aliases = alias_context(CONTEXT)
+    report = {"items": [{"evidence": f"Quote [{c['id']}]"} for c in compact]}
+
+    expanded, count = expand_citations(report, aliases)
+
+    assert count == len(CONTEXT)
+    assert [cited(item["evidence"]) for item in expanded["items"]] == [[original(c)] for c in CONTEXT]
+    assert expanded["items"][0]["evidence"] == "Quote " + format_citation(*original(CONTEXT[0]))
+
+
+def test_alias_group_forms():
+    _, aliases = alias_context(CONTEXT)
+    for text in ("Quote [C2, P1]", "Quote (C2; P1)", "Quote [ C2 ,P1 ]"):
+        expanded, count = expand_citations(text, aliases)
+        assert count == 2
+        assert cited(expanded) == [original(CONTEXT[1]), original(CONTEXT[3])]
+
+
+def test_only_strings_are_rewritten():
+    _, aliases = alias_context(CONTEXT)
+    report = {"score": 3, "flag": None, "nested": [["[C1]"], {"tone": "[P2]"}], "plain": "No citation here."}
+    expanded, count = expand_citations(report, aliases)
+    assert count == 2
+    assert expanded["score"] == 3 and expanded["flag"] is None
+    assert expanded["plain"] == "No citation here."
+    assert cited(expanded["nested"][0][0]) == [original(CONTEXT[0])]
+    assert cited(expanded["nested"][1]["tone"]) == [original(CONTEXT[4])]
+
+
+def test_unknown_alias_group_is_left_as_written():
+    _, aliases = alias_context(CONTEXT)
+    text = "Quote [C99] and [C1, P7] then [P1]"
+
+    expanded, count = expand_citations(text, aliases)
+
+    # A group naming any unknown alias is kept verbatim; known groups still expand.
+    assert count == 1
+    assert expanded == "Quote [C99] and [C1, P7] then " + format_citation(*original(CONTEXT[3]))
+
+
+def test_expansion_is_idempotent():
+    _, aliases = alias_context(CONTEXT)
+    once, _ = expand_citations("Quote [C3]", aliases)
+    twice, count = expand_citations(once, aliases)
+    assert twice == once
+    assert count == 0
+
+
+def test_no_context():
+    compact, aliases = alias_context([])
+    assert compact == [] and aliases == {}
+    assert expand_citations("Quote [C1]", aliases) == ("Quote [C1]", 0)
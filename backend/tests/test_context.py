@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import uuid
+
+import numpy as np
+import pytest
+
+from backend.app.llm.context import CHARS_PER_TOKEN, assemble_context, merge_spans, text_overlap
+from backend.app.models import Chunk
+
+
+DIM = Chunk.embedding.type.dim
+DOCS = {"current": uuid.UUID(int=1), "prev": uuid.UUID(int=2)}
+
+
+def axis(*weights: float) -> list[float]:
+    # A fixed vector in the first few dimensions.
+    vector = np.zeros(DIM, dtype=np.float32)
+    vector[: len(weights)] = weights
+    return vector.tolist()
+
+
+def make_chunk(role: str, index: int, text: str, embedding: list[float] | None, section: str = "prepared_remarks") -> Chunk:
+    return Chunk(
+        id=uuid.UUID(int=(1000 if role == "current" else 2000) + index),
+        document_id=DOCS[role],
+        section=section,
+        chunk_index=index,
+        text=text,
+        speaker=None,
+        embedding=embedding,
+    )
+
+
+def words(n: int, seed: int) -> str:
+    rng = np.random.default_rng(seed)
+    return " ".join(f"w{v}" for v in rng.integers(0, 1000, n))
+
+
+def corpus(seed: int = 0) -> tuple[list[list[list[Chunk]]], list[str]]:
+    """
+    Two documents of 12 chunks each, consecutive chunks sharing 60 chars of
+    window overlap, ranked by three fixed query orders.
+    """
+    rng = np.random.default_rng(seed)
+    roles = ["current", "prev"]
+    chunks: dict[str, list[Chunk]] = {}
+    for r, role in enumerate(roles):
+        texts = []
+        previous = ""
+        for i in range(12):
+            text = (previous[-60:] + " " if previous else "") + words(40 + 5 * i, seed=100 * r + i)
+            texts.append(text)
+            previous = text
+        chunks[role] = [
+            make_chunk(role, i, text, rng.standard_normal(DIM).tolist(), section="qa" if i >= 8 else "prepared_remarks")
+            for i, text in enumerate(texts)
+        ]
+    results = []
+    for q in range(3):
+        order = np.random.default_rng(seed + q).permutation(12)
+        results.append([[chunks[role][i] for i in order[:8]] for role in roles])
+    return results, roles
+
+
+def keys(context) -> list[tuple[str, str, int]]:
+    return [(c["role"], c["section"], c["chunk_index"]) for c in context]
+
+
+def test_empty_results():
+    assert assemble_context([], ["current"]) == []
+    assert assemble_context([[[]]], ["current"], token_budget=100) == []
+
+
+@pytest.mark.parametrize("token_budget", [1, 50, 120, 400, 1500])
+@pytest.mark.parametrize("mmr_lambda", [0.0, 0.5, 1.0])
+def test_budget_is_never_exceeded(token_budget, mmr_lambda):
+    results, roles = corpus()
+    context = assemble_context(results, roles, token_budget=token_budget, mmr_lambda=mmr_lambda)
+    assert sum(len(c["text"]) for c in context) <= token_budget * CHARS_PER_TOKEN
+    assert len({c["chunk_id"] for c in context}) == len(context)
+
+
+def test_without_budget_every_candidate_is_sent():
+    results, roles = corpus()
+    retrieved = {str(chunk.id) for per_document in results for chunks in per_document for chunk in chunks}
+    context = assemble_context(results, roles)
+    assert {c["chunk_id"] for c in context} == retrieved
+
+
+def test_near_duplicates_are_dropped():
+    a = make_chunk("current", 0, "Cloud revenue grew 32% on AI demand. " * 5, axis(1.0, 0.0))
+    a_dup = make_chunk("current", 5, "Cloud revenue rose 32% driven by AI. " * 5, axis(0.99, 0.01))
+    b = make_chunk("current", 9, "Capex guidance was raised to $85 billion. " * 5, axis(0.0, 1.0))
+    results = [[[a, a_dup, b]], [[a_dup, a, b]]]
+    budget = (len(a.text) + len(b.text)) // CHARS_PER_TOKEN + 1
+
+    picked = assemble_context(results, ["current"], token_budget=budget, mmr_lambda=0.5)
+    assert [c["chunk_id"] for c in picked] == [str(a.id), str(b.id)]
+
+    # Relevance alone keeps the duplicate instead.
+    relevance_only = assemble_context(results, ["current"], token_budget=budget, mmr_lambda=1.0)
+    assert [c["chunk_id"] for c in relevance_only] == [str(a.id), str(a_dup.id)]
+
+
+def test_order_is_transcript_order_and_stable():
+    results, roles = corpus()
+    first = assemble_context(results, roles, token_budget=600, mmr_lambda=0.7)
+    assert first
+    assert keys(first) == sorted(keys(first), key=lambda k: (roles.index(k[0]), k[1], k[2]))
+    for _ in range(3):
+        assert assemble_context(results, roles, token_budget=600, mmr_lambda=0.7) == first
+
+    # The order of the result lists only changes relevance ties, not the output order.
+    reordered = assemble_context(list(reversed(results)), roles, token_budget=600, mmr_lambda=0.7)
+    assert keys(reordered) == sorted(keys(reordered), key=lambda k: (roles.index(k[0]), k[1], k[2]))
+
+
+def test_overlap_with_picked_neighbour_is_sent_once():
+    shared = "and the backlog now exceeds one hundred billion dollars."
+    first = make_chunk("current", 3, "Cloud had a strong quarter " + shared, axis(1.0))
+    second = make_chunk("current", 4, shared + " Margins expanded to 20.7%.", axis(0.0, 1.0))
+    assert text_overlap(first.text, second.text) == len(shared)
+
+    # Fits both only because the second pick pays for its new text alone.
+    budget_chars = len(first.text) + len(second.text) - len(shared)
+    context = assemble_context([[[first, second]]], ["current"], token_budget=budget_chars // CHARS_PER_TOKEN + 1)
+    assert [c["text"] for c in context] == [first.text, "Margins expanded to 20.7%."]
+
+
+def test_chunks_without_embeddings():
+    chunks = [make_chunk("current", i, f"Remark number {i}. " * 3, None) for i in range(4)]
+    context = assemble_context([[chunks]], ["current"], token_budget=1000)
+    assert [c["chunk_index"] for c in context] == [0, 1, 2, 3]
+
+
+def test_consecutive_picks_merge_into_spans():
+    results, roles = corpus()
+    context = assemble_context(results, roles)
+    parts = [{"chunk_id": c["chunk_id"], "text": c["text"]} for c in context]
+
+    spans = merge_spans(context, parts, ("role", "section"))
+
+    # Every chunk keeps its own part, in order; only runs of consecutive
+    # indices within a role and section share a span.
+    assert [p for span in spans for p in span["chunks"]] == parts
+    position = 0
+    for span in spans:
+        run = context[position : position + len(span["chunks"])]
+        position += len(run)
+        assert {(c["role"], c["section"]) for c in run} == {(span["role"], span["section"])}
+        assert [c["chunk_index"] for c in run] == list(range(run[0]["chunk_index"], run[0]["chunk_index"] + len(run)))
+    assert len(spans) < len(context)
+
+    # Joined, a span reads as the original passage without repeated overlap.
+    span = next(span for span in spans if len(span["chunks"]) > 1)
+    originals = {str(chunk.id): chunk.text for per_document in results for chunks in per_document for chunk in chunks}
+    first, *rest = span["chunks"]
+    assert first["text"] == originals[first["chunk_id"]]
+    for part in rest:
+        assert len(part["text"]) < len(originals[part["chunk_id"]])
+        assert originals[part["chunk_id"]].endswith(part["text"])
+
+
+def test_gaps_and_section_changes_split_spans():
+    entries = [
+        {"role": "current", "section": "prepared_remarks", "chunk_index": 3},
+        {"role": "current", "section": "prepared_remarks", "chunk_index": 4},
+        {"role": "current", "section": "prepared_remarks", "chunk_index": 6},
+        {"role": "current", "section": "qa", "chunk_index": 7},
+        {"role": "prev", "section": "qa", "chunk_index": 8},
+    ]
+    spans = merge_spans(entries, [{"n": i} for i in range(5)], ("role",))
+    assert spans == [
+        {"role": "current", "chunks": [{"n": 0}, {"n": 1}]},
+        {"role": "current", "chunks": [{"n": 2}]},
+        {"role": "current", "chunks": [{"n": 3}]},
+        {"role": "prev", "chunks": [{"n": 4}]},
+    ]
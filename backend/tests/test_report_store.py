@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import create_engine, delete, event, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from backend.app.api.routes_report import get_report
+from backend.app.db import _async_database_url
+from backend.app.llm import report_store
+from backend.app.llm.report_store import (
+    astream_report,
+    get_report_etag,
+    normalize_report_key,
+    report_content_hash,
+    report_version,
+    store_report,
+)
+from backend.app.models import JOB_FAILED, JOB_SUCCEEDED, Base, Document, Report, ReportJob
+
+
+# Like test_retrieval: Postgres, inside a transaction that is rolled back.
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+KEY = normalize_report_key("zztest", "2025_q3", "2025_q2")
+DATA = {"ticker": "ZZTEST", "summary": {"high_level": "Cloud drove the quarter.", "tone": "positive"}}
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(TEST_DATABASE_URL)
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS vector")
+        Base.metadata.create_all(conn)
+        with Session(bind=conn, join_transaction_mode="create_savepoint") as session:
+            for quarter in KEY[1:]:
+                session.add(Document(ticker=KEY[0], quarter=quarter, raw_text=quarter, content_hash=quarter.lower()))
+            session.commit()
+            store_report(session, KEY, DATA, report_version(session, KEY))
+            yield session
+        transaction.rollback()
+    engine.dispose()
+
+
+@pytest.fixture
+def writes(db):
+    """Statements other than SELECT sent through db."""
+    sent: list[str] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(("SELECT", "SAVEPOINT", "RELEASE", "ROLLBACK")):
+            sent.append(statement)
+
+    conn = db.connection()
+    event.listen(conn, "before_cursor_execute", capture)
+    yield sent
+    event.remove(conn, "before_cursor_execute", capture)
+
+
+def make_stale(db: Session) -> None:
+    db.execute(update(Document).where(Document.quarter == KEY[2]).values(content_hash="edited"))
+    db.commit()
+
+
+class AsyncSessionAdapter:
+    """The parts of AsyncSession that GET /reports uses, over a sync session."""
+
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    async def run_sync(self, fn, *args):
+        return fn(self.session, *args)
+
+    async def scalar(self, stmt):
+        return self.session.scalar(stmt)
+
+
+def fetch(db: Session, if_none_match: str | None = None):
+    return asyncio.run(get_report(*KEY, if_none_match=if_none_match, db=AsyncSessionAdapter(db)))
+
+
+def test_etag_of_current_and_stale_reports(db, writes):
+    report_id, content_hash, current = get_report_etag(db, KEY)
+    assert content_hash == report_content_hash(DATA)
+    assert current
+
+    make_stale(db)
+    writes.clear()
+    assert get_report_etag(db, KEY) == (report_id, content_hash, False)
+    assert writes == []
+
+
+def test_missing_content_hash_is_computed_not_written(db, writes):
+    db.execute(update(Report).values(content_hash=None))
+    db.commit()
+    writes.clear()
+
+    _, content_hash, current = get_report_etag(db, KEY)
+
+    assert content_hash == report_content_hash(DATA)
+    assert current
+    assert writes == []
+    assert db.scalar(select(Report.content_hash)) is None
+
+
+def test_current_report_revalidates_with_304(db):
+    response = fetch(db)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"].startswith("public")
+
+    assert fetch(db, if_none_match=etag).status_code == 304
+    assert fetch(db, if_none_match=f"W/{etag}").status_code == 304
+
+
+def test_stale_report_is_never_304(db):
+    etag = fetch(db).headers["etag"]
+    make_stale(db)
+
+    response = fetch(db, if_none_match=etag)
+
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+    assert response.headers["cache-control"] == "no-cache"
+    assert db.scalar(select(ReportJob.quarter).where(ReportJob.ticker == KEY[0])) == KEY[1]
+
+
+# Streams take leases on connections of their own, so these tests commit.
+# Their rows use their own ticker and are deleted afterwards.
+STREAM_KEY = normalize_report_key("zzstream", "2025_q3", None)
+
+
+@pytest.fixture
+def stream_sessions(monkeypatch):
+    engine = create_engine(TEST_DATABASE_URL)
+    Base.metadata.create_all(engine)
+
+    def cleanup() -> None:
+        with engine.begin() as conn:
+            for model in (ReportJob, Report, Document):
+                conn.execute(delete(model).where(model.ticker == STREAM_KEY[0]))
+
+    cleanup()
+    with engine.begin() as conn:
+        conn.execute(
+            Document.__table__.insert().values(ticker=STREAM_KEY[0], quarter=STREAM_KEY[1], raw_text="", content_hash="x")
+        )
+    monkeypatch.setattr(report_store, "LEASE_POLL_SECONDS", 0.02)
+    async_engine = create_async_engine(_async_database_url(TEST_DATABASE_URL))
+    try:
+        yield async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+    finally:
+        asyncio.run(async_engine.dispose())
+        cleanup()
+        engine.dispose()
+
+
+@pytest.fixture
+def generations(monkeypatch):
+    """Calls of a fake astream_quarter_comparison_report that takes 0.3s."""
+    calls: list[str] = []
+
+    async def fake_stream(db, ticker, quarter, prev_quarter):
+        calls.append(ticker)
+        yield "stage", {"stage": "llm_start"}
+        await asyncio.sleep(0.3)
+        yield "report", {"ticker": ticker, "generation": len(calls)}
+
+    monkeypatch.setattr(report_store, "astream_quarter_comparison_report", fake_stream)
+    return calls
+
+
+def lease_statuses(sessions) -> list[str]:
+    async def read() -> list[str]:
+        async with sessions() as db:
+            return list(await db.scalars(select(ReportJob.status).where(ReportJob.ticker == STREAM_KEY[0])))
+
+    return asyncio.run(read())
+
+
+def test_concurrent_streams_generate_once(stream_sessions, generations):
+    async def consume(delay: float) -> list[tuple[str, dict]]:
+        await asyncio.sleep(delay)
+        async with stream_sessions() as db:
+            return [item async for item in astream_report(db, STREAM_KEY)]
+
+    async def main():
+        return await asyncio.gather(consume(0), consume(0.1))
+
+    leader, follower = asyncio.run(main())
+
+    assert generations == [STREAM_KEY[0]]
+    assert [event for event, _ in leader] == ["stage", "report"]
+    assert [data.get("stage") for event, data in follower if event == "stage"] == ["waiting", "cached"]
+    assert follower[-1] == leader[-1]
+    assert leader[-1][1]["data"] == {"ticker": STREAM_KEY[0], "generation": 1}
+    assert lease_statuses(stream_sessions) == [JOB_SUCCEEDED]
+
+
+def test_closed_stream_releases_its_lease(stream_sessions, generations):
+    async def main():
+        async with stream_sessions() as db:
+            stream = astream_report(db, STREAM_KEY)
+            assert await stream.__anext__() == ("stage", {"stage": "llm_start"})
+            await stream.aclose()
+        async with stream_sessions() as db:
+            return [item async for item in astream_report(db, STREAM_KEY)]
+
+    events = asyncio.run(main())
+
+    # The next stream does not wait for the abandoned lease.
+    assert [data.get("stage") for event, data in events if event == "stage"] == ["llm_start"]
+    assert generations == [STREAM_KEY[0], STREAM_KEY[0]]
+    assert sorted(lease_statuses(stream_sessions)) == sorted([JOB_FAILED, JOB_SUCCEEDED])
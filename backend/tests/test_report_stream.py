@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from backend.app.llm import report
+
+
+CHUNK_DELAY = 0.05
+
+
+class BlockingModels:
+    """A sync generate_content_stream that blocks between chunks, like the SDK's."""
+
+    def __init__(self, texts: list[str], error: Exception | None = None) -> None:
+        self.texts = texts
+        self.error = error
+        self.sent = 0
+
+    def generate_content_stream(self, model: str, contents):
+        for text in self.texts:
+            time.sleep(CHUNK_DELAY)
+            self.sent += 1
+            yield SimpleNamespace(text=text, usage_metadata=None)
+        if self.error is not None:
+            raise self.error
+
+
+@pytest.fixture
+def models(monkeypatch):
+    def install(texts: list[str], error: Exception | None = None) -> BlockingModels:
+        fake = BlockingModels(texts, error)
+        monkeypatch.setattr(report, "_get_client", lambda: SimpleNamespace(models=fake))
+        return fake
+
+    return install
+
+
+async def collect(stream) -> list[str]:
+    return [chunk.text async for chunk in stream]
+
+
+def test_loop_stays_responsive_during_stream(models):
+    texts = [f"part{i} " for i in range(6)]
+    models(texts)
+
+    async def main() -> tuple[list[str], int]:
+        ticks = 0
+        streaming = True
+
+        async def ticker() -> None:
+            nonlocal ticks
+            while streaming:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        try:
+            received = await collect(report._astream_model_chunks([]))
+        finally:
+            streaming = False
+            await task
+        return received, ticks
+
+    received, ticks = asyncio.run(main())
+
+    assert received == texts
+    # A blocked loop would tick about once per chunk at most.
+    assert ticks > 3 * len(texts)
+
+
+def test_stream_error_is_raised_after_received_chunks(models):
+    models(["a", "b"], error=RuntimeError("quota exceeded"))
+    received: list[str] = []
+
+    async def main() -> None:
+        async for chunk in report._astream_model_chunks([]):
+            received.append(chunk.text)
+
+    with pytest.raises(RuntimeError, match="quota exceeded"):
+        asyncio.run(main())
+    assert received == ["a", "b"]
+
+
+def test_closing_the_stream_stops_the_worker_thread(models):
+    fake = models([str(i) for i in range(50)])
+
+    async def main() -> None:
+        stream = report._astream_model_chunks([])
+        await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(5 * CHUNK_DELAY)
+
+    asyncio.run(main())
+    assert fake.sent < 10
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import os
+import uuid
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session
+
+from backend.app.llm.report import _guidance_turn_chunks
+from backend.app.models import Base, Chunk, Document
+from backend.app.rag import retriever
+from backend.app.rag.index import VECTOR_INDEX_NAME, create_vector_index
+from backend.app.rag.local_index import LocalVectorIndex
+from backend.app.rag.retriever import (
+    retrieve_top_k,
+    retrieve_top_k_many,
+    search_by_vector,
+    search_hybrid,
+    search_hybrid_multi,
+    search_local_multi,
+    search_top_k_multi,
+)
+
+
+# These tests write to Postgres (with pgvector) inside a transaction that is
+# rolled back, and only run against a database set aside for them.
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+DIM = Chunk.embedding.type.dim
+DOCUMENTS = 30
+CHUNKS_PER_DOCUMENT = 100
+K = 8
+SPEAKERS = ("Operator", "Jane Doe", "Bob Smith")
+SPEAKER_TITLES = {"Jane Doe": "Chief Financial Officer"}
+
+
+def unit_rows(rng: np.random.Generator, n: int) -> np.ndarray:
+    vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def chunk_section(i: int) -> str:
+    return "qa" if i % 2 else "prepared_remarks"
+
+
+def chunk_speaker(i: int) -> str:
+    return SPEAKERS[i % len(SPEAKERS)]
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    """
+    DOCUMENTS transcripts of random unit embeddings under an HNSW index, so a
+    document holds about 1/DOCUMENTS of any global ANN candidate list. Chunks
+    alternate between the two sections and rotate through SPEAKERS; chunk 0 of
+    document d alone mentions the token zzcapex<d>.
+    Yields (connection, {document_id: (chunk ids, embeddings)}).
+    """
+    engine = create_engine(TEST_DATABASE_URL)
+    rng = np.random.default_rng(0)
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS vector")
+        Base.metadata.create_all(conn)
+
+        documents = {}
+        chunk_rows = []
+        for d in range(DOCUMENTS):
+            document_id = uuid.uuid4()
+            conn.execute(
+                insert(Document).values(id=document_id, ticker="ZZTEST", quarter=f"Q{d:03d}", raw_text="")
+            )
+            ids = [uuid.uuid4() for _ in range(CHUNKS_PER_DOCUMENT)]
+            embeddings = unit_rows(rng, CHUNKS_PER_DOCUMENT)
+            documents[document_id] = (ids, embeddings)
+            chunk_rows.extend(
+                {
+                    "id": chunk_id,
+                    "document_id": document_id,
+                    "section": chunk_section(i),
+                    "speaker": chunk_speaker(i),
+                    "speaker_title": SPEAKER_TITLES.get(chunk_speaker(i)),
+                    "chunk_index": i,
+                    "text": f"zzcapex{d} guidance" if i == 0 else f"guidance outlook chunk {i}",
+                    "embedding": embedding.tolist(),
+                }
+                for i, (chunk_id, embedding) in enumerate(zip(ids, embeddings))
+            )
+        conn.execute(insert(Chunk), chunk_rows)
+        create_vector_index(conn, kind="hnsw")
+        conn.exec_driver_sql("ANALYZE chunks")
+        try:
+            yield conn, documents
+        finally:
+            transaction.rollback()
+    engine.dispose()
+
+
+@pytest.fixture
+def db(corpus):
+    conn, _ = corpus
+    with Session(bind=conn, join_transaction_mode="create_savepoint") as session:
+        yield session
+
+
+@pytest.fixture
+def prefer_ann_index(corpus):
+    """
+    On a corpus this small Postgres reads one document's chunks through the
+    document_id btree. Discourage sorts so it takes the ANN index wherever it
+    may, as it does on large tables.
+    """
+    conn, _ = corpus
+    conn.exec_driver_sql("SET LOCAL enable_sort = off")
+    yield
+    conn.exec_driver_sql("SET LOCAL enable_sort = on")
+
+
+def exact_top_k(documents, document_id: uuid.UUID, qvec: np.ndarray, k: int = K, where=None) -> list[uuid.UUID]:
+    ids, embeddings = documents[document_id]
+    # Cosine distance of unit vectors orders like the negated dot product.
+    order = np.argsort(-(embeddings @ qvec), kind="stable")
+    if where is not None:
+        order = [i for i in order if where(i)]
+    return [ids[i] for i in order[:k]]
+
+
+def test_document_scoped_search_has_full_recall(corpus, db, prefer_ann_index):
+    _, documents = corpus
+    rng = np.random.default_rng(1)
+    for document_id, qvec in zip(list(documents)[:5], unit_rows(rng, 5)):
+        # The global ANN candidate list (ef_search=40) holds only a couple of
+        # this document's chunks; filtering after it would return fewer than k.
+        chunks = search_by_vector(db, qvec.tolist(), k=K, document_id=str(document_id), ef_search=40)
+        assert [c.id for c in chunks] == exact_top_k(documents, document_id, qvec)
+
+
+def test_search_top_k_multi_has_full_recall(corpus, db, prefer_ann_index):
+    _, documents = corpus
+    document_ids = list(documents)[:3]
+    qvecs = unit_rows(np.random.default_rng(2), 4)
+
+    results = search_top_k_multi(db, qvecs.tolist(), [str(d) for d in document_ids], k=K, ef_search=40)
+
+    for qi, qvec in enumerate(qvecs):
+        for di, document_id in enumerate(document_ids):
+            assert [c.id for c in results[qi][di]] == exact_top_k(documents, document_id, qvec)
+
+
+def test_search_hybrid_multi_fuses_full_vector_ranking(corpus, db, prefer_ann_index):
+    _, documents = corpus
+    document_id = next(iter(documents))
+    qvec = unit_rows(np.random.default_rng(3), 1)[0]
+
+    # No chunk matches the full-text query, so the fused order is the vector order.
+    (per_document,), = search_hybrid_multi(db, ["zzunmatched"], [qvec.tolist()], [str(document_id)], k=K)
+
+    assert [c.id for c in per_document] == exact_top_k(documents, document_id, qvec)
+
+
+@pytest.mark.parametrize(
+    "filters, where",
+    [
+        ({"section": "qa"}, lambda i: chunk_section(i) == "qa"),
+        ({"speaker": "Jane Doe"}, lambda i: chunk_speaker(i) == "Jane Doe"),
+        ({"section": "prepared_remarks", "speaker": "Operator"}, lambda i: i % 2 == 0 and chunk_speaker(i) == "Operator"),
+    ],
+    ids=["section", "speaker", "section+speaker"],
+)
+def test_section_and_speaker_filters(corpus, db, filters, where):
+    _, documents = corpus
+    document_id = list(documents)[5]
+    qvec = unit_rows(np.random.default_rng(5), 1)[0]
+
+    chunks = search_by_vector(db, qvec.tolist(), k=K, document_id=str(document_id), **filters)
+
+    assert [c.id for c in chunks] == exact_top_k(documents, document_id, qvec, where=where)
+    for chunk in chunks:
+        assert all(getattr(chunk, name) == value for name, value in filters.items())
+
+
+def test_hybrid_finds_exact_tokens(corpus, db):
+    _, documents = corpus
+    document_id = list(documents)[6]
+    ids, embeddings = documents[document_id]
+    # The query vector points away from the chunk that has the token.
+    qvec = (-embeddings[0]).tolist()
+
+    vector_ids = [c.id for c in search_by_vector(db, qvec, k=K, document_id=str(document_id))]
+    hybrid = search_hybrid(db, "zzcapex6", qvec, k=K, document_id=str(document_id))
+
+    assert ids[0] not in vector_ids
+    # Ranked first by full text, so it ties with the nearest chunk for the top.
+    assert ids[0] in [c.id for c in hybrid[:2]]
+    assert len(hybrid) == K
+
+
+def test_retrieve_top_k_many_matches_per_call_retrieval(corpus, db, monkeypatch):
+    _, documents = corpus
+    queries = ["capex guidance", "margin outlook", "zzcapex2 risks"]
+    vectors = dict(zip(queries, unit_rows(np.random.default_rng(6), len(queries)).tolist()))
+    monkeypatch.setattr(retriever, "embed_queries", lambda texts, db=None: [vectors[t] for t in texts])
+    monkeypatch.setattr(retriever, "embed_query", lambda text, db=None: vectors[text])
+    document_ids = [str(d) for d in list(documents)[:3]]
+
+    for mode in ("vector", "hybrid"):
+        many = retrieve_top_k_many(db, queries, document_ids, k=K, mode=mode)
+        for qi, query in enumerate(queries):
+            for di, document_id in enumerate(document_ids):
+                single = retrieve_top_k(db, query, k=K, document_id=document_id, mode=mode)
+                assert [c.id for c in many[qi][di]] == [c.id for c in single], (mode, query, document_id)
+
+
+def test_local_backend_matches_postgres(corpus, db, monkeypatch, tmp_path):
+    _, documents = corpus
+    monkeypatch.setattr(retriever, "get_local_index", lambda: LocalVectorIndex(tmp_path))
+    document_ids = [str(d) for d in list(documents)[:3]]
+    qvecs = unit_rows(np.random.default_rng(7), 4).tolist()
+
+    local = search_local_multi(db, qvecs, document_ids, k=K)
+    postgres = search_top_k_multi(db, qvecs, document_ids, k=K)
+
+    assert [[[c.id for c in per_doc] for per_doc in per_query] for per_query in local] == [
+        [[c.id for c in per_doc] for per_doc in per_query] for per_query in postgres
+    ]
+
+
+def test_guidance_turn_chunks_per_document(corpus, db):
+    _, documents = corpus
+    document_ids = list(documents)[:3]
+    cfo_chunks = sorted(
+        (chunk_section(i), i) for i in range(CHUNKS_PER_DOCUMENT) if chunk_speaker(i) in SPEAKER_TITLES
+    )
+
+    results = _guidance_turn_chunks(db, [str(d) for d in reversed(document_ids)], per_document=6)
+
+    assert [[c.document_id for c in chunks] for chunks in results] == [[d] * 6 for d in reversed(document_ids)]
+    for chunks, document_id in zip(results, reversed(document_ids)):
+        ids, _ = documents[document_id]
+        assert [c.id for c in chunks] == [ids[i] for _, i in cfo_chunks[:6]]
+
+
+def search_plan(conn, db, **kwargs) -> str:
+    """EXPLAIN of the chunk query search_by_vector sends."""
+    sent = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "FROM chunks" in statement:
+            sent.append((statement, parameters))
+
+    event.listen(conn, "before_cursor_execute", capture)
+    try:
+        search_by_vector(db, k=K, **kwargs)
+    finally:
+        event.remove(conn, "before_cursor_execute", capture)
+    statement, parameters = sent[-1]
+    rows = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).scalars().all()
+    return "\n".join(rows)
+
+
+def test_only_unscoped_search_uses_the_ann_index(corpus, db, prefer_ann_index):
+    conn, documents = corpus
+    qvec = unit_rows(np.random.default_rng(4), 1)[0].tolist()
+
+    assert VECTOR_INDEX_NAME in search_plan(conn, db, qvec=qvec)
+    assert VECTOR_INDEX_NAME not in search_plan(conn, db, qvec=qvec, document_id=str(next(iter(documents))))
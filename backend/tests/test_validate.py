@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import uuid
+from typing import Any
+
+import pytest
+
+from backend.app.llm import validate
+from backend.app.llm.citations import format_citation
+from backend.app.llm.validate import (
+    evaluate_report,
+    evaluate_reports,
+    validate_citation_format,
+    validate_evidence_coverage,
+    validate_report_structure,
+)
+
+
+DOC = str(uuid.UUID(int=1))
+OTHER_DOC = str(uuid.UUID(int=2))
+CHUNK_A = str(uuid.UUID(int=11))
+CHUNK_B = str(uuid.UUID(int=12))
+MISSING_CHUNK = str(uuid.UUID(int=13))
+
+
+class StubSession:
+    """
+    Answers the cited-chunk lookup from a chunk_id -> document_id map and
+    records the chunk ids of every query.
+    """
+
+    def __init__(self, chunks: dict[str, str]) -> None:
+        self.chunks = chunks
+        self.queried: list[list[str]] = []
+
+    def execute(self, stmt):
+        (ids,) = stmt.compile().params.values()
+        ids = [str(i) for i in ids]
+        self.queried.append(ids)
+        return [(uuid.UUID(i), uuid.UUID(self.chunks[i])) for i in ids if i in self.chunks]
+
+
+def make_report() -> dict[str, Any]:
+    return {
+        "ticker": "GOOG",
+        "quarter": "2025_Q3",
+        "prev_quarter": "2025_Q2",
+        "summary": {"high_level": "Cloud drove the quarter.", "tone": "positive"},
+        "guidance": [
+            {
+                "claim": "Capex raised to $85B",
+                "evidence_current": f"We now expect capital expenditures of $85 billion. {format_citation(DOC, CHUNK_A, 4)}",
+                "evidence_prev": "unknown",
+            }
+        ],
+        "growth_drivers": [{"claim": "Cloud", "evidence": f"Cloud revenue grew 32%. {format_citation(DOC, CHUNK_B, 9)}"}],
+        # Evidence without a citation.
+        "risks": [{"claim": "Capacity", "evidence_current": "We remain capacity constrained.", "evidence_first_mention": ""}],
+        # A claim without evidence.
+        "margin_dynamics": [{"claim": "Depreciation growth accelerates", "evidence": ""}],
+        "qa_pressure_points": [
+            {
+                "theme": "AI in search",
+                "evidence_question": f"How are AI Overviews monetizing? {format_citation(DOC, CHUNK_A, 4)}",
+                "evidence_answer": f"Monetization is at approximately the same rate. (document_id: {DOC}, chunk_id: {CHUNK_B})",
+            }
+        ],
+    }
+
+
+def field_result(evaluation: dict[str, Any], name: str) -> dict[str, Any]:
+    (result,) = [f for f in evaluation["fields"] if f["field"] == name]
+    return result
+
+
+def test_structure_errors():
+    report = make_report()
+    del report["ticker"]
+    del report["qa_pressure_points"]
+    report["summary"] = {"tone": "bullish"}
+    report["risks"] = "none"
+    report["guidance"].append("not an item")
+
+    assert validate_report_structure(report) == [
+        "Missing required field: ticker",
+        "Missing required field: qa_pressure_points",
+        "Summary missing 'high_level' field",
+        "Invalid tone value: bullish",
+        "guidance[1] must be a dictionary",
+        "risks must be a list",
+    ]
+    evaluation = evaluate_report(report)
+    assert not evaluation["is_valid"]
+    assert evaluation["recommendations"][0] == "Fix schema structure errors before proceeding"
+
+    assert validate_report_structure({**make_report(), "summary": "text"})[0] == "Summary must be a dictionary"
+    assert validate_report_structure({**make_report(), "summary": {"high_level": "x"}}) == [
+        "Summary missing 'tone' field"
+    ]
+
+
+def test_valid_report_scores():
+    evaluation = evaluate_report(make_report())
+    assert evaluation["is_valid"]
+    assert evaluation["structure_errors"] == []
+    assert evaluation["overall_score"] == pytest.approx(0.3 + 0.4 * 0.8 + 0.3 * 0.8)
+    assert evaluation["recommendations"] == [
+        "Low evidence coverage (80.0%). Ensure all claims have supporting quotes.",
+        "1 claims missing evidence quotes",
+    ]
+    assert evaluation["evidence_coverage"]["details"] == [
+        {
+            "section": "margin_dynamics",
+            "claim": "Depreciation growth accelerates",
+            "missing_evidence_fields": ["evidence"],
+        }
+    ]
+
+
+def test_uncited_evidence_field():
+    evaluation = evaluate_report(make_report())
+    assert field_result(evaluation, "risks[0].evidence_current") == {
+        "field": "risks[0].evidence_current",
+        "citations": 0,
+        "invalid_citations": [],
+        "ok": False,
+    }
+    # "unknown" and empty evidence are not evidence fields at all.
+    names = {f["field"] for f in evaluation["fields"]}
+    assert "guidance[0].evidence_prev" not in names
+    assert "risks[0].evidence_first_mention" not in names
+    assert evaluation["citation_quality"]["evidence_without_citations"] == 1
+
+
+def test_citation_without_chunk_index_counts():
+    evaluation = evaluate_report(make_report())
+    assert field_result(evaluation, "qa_pressure_points[0].evidence_answer")["ok"]
+
+
+def test_verified_citations_with_stubbed_session():
+    report = make_report()
+    report["growth_drivers"][0]["evidence"] += " " + format_citation(OTHER_DOC, CHUNK_A, 4)
+    report["risks"][0]["evidence_current"] += " " + format_citation(DOC, MISSING_CHUNK, 1)
+    db = StubSession({CHUNK_A: DOC, CHUNK_B: DOC})
+
+    evaluation = evaluate_report(report, db=db)
+
+    assert db.queried and set(db.queried[0]) == {CHUNK_A, CHUNK_B, MISSING_CHUNK}
+    assert field_result(evaluation, "growth_drivers[0].evidence")["invalid_citations"] == [
+        {"document_id": OTHER_DOC, "chunk_id": CHUNK_A, "reason": "wrong_document"}
+    ]
+    assert field_result(evaluation, "risks[0].evidence_current")["invalid_citations"] == [
+        {"document_id": DOC, "chunk_id": MISSING_CHUNK, "reason": "unknown_chunk"}
+    ]
+    assert field_result(evaluation, "guidance[0].evidence_current")["ok"]
+
+    quality = evaluation["citation_quality"]
+    assert quality["citations_verified"]
+    assert quality["invalid_citations"] == 2
+    assert quality["evidence_with_invalid_citations"] == 2
+    assert quality["evidence_with_citations"] == 3
+    assert quality["evidence_without_citations"] == 0
+    assert "2 citations reference chunks that do not exist or belong to another document" in evaluation["recommendations"]
+
+
+def test_ids_are_compared_case_insensitively():
+    report = make_report()
+    report["guidance"][0]["evidence_current"] = "Capex. " + format_citation(DOC.upper(), CHUNK_A.upper(), 4)
+    evaluation = evaluate_report(report, db=StubSession({CHUNK_A: DOC, CHUNK_B: DOC}))
+    assert field_result(evaluation, "guidance[0].evidence_current")["ok"]
+
+
+def test_malformed_chunk_ids_are_not_queried():
+    report = make_report()
+    report["growth_drivers"][0]["evidence"] = "Cloud grew. (document_id: doc-1, chunk_id: chunk-7, chunk_index: 3)"
+    db = StubSession({CHUNK_A: DOC, CHUNK_B: DOC})
+
+    evaluation = evaluate_report(report, db=db)
+
+    assert all("chunk-7" not in ids for ids in db.queried)
+    assert field_result(evaluation, "growth_drivers[0].evidence")["invalid_citations"] == [
+        {"document_id": "doc-1", "chunk_id": "chunk-7", "reason": "unknown_chunk"}
+    ]
+    # Unverified, the citation is only checked for its form.
+    assert field_result(evaluate_report(report), "growth_drivers[0].evidence")["ok"]
+
+
+def test_evaluate_reports_looks_up_in_batches(monkeypatch):
+    monkeypatch.setattr(validate, "CITATION_LOOKUP_BATCH", 1)
+    reports = [make_report(), make_report()]
+    reports[1]["risks"][0]["evidence_current"] += " " + format_citation(DOC, MISSING_CHUNK, 1)
+    db = StubSession({CHUNK_A: DOC, CHUNK_B: DOC})
+
+    first, second = evaluate_reports(db, reports)
+
+    assert sorted(ids for batch in db.queried for ids in batch) == sorted([CHUNK_A, CHUNK_B, MISSING_CHUNK])
+    assert all(len(batch) == 1 for batch in db.queried)
+    assert first["citation_quality"]["invalid_citations"] == 0
+    assert second["citation_quality"]["invalid_citations"] == 1
+
+
+# Outputs of the validate_* functions before the single-pass rewrite, for
+# make_report().
+
+BASELINE_EVIDENCE_COVERAGE = {
+    "total_claims": 5,
+    "claims_with_evidence": 4,
+    "claims_without_evidence": 1,
+    "evidence_coverage_rate": 0.8,
+    "details": [
+        {
+            "section": "margin_dynamics",
+            "claim": "Depreciation growth accelerates",
+            "missing_evidence_fields": ["evidence"],
+        }
+    ],
+}
+
+BASELINE_CITATION_FORMAT = {
+    "total_evidence_fields": 5,
+    "evidence_with_citations": 4,
+    "evidence_without_citations": 1,
+    "citation_rate": 0.8,
+}
+
+
+def test_legacy_wrappers_match_baseline():
+    report = make_report()
+    assert validate_report_structure(report) == []
+    assert validate_evidence_coverage(report) == BASELINE_EVIDENCE_COVERAGE
+
+    quality = validate_citation_format(report)
+    assert {name: quality[name] for name in BASELINE_CITATION_FORMAT} == BASELINE_CITATION_FORMAT
+    assert not quality["citations_verified"]
+
+
+def test_legacy_wrappers_on_empty_sections():
+    report = make_report()
+    for section in validate.SECTION_FIELDS:
+        report[section] = []
+    assert validate_evidence_coverage(report) == {
+        "total_claims": 0,
+        "claims_with_evidence": 0,
+        "claims_without_evidence": 0,
+        "evidence_coverage_rate": 0.0,
+        "details": [],
+    }
+    quality = validate_citation_format(report)
+    assert {name: quality[name] for name in BASELINE_CITATION_FORMAT} == {
+        "total_evidence_fields": 0,
+        "evidence_with_citations": 0,
+        "evidence_without_citations": 0,
+        "citation_rate": 0.0,
+    }
+    assert evaluate_report(report)["overall_score"] == 0.3
@@ -4,10 +4,19 @@ import { useState } from 'react'
 import ReportViewer from '@/components/ReportViewer'
 import ReportForm from '@/components/ReportForm'
 
+const STAGE_LABELS: Record<string, string> = {
+  cached: 'Loading stored report…',
+  documents: 'Found transcripts, retrieving context…',
+  retrieval: 'Context retrieved, building prompt…',
+  prompt: 'Prompt ready, contacting model…',
+  llm_start: 'Waiting for the model…',
+}
+
 export default function Home() {
   const [report, setReport] = useState<any>(null)
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState<string | null>(null)
+  const [status, setStatus] = useState<string | null>(null)
 
   const handleGenerate = async (ticker: string, quarter: string, prevQuarter: string | null) => {
     setLoading(true)
@@ -16,7 +25,7 @@ export default function Home() {
 
     try {
       const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8001'
-      const response = await fetch(`${apiUrl}/report`, {
+      const response = await fetch(`${apiUrl}/report/stream`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -28,22 +37,56 @@ export default function Home() {
         }),
       })
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         const errorData = await response.json()
         throw new Error(errorData.detail || 'Report generation failed')
       }
 
-      const data = await response.json()
-      console.log('Report data received:', data)
-      if (data && data.data) {
-        setReport(data.data)
-      } else {
-        throw new Error('Invalid response format from API')
+      // Server-sent events: "event: <name>\ndata: <json>\n\n"
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+      let generatedChars = 0
+      let received = false
+
+      while (!received) {
+        const { value, done } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+
+        let boundary = buffer.indexOf('\n\n')
+        while (boundary !== -1) {
+          const message = buffer.slice(0, boundary)
+          buffer = buffer.slice(boundary + 2)
+          boundary = buffer.indexOf('\n\n')
+
+          const event = message.match(/^event: (.*)$/m)?.[1]
+          const rawData = message.match(/^data: (.*)$/m)?.[1]
+          if (!event || rawData === undefined) continue
+          const data = JSON.parse(rawData)
+
+          if (event === 'stage') {
+            setStatus(STAGE_LABELS[data.stage] || data.stage)
+          } else if (event === 'token') {
+            generatedChars += data.text.length
+            setStatus(`Writing report… ${generatedChars.toLocaleString()} characters`)
+          } else if (event === 'report') {
+            setReport(data.data)
+            received = true
+          } else if (event === 'error') {
+            throw new Error(data.detail || 'Report generation failed')
+          }
+        }
+      }
+
+      if (!received) {
+        throw new Error('Report stream ended without a report')
       }
     } catch (err) {
       setError(err instanceof Error ? err.message : 'An error occurred')
     } finally {
       setLoading(false)
+      setStatus(null)
     }
   }
 
@@ -65,6 +108,16 @@ export default function Home() {
 
       <ReportForm onGenerate={handleGenerate} loading={loading} />
 
+      {loading && status && (
+        <div style={{
+          marginTop: '1.5rem',
+          color: '#666',
+          fontSize: '0.875rem'
+        }}>
+          {status}
+        </div>
+      )}
+
       {error && (
         <div style={{
           marginTop: '2rem',
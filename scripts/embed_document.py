@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import sys
+import time
 from pathlib import Path
 from typing import Optional
 
@@ -10,34 +11,28 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from backend.app.db import SessionLocal  # noqa: E402
+from backend.app.db import get_sessionmaker  # noqa: E402
 from backend.app.models import Chunk  # noqa: E402
-from backend.app.rag.embeddings import embed_texts  # noqa: E402
-
-
-def embed_document(document_id: str, batch_size: int = 16) -> None:
-    with SessionLocal() as db:
-        total = 0
-
-        while True:
-            stmt = (
-                select(Chunk)
-                .where(Chunk.document_id == document_id)
-                .where(Chunk.embedding.is_(None))
-                .order_by(Chunk.section.asc(), Chunk.chunk_index.asc())
-                .limit(batch_size)
+from backend.app.rag.vector_store import embed_chunks_for_document  # noqa: E402
+
+
+def embed_document(document_id: str, batch_size: Optional[int] = None, concurrency: Optional[int] = None) -> None:
+    with get_sessionmaker()() as db:
+        started = time.perf_counter()
+        stats = embed_chunks_for_document(
+            db,
+            document_id,
+            batch_size=batch_size,
+            concurrency=concurrency,
+            progress=lambda done, pending: print(f"Embedded {done}/{pending} chunks..."),
+        )
+        elapsed = time.perf_counter() - started
+        if stats.chunks_embedded:
+            print(
+                f"Embedded {stats.chunks_embedded} chunks in {elapsed:.1f}s "
+                f"({stats.chunks_embedded / elapsed:.1f} chunks/s): {stats.api_calls} API call(s), "
+                f"{stats.reused} reused an existing embedding."
             )
-            batch = db.scalars(stmt).all()
-            if not batch:
-                break
-
-            vectors = embed_texts([c.text for c in batch])
-            for chunk, vec in zip(batch, vectors, strict=True):
-                chunk.embedding = vec
-
-            db.commit()
-            total += len(batch)
-            print(f"Embedded {total} chunks so far...")
 
         embedded_stmt = (
             select(func.count())
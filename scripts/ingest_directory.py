@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from sqlalchemy import func, select, tuple_
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from backend.app.db import get_sessionmaker  # noqa: E402
+from backend.app.ingestion.chunker import ChunkInput  # noqa: E402
+from backend.app.ingestion.ingest import (  # noqa: E402
+    build_chunk_inputs,
+    create_chunks_for_document,
+    insert_documents_with_chunks,
+)
+from backend.app.models import Chunk, Document  # noqa: E402
+from backend.app.rag.vector_store import EmbeddingStats, embed_chunks_for_document  # noqa: E402
+
+
+# TICKER_YYYY_QN.txt, e.g. GOOG_2025_Q1.txt -> ("GOOG", "2025_Q1")
+FILENAME_RE = re.compile(r"^(?P<ticker>[A-Za-z][A-Za-z0-9.\-]*)_(?P<quarter>\d{4}_Q[1-4])\.txt$", re.IGNORECASE)
+
+
+def parse_filename(path: Path) -> tuple[str, str] | None:
+    match = FILENAME_RE.match(path.name)
+    if match is None:
+        return None
+    return match["ticker"].upper(), match["quarter"].upper()
+
+
+def prepare_file(path: Path) -> tuple[str, str, str, list[ChunkInput]]:
+    # Runs in a worker process: read, parse and chunk one transcript.
+    ticker, quarter = parse_filename(path)
+    raw_text = path.read_text(encoding="utf-8")
+    return ticker, quarter, raw_text, build_chunk_inputs(raw_text)
+
+
+def scan(directory: Path) -> dict[tuple[str, str], Path]:
+    found: dict[tuple[str, str], Path] = {}
+    for path in sorted(directory.glob("*.txt")):
+        key = parse_filename(path)
+        if key is None:
+            print(f"Skipping {path.name}: expected TICKER_YYYY_QN.txt")
+            continue
+        found[key] = path
+    return found
+
+
+def existing_documents(keys: list[tuple[str, str]]) -> dict[tuple[str, str], tuple[object, int]]:
+    """
+    (ticker, quarter) -> (document id, chunk count) for keys already ingested.
+    """
+    if not keys:
+        return {}
+    with get_sessionmaker()() as db:
+        stmt = (
+            select(Document.id, Document.ticker, Document.quarter, func.count(Chunk.id))
+            .outerjoin(Chunk, Chunk.document_id == Document.id)
+            .where(tuple_(Document.ticker, Document.quarter).in_(keys))
+            .group_by(Document.id)
+        )
+        return {(ticker, quarter): (doc_id, n) for doc_id, ticker, quarter, n in db.execute(stmt)}
+
+
+def ingest(paths: list[Path], workers: int, batch_docs: int) -> tuple[int, int]:
+    """
+    Parse and chunk files in a process pool and insert them in batches of
+    batch_docs documents, one transaction per batch. Returns (docs, chunks).
+    """
+    docs = chunks = 0
+    batch: list[tuple[str, str, None, str, list[ChunkInput]]] = []
+    SessionLocal = get_sessionmaker()
+
+    def flush() -> None:
+        nonlocal docs, chunks
+        with SessionLocal() as db:
+            inserted = insert_documents_with_chunks(db, batch)
+            db.commit()
+        docs += len(inserted)
+        chunks += sum(len(b[4]) for b in batch if (b[0], b[1]) in inserted)
+        batch.clear()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for ticker, quarter, raw_text, chunk_inputs in pool.map(prepare_file, paths, chunksize=4):
+            batch.append((ticker, quarter, None, raw_text, chunk_inputs))
+            print(f"Prepared {ticker} {quarter}: {len(chunk_inputs)} chunks")
+            if len(batch) >= batch_docs:
+                flush()
+        if batch:
+            flush()
+
+    return docs, chunks
+
+
+def rechunk_empty(document_ids: list) -> int:
+    # Documents stored without chunks (e.g. an interrupted older ingest).
+    total = 0
+    with get_sessionmaker()() as db:
+        for doc_id in document_ids:
+            total += len(create_chunks_for_document(db, db.get(Document, doc_id)))
+    return total
+
+
+def pending_embeddings(keys: list[tuple[str, str]]) -> list:
+    if not keys:
+        return []
+    with get_sessionmaker()() as db:
+        stmt = (
+            select(Document.id)
+            .join(Chunk, Chunk.document_id == Document.id)
+            .where(tuple_(Document.ticker, Document.quarter).in_(keys))
+            .where(Chunk.embedding.is_(None))
+            .distinct()
+        )
+        return list(db.scalars(stmt))
+
+
+def _embed_one(document_id, batch_size: int) -> EmbeddingStats:
+    with get_sessionmaker()() as db:
+        return embed_chunks_for_document(db, document_id, batch_size=batch_size)
+
+
+def embed(document_ids: list, concurrency: int, batch_size: int) -> EmbeddingStats:
+    total = EmbeddingStats()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(_embed_one, doc_id, batch_size) for doc_id in document_ids]
+        for future in futures:
+            stats = future.result()
+            total.chunks_embedded += stats.chunks_embedded
+            total.texts_embedded += stats.texts_embedded
+            total.api_calls += stats.api_calls
+    return total
+
+
+def _rate(count: int, seconds: float) -> str:
+    return f"{count / seconds:.1f}" if seconds > 0 else "n/a"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ingest and embed a directory of TICKER_YYYY_QN.txt transcripts.")
+    parser.add_argument("directory", nargs="?", default=str(PROJECT_ROOT / "data" / "raw_transcripts"))
+    parser.add_argument("--workers", type=int, default=None, help="Parse/chunk processes (default: CPU count).")
+    parser.add_argument("--batch-docs", type=int, default=16, help="Documents inserted per transaction.")
+    parser.add_argument("--embed-concurrency", type=int, default=4, help="Documents embedded at once.")
+    parser.add_argument("--embed-batch-size", type=int, default=32, help="Chunks per embedding request.")
+    parser.add_argument("--skip-embed", action="store_true", help="Only ingest; leave chunks unembedded.")
+    args = parser.parse_args()
+
+    directory = Path(args.directory)
+    if not directory.is_dir():
+        print(f"Not a directory: {directory}")
+        raise SystemExit(1)
+
+    found = scan(directory)
+    keys = list(found)
+    existing = existing_documents(keys)
+    new_paths = [path for key, path in found.items() if key not in existing]
+    empty = [doc_id for doc_id, n in existing.values() if n == 0]
+    print(f"Found {len(found)} transcripts: {len(new_paths)} new, {len(existing)} already ingested.")
+
+    started = time.perf_counter()
+    docs, chunks = ingest(new_paths, workers=args.workers, batch_docs=args.batch_docs) if new_paths else (0, 0)
+    chunks += rechunk_empty(empty)
+    ingest_seconds = time.perf_counter() - started
+    print(
+        f"Ingested {docs} documents / {chunks} chunks in {ingest_seconds:.1f}s "
+        f"({_rate(docs, ingest_seconds)} docs/s, {_rate(chunks, ingest_seconds)} chunks/s)."
+    )
+
+    if args.skip_embed:
+        return
+
+    started = time.perf_counter()
+    pending = pending_embeddings(keys)
+    stats = embed(pending, concurrency=args.embed_concurrency, batch_size=args.embed_batch_size)
+    embed_seconds = time.perf_counter() - started
+    print(
+        f"Embedded {stats.chunks_embedded} chunks across {len(pending)} documents in {embed_seconds:.1f}s "
+        f"({_rate(stats.chunks_embedded, embed_seconds)} chunks/s): {stats.api_calls} API call(s) for "
+        f"{stats.texts_embedded} distinct texts, {stats.reused} chunks reused an existing embedding."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -7,19 +7,60 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from backend.app.db import engine  # noqa: E402
-from backend.app.models import Base  # noqa: E402
+from sqlalchemy import select, update  # noqa: E402
+
+from backend.app.db import get_engine  # noqa: E402
+from backend.app.llm.report_store import report_content_hash  # noqa: E402
+from backend.app.models import TEXT_SEARCH_CONFIG, Base, Report  # noqa: E402
+from backend.app.rag.index import create_vector_index  # noqa: E402
 
 
 def main() -> None:
+    engine = get_engine()
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS vector")
+
     Base.metadata.create_all(bind=engine)
 
     with engine.begin() as conn:
         conn.exec_driver_sql(
             "ALTER TABLE chunks ADD COLUMN IF NOT EXISTS embedding vector(768)"
         )
+        conn.exec_driver_sql("ALTER TABLE chunks ADD COLUMN IF NOT EXISTS text_hash varchar(64)")
+        conn.exec_driver_sql("ALTER TABLE chunks ADD COLUMN IF NOT EXISTS embedding_model varchar(64)")
+        conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_chunks_text_hash_model ON chunks (text_hash, embedding_model)"
+        )
+        conn.exec_driver_sql("ALTER TABLE chunks ADD COLUMN IF NOT EXISTS speaker_title varchar(128)")
+        conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_chunks_document_section_speaker ON chunks (document_id, section, speaker)"
+        )
+        conn.exec_driver_sql(
+            "ALTER TABLE chunks ADD COLUMN IF NOT EXISTS text_search tsvector "
+            f"GENERATED ALWAYS AS (to_tsvector('{TEXT_SEARCH_CONFIG}', text)) STORED"
+        )
+        conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_chunks_text_search ON chunks USING gin (text_search)")
+        conn.exec_driver_sql("ALTER TABLE reports ADD COLUMN IF NOT EXISTS content_hash varchar(64)")
+        conn.exec_driver_sql("ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash varchar(64)")
+        # Same value as ingest.document_content_hash; report versions treat a NULL hash as unknown.
+        conn.exec_driver_sql(
+            "UPDATE documents SET content_hash = encode(sha256(convert_to(raw_text, 'UTF8')), 'hex') "
+            "WHERE content_hash IS NULL"
+        )
+        conn.exec_driver_sql("ALTER TABLE report_jobs ADD COLUMN IF NOT EXISTS heartbeat_at timestamptz")
+        for column in ("model", "prompt_fingerprint", "source_hash"):
+            conn.exec_driver_sql(f"ALTER TABLE reports ADD COLUMN IF NOT EXISTS {column} varchar(64)")
+        create_vector_index(conn)
+
+    # Reports stored before content_hash existed. The hash is over the
+    # canonical Python JSON (report_store.report_json), which Postgres cannot
+    # reproduce, so it is computed here.
+    with engine.begin() as conn:
+        rows = conn.execute(select(Report.id, Report.report_data).where(Report.content_hash.is_(None))).all()
+        for report_id, data in rows:
+            conn.execute(update(Report).where(Report.id == report_id).values(content_hash=report_content_hash(data)))
 
 
 if __name__ == "__main__":
     main()
-
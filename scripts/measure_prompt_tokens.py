@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from backend.app.db import get_sessionmaker  # noqa: E402
+from backend.app.llm.report import (  # noqa: E402
+    REPORT_MODEL,
+    _build_report_contents,
+    _collect_context_for_report,
+    _context_spans,
+    _get_client,
+    _resolve_documents,
+)
+
+
+def count_tokens(contents) -> int:
+    return _get_client().models.count_tokens(model=REPORT_MODEL, contents=contents).total_tokens
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Count report prompt tokens with full UUID citations and with compact aliases (no generation)."
+    )
+    parser.add_argument("ticker")
+    parser.add_argument("quarter")
+    parser.add_argument("--prev", default=None, help="Previous quarter, e.g. 2025_Q2.")
+    args = parser.parse_args()
+
+    with get_sessionmaker()() as db:
+        current_doc, prev_doc, prev_quarter = _resolve_documents(db, args.ticker, args.quarter, args.prev)
+        context_chunks = _collect_context_for_report(db, current_doc, prev_doc)
+
+    full_spans, _ = _context_spans(context_chunks, compact=False)
+    compact_spans, _ = _context_spans(context_chunks, compact=True)
+    full = count_tokens(_build_report_contents(args.ticker, args.quarter, prev_quarter, full_spans))
+    compact = count_tokens(_build_report_contents(args.ticker, args.quarter, prev_quarter, compact_spans, compact=True))
+
+    print(f"Context chunks:       {len(context_chunks)}")
+    print(f"Full citations:       {full} prompt tokens")
+    print(f"Compact citations:    {compact} prompt tokens")
+    print(f"Saved:                {full - compact} ({(full - compact) / full:.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import Text, cast, select, update
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from backend.app.db import get_sessionmaker  # noqa: E402
+from backend.app.llm.report_store import report_content_hash  # noqa: E402
+from backend.app.llm.validate import EVALUATOR_VERSION, ReportScan, evaluate_scans, scan_report  # noqa: E402
+from backend.app.models import Report  # noqa: E402
+
+
+DEFAULT_OUTPUT = PROJECT_ROOT / "data" / "processed" / "eval" / "results.jsonl"
+
+# Per-report fields kept in memory for the summary.
+SUMMARY_FIELDS = (
+    "ticker",
+    "content_hash",
+    "evaluator_version",
+    "overall_score",
+    "is_valid",
+    "total_claims",
+    "claims_with_evidence",
+    "total_evidence_fields",
+    "evidence_with_citations",
+    "invalid_citations",
+)
+
+
+def _scan_json(report_json: str) -> tuple[ReportScan, str]:
+    # Runs in a worker: decoding the stored JSON is most of the work.
+    report = json.loads(report_json)
+    return scan_report(report), report_content_hash(report)
+
+
+def _summary_fields(record: dict[str, Any]) -> dict[str, Any]:
+    return {name: record[name] for name in SUMMARY_FIELDS}
+
+
+def load_results(path: Path) -> dict[str, dict[str, Any]]:
+    """
+    Latest result per report id from a results file (later lines win).
+    """
+    results: dict[str, dict[str, Any]] = {}
+    if not path.exists():
+        return results
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                results[record["report_id"]] = _summary_fields(record)
+    return results
+
+
+def _record(row: Any, content_hash: str, evaluation: dict[str, Any]) -> dict[str, Any]:
+    evidence = evaluation["evidence_coverage"]
+    citations = evaluation["citation_quality"]
+    return {
+        "report_id": str(row.id),
+        "ticker": row.ticker,
+        "quarter": row.quarter,
+        "prev_quarter": row.prev_quarter,
+        "content_hash": content_hash,
+        "evaluator_version": EVALUATOR_VERSION,
+        "evaluated_at": datetime.now(timezone.utc).isoformat(),
+        "overall_score": evaluation["overall_score"],
+        "is_valid": evaluation["is_valid"],
+        "total_claims": evidence["total_claims"],
+        "claims_with_evidence": evidence["claims_with_evidence"],
+        "total_evidence_fields": citations["total_evidence_fields"],
+        "evidence_with_citations": citations["evidence_with_citations"],
+        "invalid_citations": citations["invalid_citations"],
+        "evaluation": evaluation,
+    }
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    # Nearest rank on sorted values.
+    index = min(len(values) - 1, max(0, round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def _rate(numerator: int, denominator: int) -> float:
+    return numerator / denominator if denominator else 0.0
+
+
+def summarize(records: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Score distribution over all reports and coverage/citation rates by
+    ticker. Rates are pooled over claims and evidence fields.
+    """
+    scores = sorted(r["overall_score"] for r in records)
+    summary: dict[str, Any] = {
+        "evaluator_version": EVALUATOR_VERSION,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "reports": len(records),
+        "valid_rate": _rate(sum(1 for r in records if r["is_valid"]), len(records)),
+    }
+    if scores:
+        summary["score"] = {
+            "mean": sum(scores) / len(scores),
+            "min": scores[0],
+            "p10": _percentile(scores, 0.1),
+            "p50": _percentile(scores, 0.5),
+            "p90": _percentile(scores, 0.9),
+            "max": scores[-1],
+        }
+        histogram = [0] * 10
+        for score in scores:
+            histogram[min(9, int(score * 10))] += 1
+        summary["score_histogram"] = {f"{i / 10:.1f}-{(i + 1) / 10:.1f}": n for i, n in enumerate(histogram)}
+
+    by_ticker: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    for r in records:
+        by_ticker[r["ticker"]].append(r)
+    summary["by_ticker"] = {
+        ticker: {
+            "reports": len(rs),
+            "mean_score": sum(r["overall_score"] for r in rs) / len(rs),
+            "evidence_coverage_rate": _rate(sum(r["claims_with_evidence"] for r in rs), sum(r["total_claims"] for r in rs)),
+            "citation_rate": _rate(
+                sum(r["evidence_with_citations"] for r in rs), sum(r["total_evidence_fields"] for r in rs)
+            ),
+            "invalid_citations": sum(r["invalid_citations"] for r in rs),
+        }
+        for ticker, rs in sorted(by_ticker.items())
+    }
+    return summary
+
+
+def run(output: Path, workers: int | None, batch_size: int, full: bool, verify: bool) -> dict[str, Any]:
+    """
+    Evaluate every stored report not yet evaluated at its current content
+    hash with this EVALUATOR_VERSION, append the results to output and
+    return the summary over all current reports.
+    """
+    output.parent.mkdir(parents=True, exist_ok=True)
+    results = {} if full else load_results(output)
+    current: dict[str, str | None] = {}
+    evaluated = 0
+    SessionLocal = get_sessionmaker()
+
+    stmt = (
+        select(
+            Report.id,
+            Report.ticker,
+            Report.quarter,
+            Report.prev_quarter,
+            Report.content_hash,
+            cast(Report.report_data, Text).label("report_json"),
+        )
+        .order_by(Report.ticker, Report.quarter, Report.prev_quarter)
+        .execution_options(yield_per=batch_size)
+    )
+
+    # Reports are streamed on one session; citations are verified on another.
+    with (
+        SessionLocal() as stream_db,
+        SessionLocal() as db,
+        ProcessPoolExecutor(max_workers=workers) as pool,
+        output.open("w" if full else "a", encoding="utf-8") as out,
+    ):
+        for rows in stream_db.execute(stmt).partitions():
+            pending = []
+            for row in rows:
+                report_id = str(row.id)
+                current[report_id] = row.content_hash
+                done = results.get(report_id)
+                if (
+                    done is not None
+                    and row.content_hash is not None
+                    and done["content_hash"] == row.content_hash
+                    and done["evaluator_version"] == EVALUATOR_VERSION
+                ):
+                    continue
+                pending.append(row)
+            if not pending:
+                continue
+
+            scanned = list(pool.map(_scan_json, [row.report_json for row in pending], chunksize=16))
+            evaluations = evaluate_scans(db if verify else None, [scan for scan, _ in scanned])
+            for row, (_, content_hash), evaluation in zip(pending, scanned, evaluations):
+                if row.content_hash is None:
+                    # Stored before content_hash existed; fill it in like GET /reports does.
+                    db.execute(update(Report).where(Report.id == row.id).values(content_hash=content_hash))
+                record = _record(row, content_hash, evaluation)
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                results[record["report_id"]] = _summary_fields(record)
+                current[record["report_id"]] = content_hash
+            db.commit()
+            evaluated += len(pending)
+            print(f"Evaluated {evaluated} report(s)...")
+
+    records = [
+        r
+        for report_id, r in results.items()
+        if report_id in current and r["content_hash"] == current[report_id] and r["evaluator_version"] == EVALUATOR_VERSION
+    ]
+    summary = summarize(records)
+    summary["evaluated"] = evaluated
+    summary["skipped"] = len(current) - evaluated
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Evaluate all stored reports without the API; results are appended as JSONL with a summary."
+    )
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="Per-report results (JSONL).")
+    parser.add_argument("--summary", default=None, help="Summary JSON (default: summary.json next to --output).")
+    parser.add_argument("--workers", type=int, default=None, help="Processes decoding and scanning reports (default: CPU count).")
+    parser.add_argument("--batch-size", type=int, default=200, help="Reports fetched and evaluated per batch.")
+    parser.add_argument("--full", action="store_true", help="Re-evaluate every report and rewrite --output.")
+    parser.add_argument("--no-verify", action="store_true", help="Skip checking cited chunks against the database.")
+    args = parser.parse_args()
+
+    output = Path(args.output)
+    summary_path = Path(args.summary) if args.summary else output.with_name("summary.json")
+
+    started = time.perf_counter()
+    summary = run(output, args.workers, args.batch_size, args.full, verify=not args.no_verify)
+    summary_path.write_text(json.dumps(summary, indent=2) + "\n", encoding="utf-8")
+
+    print(
+        f"Evaluated {summary['evaluated']} report(s), skipped {summary['skipped']} unchanged, "
+        f"in {time.perf_counter() - started:.1f}s."
+    )
+    if summary["reports"]:
+        score = summary["score"]
+        print(
+            f"{summary['reports']} report(s): mean score {score['mean']:.1%}, p10 {score['p10']:.1%}, "
+            f"p50 {score['p50']:.1%}, valid {summary['valid_rate']:.1%}"
+        )
+        for ticker, stats in summary["by_ticker"].items():
+            print(
+                f"  {ticker:<8} {stats['reports']:>5} reports  score {stats['mean_score']:.1%}  "
+                f"coverage {stats['evidence_coverage_rate']:.1%}  citations {stats['citation_rate']:.1%}  "
+                f"invalid {stats['invalid_citations']}"
+            )
+    print(f"Results: {output}\nSummary: {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
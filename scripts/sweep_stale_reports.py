@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from backend.app.db import get_sessionmaker  # noqa: E402
+from backend.app.jobs.report_jobs import enqueue_report_job  # noqa: E402
+from backend.app.llm.report_store import find_stale_reports  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "List stored reports whose model, prompt fingerprint or source transcripts changed, "
+            "and optionally queue jobs to regenerate them."
+        )
+    )
+    parser.add_argument("--enqueue", action="store_true", help="Queue a report job for every stale report.")
+    args = parser.parse_args()
+
+    with get_sessionmaker()() as db:
+        stale = find_stale_reports(db)
+        for report_id, key in stale:
+            ticker, quarter, prev_quarter = key
+            line = f"{ticker} {quarter} vs {prev_quarter or '-'}  report {report_id}"
+            if args.enqueue:
+                job = enqueue_report_job(db, key)
+                line += f"  job {job.id} ({job.status})"
+            print(line)
+
+    print(f"{len(stale)} stale report(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from backend.app.db import get_engine  # noqa: E402
+from backend.app.rag.index import (  # noqa: E402
+    create_vector_index,
+    drop_vector_index,
+    get_vector_index_definition,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the ANN index on chunks.embedding.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    create = sub.add_parser("create", help="Build the index (defaults come from Settings).")
+    create.add_argument("--kind", choices=["hnsw", "ivfflat"], default=None)
+    create.add_argument("--m", type=int, default=None, help="HNSW max connections per layer.")
+    create.add_argument("--ef-construction", type=int, default=None, help="HNSW build candidate list size.")
+    create.add_argument("--lists", type=int, default=None, help="IVFFlat list count (~rows/1000).")
+    create.add_argument("--replace", action="store_true", help="Drop the existing index first.")
+    create.add_argument("--concurrently", action="store_true", help="Build without locking writes.")
+
+    drop = sub.add_parser("drop", help="Drop the index.")
+    drop.add_argument("--concurrently", action="store_true")
+
+    sub.add_parser("status", help="Show the current index definition.")
+
+    args = parser.parse_args()
+    engine = get_engine()
+
+    if args.command == "status":
+        with engine.connect() as conn:
+            print(get_vector_index_definition(conn) or "No ANN index on chunks.embedding.")
+        return
+
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if args.command == "drop":
+            drop_vector_index(conn, concurrently=args.concurrently)
+            print("Dropped.")
+            return
+
+        started = time.perf_counter()
+        ddl = create_vector_index(
+            conn,
+            replace=args.replace,
+            kind=args.kind,
+            m=args.m,
+            ef_construction=args.ef_construction,
+            lists=args.lists,
+            concurrently=args.concurrently,
+        )
+        print(ddl)
+        print(f"Done in {time.perf_counter() - started:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()